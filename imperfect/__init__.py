@@ -1 +1,2 @@
 from .runtime.desktop import DesktopAppRuntime, Mod
+from .runtime.headless import HeadlessAppRuntime
@@ -0,0 +1,154 @@
+"""
+Porter-Duff compositing of rows of premultiplied 32 bit pixels.
+
+Pixels are laid out like Color.values (alpha, blue, green, red) and their
+color channels are expected to be premultiplied by their alpha. Every
+operator is result = source * Fa + destination * Fb where the factors are
+0, 1, an alpha or its inverse. Products come out of a table lookup over
+the whole row and sums are done on python ints, a few C level operations
+per row rather than a Color per pixel.
+"""
+
+import sys
+
+from functools import lru_cache
+from operator import itemgetter
+
+
+INVERT = bytes(255 - i for i in range(256))
+
+
+@lru_cache(maxsize=1)
+def product_table():
+    # a * c / 255 for every pair of bytes, indexed by the native uint16 that
+    # the pair (a, c) reads as through a memoryview cast to 'H'
+    table = bytearray(256 * 256)
+    for a in range(256):
+        for c in range(256):
+            table[int.from_bytes(bytes((a, c)), sys.byteorder)] = (a * c + 127) // 255
+    return bytes(table)
+
+
+@lru_cache(maxsize=256)
+def scale_table(factor):
+    return bytes((factor * c + 127) // 255 for c in range(256))
+
+
+@lru_cache(maxsize=256)
+def select_table(factor):
+    # translates factor to 0xff and every other byte to 0x00
+    return bytes(0xff if value == factor else 0x00 for value in range(256))
+
+
+# rows with up to this many different factors are scaled one factor at a time
+FEW_FACTORS = 16
+
+
+def alphas(pixels):
+    return bytes(pixels[0::4])
+
+
+def scale(pixels, factors):
+    """Return every channel of pixels multiplied by the factor (0-255, one
+    per pixel) of its pixel divided by 255."""
+    pixels = bytes(pixels)
+    count = len(factors)
+    if count == 0:
+        return pixels
+
+    first = factors[0]
+    if factors.count(first) == count:
+        if first == 255:
+            return pixels
+        if first == 0:
+            return bytes(len(pixels))
+        return pixels.translate(scale_table(first))
+
+    distinct = set(factors)
+    if len(distinct) <= FEW_FACTORS:
+        # antialiased edges and masks only have a few alphas, scale the whole
+        # row by each of them and keep the pixels that have it
+        spread = bytearray(len(pixels))
+        for channel in range(4):
+            spread[channel::4] = factors
+
+        result = 0
+        for factor in distinct:
+            if factor == 0:
+                continue
+            selected = int.from_bytes(spread.translate(select_table(factor)))
+            result |= int.from_bytes(pixels.translate(scale_table(factor))) & selected
+        return result.to_bytes(len(pixels))
+
+    # pair each channel with the factor of its pixel and look the products
+    # up a native uint16 at a time
+    pairs = bytearray(len(pixels) * 2)
+    for channel in range(4):
+        pairs[channel * 2::8] = factors
+    pairs[1::2] = pixels
+    return bytes(itemgetter(*memoryview(pairs).cast('H'))(product_table()))
+
+
+def add(first, second, saturate=True):
+    """Add two rows byte by byte, saturating at 255 or modulo 256 when
+    saturate is False."""
+    length = len(first)
+    a = int.from_bytes(first)
+    b = int.from_bytes(second)
+    high = int.from_bytes(b'\x80' * length)
+    low = high ^ int.from_bytes(b'\xff' * length)
+
+    # add the low 7 bits of every byte so they can't carry into the next
+    # one, then fix up the top bit and saturate the bytes that overflowed
+    total = ((a & low) + (b & low)) ^ ((a ^ b) & high)
+    if not saturate:
+        return total.to_bytes(length)
+    carry = ((a & b) | ((a | b) & ~total)) & high
+    return (total | ((carry >> 7) * 0xff)).to_bytes(length)
+
+
+def factors_of(factor, source_alphas, destination_alphas):
+    match factor:
+        case 'source_alpha':
+            return source_alphas
+        case 'inverse_source_alpha':
+            return source_alphas.translate(INVERT)
+        case 'destination_alpha':
+            return destination_alphas
+        case 'inverse_destination_alpha':
+            return destination_alphas.translate(INVERT)
+    raise ValueError(f'unknown compositing factor={factor}')
+
+
+def term(pixels, factor, source_alphas, destination_alphas):
+    if factor == 'zero':
+        return None
+    if factor == 'one':
+        return bytes(pixels)
+    return scale(pixels, factors_of(factor, source_alphas, destination_alphas))
+
+
+def composite(source_factor, destination_factor, source, destination):
+    """Return source * source_factor + destination * destination_factor for
+    two rows of premultiplied pixels of the same length."""
+    source_alphas = alphas(source)
+    destination_alphas = alphas(destination)
+
+    source_term = term(source, source_factor, source_alphas, destination_alphas)
+    destination_term = term(destination, destination_factor, source_alphas, destination_alphas)
+
+    if source_term is None and destination_term is None:
+        return bytes(len(destination))
+    if source_term is None:
+        return destination_term
+    if destination_term is None:
+        return source_term
+    return add(source_term, destination_term)
+
+
+def premultiply(pixels):
+    """Return straight alpha pixels with their colors multiplied by alpha."""
+    pixel_alphas = alphas(pixels)
+    result = bytearray(scale(pixels, pixel_alphas))
+    result[0::4] = pixel_alphas
+    return bytes(result)
@@ -0,0 +1,265 @@
+"""
+Measure how fast the drawing primitives move pixels around.
+
+Every benchmark runs headless on plain forms and reports a result per case
+with a unique name, results can be written as json lines and compared to a
+baseline saved from an earlier run.
+
+    python -m imperfect.draw.bench
+    python -m imperfect.draw.bench --output baseline.jsonl
+    python -m imperfect.draw.bench --baseline baseline.jsonl
+"""
+
+import argparse
+import sys
+import time
+
+from imperfect.draw import BitBlt, Color, CombinationRule, Form, Pen, shapes
+from imperfect.draw.stretch import stretch_bits
+from imperfect.util import jsonl
+
+
+SIZES = [(64, 64), (320, 240), (640, 480)]
+LINE_LENGTHS = [8, 64, 256]
+BRUSH_SIZES = [1, 4, 16]
+SCALE_FACTORS = [2, 4, 8]
+STRETCH_RATIOS = [(1, 2), (2, 3), (2, 1)]
+
+# a case this much slower than its baseline counts as a regression
+TOLERANCE = 0.10
+
+
+def megapixels_per_second(pixels, seconds):
+    return (pixels / 1_000_000) / seconds
+
+
+def timed(fn, repeat, setup=None):
+    """Return the best wall time of calling fn repeat times, setup is called
+    before every call and isn't timed."""
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def result(name, seconds, pixels):
+    return {
+        'name': name,
+        'seconds': seconds,
+        'mpx_per_s': megapixels_per_second(pixels, seconds),
+    }
+
+
+def filled_form(width, height, color):
+    form = Form(0, 0, width, height)
+    form.fill(color)
+    return form
+
+
+def bench_rules(width=640, height=480, repeat=20):
+    """Blit a full width x height form under every combination rule and
+    report the throughput of each one."""
+    source = filled_form(width, height, Color(0x12, 0x34, 0x56, 0x78))
+    background = Color(0x9a, 0xbc, 0xde, 0xf0)
+    destination = filled_form(width, height, background)
+
+    def refill():
+        # every rule starts from the same pixels, not the ones the last
+        # run left behind
+        destination.fill(background)
+        destination.take_damage()
+
+    results = []
+    for rule in CombinationRule:
+        bitblt = BitBlt(
+            destination=destination,
+            source=source,
+            fill=None,
+            combination_rule=rule,
+            destination_x=0,
+            destination_y=0,
+            source_x=0,
+            source_y=0,
+            width=width,
+            height=height,
+        )
+        seconds = timed(bitblt.copy_bits, repeat, setup=refill)
+        results.append(result(f'copy_bits/{rule.name}/{width}x{height}', seconds, width * height))
+    return results
+
+
+def bench_lines(width=640, height=480, repeat=20):
+    """Draw diagonal lines of every length with square brushes of every
+    size, throughput counts the pixels of the brush stamps."""
+    destination = filled_form(width, height, Color(0, 0, 0))
+
+    results = []
+    for brush in BRUSH_SIZES:
+        pen = Pen(destination, Color(255, 255, 255), brush, brush)
+        pen.down()
+        for length in LINE_LENGTHS:
+            seconds = timed(lambda: pen.line(0, 0, length, length // 2), repeat)
+            results.append(result(f'draw_line/{length}/brush {brush}/{width}x{height}', seconds, length * brush * brush))
+    return results
+
+
+def bench_fill(width, height, repeat=20):
+    form = Form(0, 0, width, height)
+    seconds = timed(lambda: form.fill(Color(1, 2, 3)), repeat)
+    return [result(f'fill/{width}x{height}', seconds, width * height)]
+
+
+def bench_pixels(width, height, repeat=3):
+    """Read and write every pixel of a form one at a time."""
+    form = filled_form(width, height, Color(1, 2, 3))
+    color = Color(4, 5, 6)
+
+    def read():
+        for y in range(height):
+            for x in range(width):
+                form.color_at(x, y)
+
+    def write():
+        for y in range(height):
+            for x in range(width):
+                form.put_color_at(x, y, color)
+        form.take_damage()
+
+    return [
+        result(f'color_at/{width}x{height}', timed(read, repeat), width * height),
+        result(f'put_color_at/{width}x{height}', timed(write, repeat), width * height),
+    ]
+
+
+def bench_scale_up(width=640, height=480, repeat=20):
+    """Scale a pen up and draw a stroke with the larger brush."""
+    destination = filled_form(width, height, Color(0, 0, 0))
+    pen = Pen(destination, Color(255, 255, 255), 1, 1)
+    pen.down()
+
+    results = []
+    for factor in SCALE_FACTORS:
+        def stroke():
+            pen.scale_up(factor)
+            pen.line(0, 0, 64, 32)
+            pen.scale_down(factor)
+
+        seconds = timed(stroke, repeat)
+        results.append(result(f'scale_up/{factor}/{width}x{height}', seconds, 64 * factor * factor))
+    return results
+
+
+def bench_stretch(width, height, repeat=20):
+    """Stretch a width x height form by integer and fractional ratios."""
+    source = filled_form(width, height, Color(1, 2, 3))
+
+    results = []
+    for numerator, denominator in STRETCH_RATIOS:
+        w = width * denominator // numerator
+        h = height * denominator // numerator
+        destination = Form(0, 0, w, h)
+        seconds = timed(lambda: stretch_bits(destination, source, 0, 0, w, h), repeat)
+        results.append(result(f'stretch/{width}x{height} to {w}x{h}', seconds, w * h))
+    return results
+
+
+def bench_shapes(width, height, repeat=20):
+    """Fill the largest circle and triangle that fit a width x height form."""
+    form = Form(0, 0, width, height)
+    r = min(width, height) // 2 - 1
+    triangle = [(0, 0), (width, height // 2), (0, height)]
+    color = Color(1, 2, 3)
+
+    return [
+        result(f'fill_circle/{width}x{height}', timed(lambda: shapes.fill_circle(form, r, r, r, color), repeat), 3 * r * r),
+        result(f'fill_polygon/{width}x{height}', timed(lambda: shapes.fill_polygon(form, triangle, color), repeat), width * height // 2),
+    ]
+
+
+def bench_flood_fill(width, height, repeat=20):
+    """Flood fill all of a width x height form, around a circle."""
+    form = Form(0, 0, width, height)
+    shapes.draw_circle(form, width // 2, height // 2, min(width, height) // 3, Color(255, 255, 255))
+    colors = [Color(1, 2, 3), Color(4, 5, 6)]
+
+    def fill():
+        form.flood_fill(0, 0, colors[0])
+        colors.reverse()
+
+    return [result(f'flood_fill/{width}x{height}', timed(fill, repeat), width * height)]
+
+
+def run(sizes=SIZES, repeat=20):
+    """Run every benchmark for every form size."""
+    results = []
+    for width, height in sizes:
+        results += bench_rules(width, height, repeat)
+        results += bench_fill(width, height, repeat)
+        results += bench_stretch(width, height, repeat)
+        results += bench_shapes(width, height, repeat)
+        results += bench_flood_fill(width, height, repeat)
+        results += bench_pixels(width, height, max(1, repeat // 10))
+
+    width, height = sizes[-1]
+    results += bench_lines(width, height, repeat)
+    results += bench_scale_up(width, height, repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Return the results next to the baseline case of the same name, cases
+    missing from the baseline are left out."""
+    seconds_by_name = {entry['name']: entry['seconds'] for entry in baseline}
+
+    comparisons = []
+    for entry in results:
+        if entry['name'] not in seconds_by_name:
+            continue
+        ratio = entry['seconds'] / seconds_by_name[entry['name']]
+        comparisons.append({
+            'name': entry['name'],
+            'seconds': entry['seconds'],
+            'baseline': seconds_by_name[entry['name']],
+            'ratio': ratio,
+            'regressed': ratio > 1 + tolerance,
+        })
+    return comparisons
+
+
+def parse_size(text):
+    width, height = text.split('x')
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m imperfect.draw.bench', description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--output', help='write the results as json lines to this file')
+    parser.add_argument('--baseline', help='compare the results to the json lines in this file')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per case, the best one is kept')
+    parser.add_argument('--size', type=parse_size, action='append', help='form size as WxH, can be given more than once')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='slowdown that counts as a regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.size or SIZES, args.repeat)
+    if args.output:
+        jsonl.dump(results, args.output)
+
+    if not args.baseline:
+        for entry in results:
+            print(f"{entry['name']:<48} {entry['mpx_per_s']:>10.2f} Mpx/s")
+        return 0
+
+    comparisons = compare(results, jsonl.load(args.baseline), args.tolerance)
+    for entry in comparisons:
+        flag = 'SLOWER' if entry['regressed'] else ''
+        print(f"{entry['name']:<48} {entry['seconds'] * 1000:>10.3f} ms {entry['ratio']:>6.2f}x {flag}")
+    return 1 if any(entry['regressed'] for entry in comparisons) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import ctypes
 
+from concurrent.futures import Executor
 from dataclasses import dataclass
-from enum import IntEnum, auto
 
 from .color import Color
+from .convert import bits_of, needs_conversion, pixels_of
+from .rules import PORTER_DUFF, RULES, CombinationRule, combine
 
 """Exploring some of smalltalk's graphics primitives here"""
 
@@ -18,23 +20,71 @@ def sign(val):
     return 0
 
 
-class CombinationRule(IntEnum):
-    ALL_ZEROS                            = 0
-    SOURCE_AND_DESTINATION               = 1
-    SOURCE_AND_DESTINATION_INVERT        = 2
-    SOURCE_ONLY                          = 3
-    SOURCE_INVERT_AND_DESTINATION        = 4
-    DESTINATION_ONLY                     = 5
-    SOURCE_XOR_DESTINATION               = 6
-    SOURCE_OR_DESTINATION                = 7
-    SOURCE_INVERT_AND_DESTINATION_INVERT = 8
-    SOURCE_INVERT_XOR_DESTINATION        = 9
-    DESTINATION_INVERT                   = 10
-    SOURCE_OR_DESTINATION_INVERT         = 11
-    SOURCE_INVERT                        = 12
-    SOURCE_INVERT_OR_DESTINATION         = 13
-    SOURCE_INVERT_OR_DESTINATION_INVERT  = 14
-    ALL_ONES                             = 15
+def line_points(from_x, from_y, to_x, to_y):
+    """Return the points of a bresenham line after (from_x, from_y) up to and
+    including (to_x, to_y)."""
+    x_delta = to_x - from_x
+    y_delta = to_y - from_y
+    dx = sign(x_delta)
+    dy = sign(y_delta)
+    px = abs(y_delta)
+    py = abs(x_delta)
+
+    x, y = from_x, from_y
+    points = []
+    if py > px:
+        # more horizontal
+        p = py // 2
+        for _ in range(py):
+            x += dx
+            p = p - px
+            if p < 0:
+                y += dy
+                p += py
+            points.append((x, y))
+    else:
+        # more vertical
+        p = px // 2
+        for _ in range(px):
+            y += dy
+            p = p - py
+            if p < 0:
+                x += dx
+                p += px
+            points.append((x, y))
+    return points
+
+
+def merge_spans(spans):
+    """Merge sorted (start, stop) spans that overlap or touch."""
+    merged = []
+    for start, stop in spans:
+        if merged and start <= merged[-1][1]:
+            if stop > merged[-1][1]:
+                merged[-1][1] = stop
+            continue
+        merged.append([start, stop])
+    return merged
+
+
+def brush_spans(points, width, height):
+    """Return the (y, x_start, x_stop) spans covered by stamping a width x
+    height brush at every point, every pixel is covered by a single span."""
+    starts_by_y = {}
+    for x, y in points:
+        starts_by_y.setdefault(y, set()).add(x)
+
+    rows = {}
+    for y, starts in starts_by_y.items():
+        stamp_spans = merge_spans((x, x + width) for x in sorted(starts))
+        for row in range(y, y + height):
+            rows.setdefault(row, []).extend(stamp_spans)
+
+    spans = []
+    for y in sorted(rows):
+        for start, stop in merge_spans(sorted(rows[y])):
+            spans.append((y, start, stop))
+    return spans
 
 
 class BitBltError(Exception):
@@ -44,8 +94,8 @@ class BitBltError(Exception):
 @dataclass
 class BitBlt:
     destination: Form
-    source: Form
-    fill: Color
+    source: Form|None
+    fill: Color|Form|None
     combination_rule: CombinationRule
     destination_x: int
     destination_y: int
@@ -57,13 +107,28 @@ class BitBlt:
     clip_y: int = 0
     clip_w: int|None = None
     clip_h: int|None = None
+    executor: Executor|None = None
+    band_height: int = 64
+
+    # blits performed by every bitblt so far, for profiling
+    blits = 0
 
     def __post_init__(self):
-        if self.destination.depth != self.source.depth:
+        # forms of different depths are converted while copying, but a
+        # halftone pattern has to match its destination unless that has a
+        # bit per pixel.
+        is_pattern = self.fill is not None and not isinstance(self.fill, Color)
+        if is_pattern and self.destination.bits_per_pixel != 1 and needs_conversion(self.fill, self.destination):
             raise BitBltError(
-                f'There is no support for forms with different color formats. source={self.source.color_format}, destination={self.destination.color_format}'
+                f'There is no support for halftones with different color formats. fill={self.fill.bits_per_pixel}, destination={self.destination.bits_per_pixel}'
             )
 
+        if self.source is None and self.fill is None:
+            raise BitBltError('bitblt needs a source form, a fill or both')
+
+        if self.combination_rule in PORTER_DUFF and self.destination.bits_per_pixel != 32:
+            raise BitBltError(f'compositing rule={self.combination_rule.name} needs a 32 bit destination')
+
         self.clip_w = (self.clip_w or self.destination.w)
         self.clip_h = (self.clip_h or self.destination.h)
 
@@ -74,65 +139,120 @@ class BitBlt:
         # draw down or left to right
         # so we check both points and if from point is to the right
         # we swap start and stop
-
-        print(f'drawing from ({from_x},{from_y}) to ({to_x},{to_y})')
         is_forward = ((from_y == to_y) and (from_x < to_x)) or (from_y < to_y)
         if not is_forward:
-            print('not forward, swaping points')
             from_x, to_x = to_x, from_x
             from_y, to_y = to_y, from_y
 
+        self.stamp(line_points(from_x, from_y, to_x, to_y))
+
+    def draw_polyline(self, points):
+        # unlike draw_line the first point is drawn too, so a polyline with a
+        # single point is a dot.
+        points = iter(points)
+        first = next(points, None)
+        if first is None:
+            return
+
+        stamps = [first]
+        for point in points:
+            stamps.extend(line_points(*stamps[-1], *point))
+        self.stamp(stamps)
+
+    def stamp(self, points):
+        # a brush that is only a fill gets its stamps merged into horizontal
+        # spans so that every pixel in the stroke is written once, a brush
+        # with a source form is copied at every point.
         if self.source is None:
-            self.destination_x = from_x
-            self.destination_y = from_y
-        else:
-            self.width = self.source.w
-            self.height = self.source.h
-            offset_x, offset_y = self.source.offset
-            self.destination_x = from_x + offset_x
-            self.destination_y = from_y + offset_y
-
-        x_delta = to_x - from_x
-        y_delta = to_y - from_y
-        self.draw_loop_xy(x_delta, y_delta)
-
-    def draw_loop_xy(self, x_delta, y_delta):
-        dx = sign(x_delta)
-        dy = sign(y_delta)
-        px = abs(y_delta)
-        py = abs(x_delta)
-
-        if py > px:
-            # more horizontal
-            p = py // 2
-            for i in range(0, py):
-                self.destination_x += dx
-                p = p - px
-                if p < 0:
-                    self.destination_y += dy
-                    p += py
-                if i < py:
-                    # print(f'drawing at x={self.destination_x},y={self.destination_y}')
-                    self.copy_bits()
-        else:
-            # more vertical
-            p = px // 2
-            for i in range(0, px):
-                self.destination_y += dy
-                p = p - py
-                if p < 0:
-                    self.destination_x += dx
-                    p += px
-                if i < px:
-                    # print(f'drawing at x={self.destination_x},y={self.destination_y}')
-                    self.copy_bits()
+            self.fill_spans(brush_spans(points, self.width, self.height))
+            return
+
+        self.width = self.source.w
+        self.height = self.source.h
+        offset_x, offset_y = self.source.offset
+        for x, y in points:
+            self.destination_x = x + offset_x
+            self.destination_y = y + offset_y
+            self.copy_bits()
+
+    def fill_spans(self, spans):
+        # fill horizontal runs (y, x_start, x_stop) of the destination with the
+        # halftone under the combination rule, each run is a single row write.
+        BitBlt.blits += 1
+        if self.combination_rule == CombinationRule.DESTINATION_ONLY:
+            return
+
+        self.clip_to_destination()
+        clip_left = self.clip_x
+        clip_right = self.clip_x + self.clip_w
+        clip_top = self.clip_y
+        clip_bottom = self.clip_y + self.clip_h
+
+        if self.destination.bits_per_pixel == 1:
+            self.fill_packed_spans(spans, clip_left, clip_top, clip_right, clip_bottom)
+            return
+
+        depth = self.destination.depth
+        pitch = self.destination.pitch
+        destination = memoryview(self.destination.bitmap)
+        halftone = [memoryview(row) for row in self.halftone_rows(0, self.destination.w)]
+        rule = self.combination_rule
+        left, top, right, bottom = clip_right, clip_bottom, clip_left, clip_top
+
+        for y, x_start, x_stop in spans:
+            if y < clip_top or y >= clip_bottom:
+                continue
+
+            x_start = max(x_start, clip_left)
+            x_stop = min(x_stop, clip_right)
+            if x_start >= x_stop:
+                continue
+
+            left, right = min(left, x_start), max(right, x_stop)
+            top, bottom = min(top, y), max(bottom, y + 1)
+
+            source_row = halftone[y % len(halftone)][x_start * depth:x_stop * depth]
+            destination_byte = (y * pitch) + (x_start * depth)
+            destination_row = destination[destination_byte:destination_byte + len(source_row)]
+            if rule == CombinationRule.SOURCE_ONLY:
+                destination_row[:] = source_row
+            else:
+                destination_row[:] = combine(rule, source_row, destination_row)
+
+        self.destination.damage(left, top, right - left, bottom - top)
+
+    def fill_packed_spans(self, spans, clip_left, clip_top, clip_right, clip_bottom):
+        halftone = self.halftone_bits(0, self.destination.w)
+        combination = RULES[self.combination_rule]
+        left, top, right, bottom = clip_right, clip_bottom, clip_left, clip_top
+
+        for y, x_start, x_stop in spans:
+            if y < clip_top or y >= clip_bottom:
+                continue
+
+            x_start = max(x_start, clip_left)
+            x_stop = min(x_stop, clip_right)
+            width = x_stop - x_start
+            if width <= 0:
+                continue
+
+            left, right = min(left, x_start), max(right, x_stop)
+            top, bottom = min(top, y), max(bottom, y + 1)
+
+            ones = (1 << width) - 1
+            source_bits = (halftone[y % len(halftone)] >> (self.destination.w - x_stop)) & ones
+            destination_bits = self.destination.row_bits(x_start, y, width)
+            self.destination.write_row_bits(x_start, y, width, combination(source_bits, destination_bits, ones))
+
+        self.destination.damage(left, top, right - left, bottom - top)
 
     def copy_bits(self):
+        BitBlt.blits += 1
         self.clip_range()
         self.check_overlap()
         self.copy_loop()
 
-    def clip_range(self):
+    def clip_to_destination(self):
         # if clipping rectangle is outside the destination image (left)
         # we discard the region to the left of the destination
         if self.clip_x < 0:
@@ -152,6 +272,9 @@ class BitBlt:
         if self.clip_y + self.clip_h > self.destination.h:
             self.clip_h = self.destination.h - self.clip_y
 
+    def clip_range(self):
+        self.clip_to_destination()
+
         ## clip and adjust source origing and extent
         # in X
         if self.destination_x >= self.clip_x:
@@ -164,7 +287,7 @@ class BitBlt:
             self.dx = self.clip_x
 
         if (self.dx + self.w) > (self.clip_x + self.clip_w):
-            self.w = self.w - ((self.dx - self.w) - (self.clip_x + self.clip_w))
+            self.w = self.w - ((self.dx + self.w) - (self.clip_x + self.clip_w))
 
         # in Y
         if self.destination_y >= self.clip_y:
@@ -205,93 +328,237 @@ class BitBlt:
 
         # guaranteed no overlap between source and destination
         # return early!
-        if self.source != self.destination:
+        if self.source is None or not self.source.shares_bitmap(self.destination):
             return
 
-        # otherwise, there could be an overlap and we want to set
-        # things up so that we don't destroy the data as it's moved.
-        #
+        # otherwise, there could be an overlap and we want to set things up so
+        # that we don't destroy the data as it's moved. views of one form are
+        # compared where they sit in the form at the root of their views.
+        source_x, source_y = self.source.root_point(self.sx, self.sy)
+        destination_x, destination_y = self.destination.root_point(self.dx, self.dy)
+
         # data moving down: copy starts at bottom and move up
-        if self.dy > self.sy:
+        if destination_y > source_y:
             self.vertical_direction = -1
-            self.sy = self.sy + self.h - 1
-            self.dy = self.dy + self.h - 1
         # data moving up:   copy starts at top and move down (uses default vert dir)
 
-        # data moving right: copy starts from the right and move left.
-        if self.dx > self.sx:
+        # data moving right: copy starts from the right and move left. rows
+        # are moved with memmove or read whole before they are written, so
+        # this only matters to the order of the rows.
+        if destination_x > source_x:
             self.horizontal_direction = -1
-            self.sx = self.sx + self.w - 1
-            self.dx = self.dx + self.w - 1
-        # data moving left:  copy starts from the left and move right (uses default hor dir)
+
+    def rows(self):
+        if self.vertical_direction < 0:
+            return range(self.h - 1, -1, -1)
+        return range(self.h)
 
     def copy_loop(self):
-        # TODO support copying data inside the same image using vertical and horizontal direction
-
-        # sx, sy, w, h
-        # dx, dy, w, h
-        sy_stop = self.sy + self.h
-        while self.sy < sy_stop:
-            self.merge()
-            self.sy += 1
-            self.dy += 1
-
-    def merge(self):
-        # TODO support other combination rules
-        # TODO support color attribute
-        source_bytes = self.source.row_bytes(self.sx, self.sy, self.w)
-        destination_bytes = self.destination.row_bytes(self.dx, self.dy, self.w)
-
-        match self.combination_rule:
-            case CombinationRule.ALL_ZEROS:
-                self.destination.put_row_bytes(self.dx, self.dy, bytes(len(destination_bytes)*[0x00]))
-            case CombinationRule.ALL_ONES:
-                self.destination.put_row_bytes(self.dx, self.dy, bytes(len(destination_bytes)*[0xff]))
-            case CombinationRule.SOURCE_ONLY:
-                self.destination.put_row_bytes(self.dx, self.dy, source_bytes)
-            case CombinationRule.SOURCE_INVERT:
-                result = (~int.from_bytes(source_bytes)).to_bytes(self.w * self.source.depth)
-                self.destination.put_row_bytes(self.dx, self.dy, result)
-            case CombinationRule.DESTINATION_INVERT:
-                result = (~int.from_bytes(destination_bytes)).to_bytes(self.w * self.destination.depth)
-                self.destination.put_row_bytes(self.dx, self.dy, result)
-            case _:
-                raise BitBltError(f'unsupported combination rule={self.combination_rule}')
-
-    def _merge_pixel_bytes(self, source_bytes, destination_bytes):
-        if len(source_bytes) != len(destination_bytes):
-            raise BitBltError("source and destination length do not match!")
-
-        match self.combination_rule:
-            case CombinationRule.ALL_ZEROS:
-                return bytearray(len(source_bytes) * [0x00])
-            case CombinationRule.SOURCE_AND_DESTINATION:
-                return bytearray(s & d for s, d in zip(source_bytes, destination_bytes))
-            case CombinationRule.SOURCE_AND_DESTINATION_INVERT:
-                return bytearray(s & ~d for s, d in zip(source_bytes, destination_bytes))
-            case CombinationRule.SOURCE_ONLY:
-                return source_bytes
-            case CombinationRule.SOURCE_INVERT_AND_DESTINATION:
-                return bytearray(~s & d for s, d in zip(source_bytes, destination_bytes))
-            case CombinationRule.DESTINATION_ONLY:
-                return destination_bytes
-            case CombinationRule.SOURCE_XOR_DESTINATION:
-                return bytearray(s ^ d for s, d in zip(source_bytes, destination_bytes))
-            case CombinationRule.SOURCE_OR_DESTINATION:
-                return bytearray(s | d for s, d in zip(source_bytes, destination_bytes))
-            case CombinationRule.SOURCE_INVERT_AND_DESTINATION_INVERT:
-                return bytearray(s & ~d for s, d in zip(source_bytes, destination_bytes))
-            case CombinationRule.SOURCE_INVERT_XOR_DESTINATION:
-                return bytearray(~s ^ d for s, d in zip(source_bytes, destination_bytes))
-            case CombinationRule.DESTINATION_INVERT:
-                return bytearray(~d for d in destination_bytes)
-            case CombinationRule.SOURCE_OR_DESTINATION_INVERT:
-                return bytearray(s | ~d for s, d in zip(source_bytes, destination_bytes))
-            case CombinationRule.SOURCE_INVERT:
-                return bytearray(~s for s in source_bytes)
-            case CombinationRule.SOURCE_INVERT_OR_DESTINATION:
-                return bytearray(~s | d for s, d in zip(source_bytes, destination_bytes))
-            case CombinationRule.SOURCE_INVERT_OR_DESTINATION_INVERT:
-                return bytearray(~s | ~d for s, d in zip(source_bytes, destination_bytes))
-            case CombinationRule.ALL_ONES:
-                return bytearray(len(source_bytes) * [0x01])
+        if self.w <= 0 or self.h <= 0:
+            return
+
+        if self.combination_rule == CombinationRule.DESTINATION_ONLY:
+            return
+
+        self.destination.damage(self.dx, self.dy, self.w, self.h)
+
+        if self.destination.bits_per_pixel == 1:
+            self.halftone = self.halftone_bits(self.dx, self.w)
+            self.copy_packed()
+            return
+
+        self.halftone = self.halftone_rows(self.dx, self.w)
+        if self.executor is not None and self.can_copy_bands():
+            self.copy_bands()
+            return
+
+        self.copy_block()
+
+    def copy_block(self):
+        # work straight on the bitmaps, when rows span the full width of both
+        # forms they are contiguous in memory and the whole block is handled
+        # as a single row. memoryview assignment is a memmove, so a block
+        # moved inside one bitmap (scrolling) stays intact as long as its rows
+        # are visited in the direction set up by check_overlap.
+        depth = self.destination.depth
+        destination_pitch = self.destination.pitch
+        row_length = self.w * depth
+        rows = self.rows()
+
+        destination = memoryview(self.destination.bitmap)
+        destination_origin = (self.dy * destination_pitch) + (self.dx * depth)
+
+        converting = self.source is not None and needs_conversion(self.source, self.destination)
+        if self.source is not None and not converting:
+            source = memoryview(self.source.bitmap)
+            source_pitch = self.source.pitch
+            source_origin = (self.sy * source_pitch) + (self.sx * depth)
+
+            if self.halftone is None and row_length == source_pitch == destination_pitch:
+                row_length *= self.h
+                rows = range(1)
+
+        rule = self.combination_rule
+        for row in rows:
+            if self.source is None:
+                source_row = self.halftone_row(self.dy + row)
+            elif converting:
+                source_row = self.masked_by_halftone(
+                    pixels_of(self.source, self.sx, self.sy + row, self.w, self.destination),
+                    self.dy + row
+                )
+            else:
+                source_byte = source_origin + (row * source_pitch)
+                source_row = self.masked_by_halftone(
+                    source[source_byte:source_byte + row_length],
+                    self.dy + row
+                )
+
+            destination_byte = destination_origin + (row * destination_pitch)
+            destination_row = destination[destination_byte:destination_byte + row_length]
+            if rule == CombinationRule.SOURCE_ONLY:
+                destination_row[:] = source_row
+            else:
+                destination_row[:] = combine(rule, source_row, destination_row)
+
+    def can_copy_bands(self):
+        # only plain copies and fills split into bands, they are a memmove per
+        # row that runs without the GIL. blits inside one bitmap have to go
+        # row by row in order, so they stay on the calling thread.
+        if self.combination_rule != CombinationRule.SOURCE_ONLY or self.h < 2 * self.band_height:
+            return False
+        if self.source is None:
+            return True
+        if self.halftone is not None or needs_conversion(self.source, self.destination):
+            return False
+        if memoryview(self.source.bitmap).readonly:
+            return False
+        return not self.source.shares_bitmap(self.destination)
+
+    def copy_bands(self):
+        # split the clipped rectangle into bands of rows and copy each one on
+        # the executor with ctypes.memmove, which releases the GIL while it
+        # copies, unlike memoryview assignment.
+        destination_bytes = self.destination.bitmap_bytes
+        destination_address = ctypes.addressof(destination_bytes)
+        if self.source is None:
+            source_address = None
+            halftone = [bytes(row) for row in self.halftone]
+        else:
+            source_bytes = self.source.bitmap_bytes
+            source_address = ctypes.addressof(source_bytes)
+            halftone = None
+
+        bands = [
+            self.executor.submit(
+                self.copy_band,
+                destination_address,
+                source_address,
+                halftone,
+                top,
+                min(self.band_height, self.h - top),
+            )
+            for top in range(0, self.h, self.band_height)
+        ]
+        for band in bands:
+            band.result()
+
+    def copy_band(self, destination_address, source_address, halftone, top, height):
+        depth = self.destination.depth
+        destination_pitch = self.destination.pitch
+        row_length = self.w * depth
+        destination_byte = ((self.dy + top) * destination_pitch) + (self.dx * depth)
+
+        if source_address is None:
+            for row in range(top, top + height):
+                source_row = halftone[(self.dy + row) % len(halftone)]
+                ctypes.memmove(destination_address + destination_byte, source_row, row_length)
+                destination_byte += destination_pitch
+            return
+
+        source_pitch = self.source.pitch
+        source_byte = ((self.sy + top) * source_pitch) + (self.sx * depth)
+        if row_length == source_pitch == destination_pitch:
+            row_length *= height
+            height = 1
+
+        for _ in range(height):
+            ctypes.memmove(destination_address + destination_byte, source_address + source_byte, row_length)
+            destination_byte += destination_pitch
+            source_byte += source_pitch
+
+    def copy_packed(self):
+        # 1 bit destinations are combined a row of bits at a time, sources of
+        # other depths are turned into bits on the way. each source row is
+        # read before its destination row is written.
+        combination = RULES[self.combination_rule]
+        ones = (1 << self.w) - 1
+
+        for row in self.rows():
+            if self.source is None:
+                source_bits = self.halftone[(self.dy + row) % len(self.halftone)]
+            else:
+                source_bits = bits_of(self.source, self.sx, self.sy + row, self.w, self.destination)
+                if self.halftone is not None:
+                    source_bits &= self.halftone[(self.dy + row) % len(self.halftone)]
+
+            destination_bits = self.destination.row_bits(self.dx, self.dy + row, self.w)
+            self.destination.write_row_bits(
+                self.dx,
+                self.dy + row,
+                self.w,
+                combination(source_bits, destination_bits, ones)
+            )
+
+    def halftone_rows(self, x, width):
+        # like smalltalk's halftone form, the fill is tiled across the
+        # destination, anchored at its origin so neighbouring blits line up.
+        # each row of the pattern is tiled once per blit into a row of width
+        # pixels starting at destination x.
+        if self.fill is None:
+            return None
+
+        if isinstance(self.fill, Color):
+            return [self.destination.pixel_bytes(self.fill) * width]
+
+        pattern = self.fill
+        depth = pattern.depth
+        phase = x % pattern.w
+        repeats = (phase + width + pattern.w - 1) // pattern.w
+
+        rows = []
+        for y in range(pattern.h):
+            tiled = pattern.row_bytes(0, y, pattern.w) * repeats
+            rows.append(tiled[phase * depth:(phase + width) * depth])
+        return rows
+
+    def halftone_bits(self, x, width):
+        # the halftone of a 1 bit destination, a row of bits per pattern row
+        if self.fill is None:
+            return None
+
+        if isinstance(self.fill, Color):
+            return [((1 << width) - 1) * self.destination.bit_of(self.fill)]
+
+        pattern = self.fill
+        phase = x % pattern.w
+        repeats = (phase + width + pattern.w - 1) // pattern.w
+
+        rows = []
+        for y in range(pattern.h):
+            bits = format(bits_of(pattern, 0, y, pattern.w, self.destination), f'0{pattern.w}b')
+            rows.append(int((bits * repeats)[phase:phase + width], 2))
+        return rows
+
+    def halftone_row(self, destination_y):
+        return self.halftone[destination_y % len(self.halftone)]
+
+    def masked_by_halftone(self, source_bytes, destination_y):
+        # with both a source and a fill the source is masked by the halftone
+        if self.halftone is None:
+            return source_bytes
+        return combine(
+            CombinationRule.SOURCE_AND_DESTINATION,
+            self.halftone_row(destination_y),
+            source_bytes
+        )
@@ -12,6 +12,16 @@ class Color:
     def values(self):
         return [self.a, self.b, self.g, self.r]
 
+    def premultiplied(self):
+        """Return this color with r, g and b scaled by its alpha, the form
+        compositing rules expect."""
+        return Color(
+            (self.r * self.a + 127) // 255,
+            (self.g * self.a + 127) // 255,
+            (self.b * self.a + 127) // 255,
+            self.a,
+        )
+
     @classmethod
     def from_values(cls, values):
         alpha, blue, green, red = values
@@ -0,0 +1,79 @@
+"""
+Convert rows of pixels between the depths a form can have: 32 bit colors,
+8 bit indices into a palette and 1 bit packed into words.
+
+Conversions work on a whole row at a time with table lookups and bytes
+operations, never through a Color per pixel.
+"""
+
+import sys
+
+from functools import lru_cache
+
+
+# maps the 0 and 1 bytes of a row of flags to the ascii digits int() parses
+ASCII_BITS = bytes.maketrans(b'\x00\x01', b'01')
+
+
+def pixel_value(color):
+    """Return the pixel of a 32 bit form for color as a native uint32, the
+    way a memoryview cast to 'I' reads it."""
+    return int.from_bytes(bytes(color.values), sys.byteorder)
+
+
+def needs_conversion(source, destination):
+    if source.bits_per_pixel != destination.bits_per_pixel:
+        return True
+    return source.bits_per_pixel == 8 and source.palette is not destination.palette
+
+
+def bits_of(form, x, y, width, destination):
+    """Return width pixels of a row of form as an int with a bit per pixel,
+    the leftmost pixel in the most significant bit. Pixels of 32 and 8 bit
+    forms are set unless they are the background of the 1 bit destination."""
+    if width <= 0:
+        return 0
+
+    if form.bits_per_pixel == 1:
+        return form.row_bits(x, y, width)
+
+    row = form.row_bytes(x, y, width)
+    if form.bits_per_pixel == 8:
+        flags = row.translate(form.ink_table(destination.background))
+    else:
+        background = pixel_value(destination.background)
+        flags = bytes(map(background.__ne__, memoryview(row).cast('I')))
+    return int(flags.translate(ASCII_BITS), 2)
+
+
+def pixels_of(form, x, y, width, destination):
+    """Return width pixels of a row of form as bytes in the format of the 32
+    or 8 bit destination."""
+    if form.bits_per_pixel == 1:
+        table = expansion_table(
+            destination.pixel_bytes(form.foreground),
+            destination.pixel_bytes(form.background)
+        )
+        padding = -width % 8
+        packed = (form.row_bits(x, y, width) << padding).to_bytes((width + padding) // 8)
+        return b''.join(map(table.__getitem__, packed))[:width * destination.depth]
+
+    row = form.row_bytes(x, y, width)
+    if form.bits_per_pixel == 8:
+        if destination.bits_per_pixel == 8:
+            return row.translate(destination.index_table(form.palette))
+        return b''.join(map(form.color_table().__getitem__, row))
+
+    if destination.bits_per_pixel == 32:
+        return bytes(row)
+    return bytes(map(destination.indices.__getitem__, memoryview(row).cast('I')))
+
+
+@lru_cache(maxsize=64)
+def expansion_table(foreground, background):
+    # the 8 pixels each byte of a 1 bit row expands to
+    pixels = (background, foreground)
+    return [
+        b''.join(pixels[(byte >> bit) & 1] for bit in range(7, -1, -1))
+        for byte in range(256)
+    ]
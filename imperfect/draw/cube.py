@@ -0,0 +1,123 @@
+"""
+Find the nearest color of a palette quickly.
+
+rgb space is split into 32x32x32 cells, and those into blocks of 4x4x4
+cells. The first time a color falls in a cell the palette entries that
+could be nearest to any color inside it are worked out, usually just a few,
+from the ones that could be nearest to any color in its block, and every
+color in the cell after that is compared against those alone.
+"""
+
+from itertools import compress
+from operator import add
+
+
+CELL_BITS = 5
+CELL_SHIFT = 8 - CELL_BITS
+CELL_SIZE = 1 << CELL_SHIFT
+
+BLOCK_BITS = 3
+BLOCK_SHIFT = 8 - BLOCK_BITS
+
+# palettes whose cubes are kept, past this the oldest one is dropped
+MAX_CUBES = 16
+
+
+def cell_of(r, g, b):
+    return ((r >> CELL_SHIFT) << (2 * CELL_BITS)) | ((g >> CELL_SHIFT) << CELL_BITS) | (b >> CELL_SHIFT)
+
+
+def distances(values, size=CELL_SIZE):
+    """Return the squared distances of values to the nearest and farthest
+    point of every stretch of size along a channel."""
+    nearest = []
+    farthest = []
+    for low in range(0, 256, size):
+        high = low + size - 1
+        nearest.append([max(low - value, value - high, 0) ** 2 for value in values])
+        farthest.append([max(value - low, high - value) ** 2 for value in values])
+    return nearest, farthest
+
+
+class ColorCube:
+    """The index of the nearest color of a palette for any color."""
+
+    cubes = {}
+
+    def __init__(self, palette):
+        self.palette = palette
+        self.rgb = [(color.r, color.g, color.b) for color in palette]
+        self.cells = [None] * (1 << (3 * CELL_BITS))
+        self.blocks = [None] * (1 << (3 * BLOCK_BITS))
+
+        channels = [distances(values) for values in zip(*self.rgb)]
+        self.nearest = [nearest for nearest, _ in channels]
+        self.farthest = [farthest for _, farthest in channels]
+
+        channels = [distances(values, 1 << BLOCK_SHIFT) for values in zip(*self.rgb)]
+        self.block_nearest = [nearest for nearest, _ in channels]
+        self.block_farthest = [farthest for _, farthest in channels]
+
+    @classmethod
+    def of(cls, palette):
+        """Return the cube of palette, made once per palette."""
+        cube = cls.cubes.get(id(palette))
+        if cube is None or cube.palette is not palette:
+            cube = cls(palette)
+            cls.cubes[id(palette)] = cube
+            if len(cls.cubes) > MAX_CUBES:
+                del cls.cubes[next(iter(cls.cubes))]
+        return cube
+
+    def candidates_of(self, cell):
+        # an entry can only be nearest to some color in the cell when it's
+        # closer to the cell than the farthest point of the cell is from the
+        # entry which is closest to all of it. Only the candidates of the
+        # cell's block can be candidates of the cell.
+        candidates = self.cells[cell]
+        if candidates is not None:
+            return candidates
+
+        mask = (1 << CELL_BITS) - 1
+        r, g, b = cell >> (2 * CELL_BITS), (cell >> CELL_BITS) & mask, cell & mask
+        shift = CELL_BITS - BLOCK_BITS
+        block = self.block_candidates_of(r >> shift, g >> shift, b >> shift)
+
+        nr, ng, nb = self.nearest[0][r], self.nearest[1][g], self.nearest[2][b]
+        fr, fg, fb = self.farthest[0][r], self.farthest[1][g], self.farthest[2][b]
+        bound = min([fr[i] + fg[i] + fb[i] for i in block])
+        candidates = [i for i in block if nr[i] + ng[i] + nb[i] <= bound]
+        self.cells[cell] = candidates
+        return candidates
+
+    def block_candidates_of(self, r, g, b):
+        block = (r << (2 * BLOCK_BITS)) | (g << BLOCK_BITS) | b
+        candidates = self.blocks[block]
+        if candidates is not None:
+            return candidates
+
+        nearest = list(map(add, map(add, self.block_nearest[0][r], self.block_nearest[1][g]), self.block_nearest[2][b]))
+        farthest = map(add, map(add, self.block_farthest[0][r], self.block_farthest[1][g]), self.block_farthest[2][b])
+        candidates = list(compress(range(len(nearest)), map(min(farthest).__ge__, nearest)))
+        self.blocks[block] = candidates
+        return candidates
+
+    def index_of_rgb(self, r, g, b):
+        cell = cell_of(r, g, b)
+        candidates = self.cells[cell] or self.candidates_of(cell)
+        if len(candidates) == 1:
+            return candidates[0]
+
+        # the first of the nearest ones wins, like min would pick
+        rgb = self.rgb
+        nearest = None
+        nearest_distance = 1 << 20
+        for i in candidates:
+            pr, pg, pb = rgb[i]
+            distance = (pr - r) * (pr - r) + (pg - g) * (pg - g) + (pb - b) * (pb - b)
+            if distance < nearest_distance:
+                nearest, nearest_distance = i, distance
+        return nearest
+
+    def index_of(self, color):
+        return self.index_of_rgb(color.r, color.g, color.b)
@@ -0,0 +1,290 @@
+"""
+Record drawing commands and replay them later onto any form.
+
+A display list holds blits, fills, pen strokes and scrolls instead of
+running them. Before replaying it can drop the commands whose pixels are
+completely overwritten by a later command, and a replay can be clipped to
+a damaged rectangle so only the commands that touch it run, like redrawing
+after an expose.
+
+    commands = DisplayList()
+    commands.fill(0, 0, 640, 480, Palette.BLACK)
+    pen.record_into(commands)
+    ...
+    commands.optimize()
+    commands.replay(screen, clip=Rect(0, 0, 64, 64))
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from .bitblt import BitBlt
+from .color import Color
+from .rect import Rect, bounding_rect
+from .rules import OPAQUE_RULES, CombinationRule
+
+
+def run(form, clip, **kwargs):
+    # a bitblt clipped to the part of clip inside form
+    clip = clip.intersect(Rect(0, 0, form.w, form.h))
+    return BitBlt(
+        destination=form,
+        clip_x=clip.x,
+        clip_y=clip.y,
+        clip_w=clip.w,
+        clip_h=clip.h,
+        **kwargs
+    )
+
+
+@dataclass(slots=True)
+class Blit:
+    source: Form|None
+    fill: Color|Form|None
+    rule: CombinationRule
+    x: int
+    y: int
+    source_x: int
+    source_y: int
+    w: int
+    h: int
+    # the form the blit was recorded for, when it's known
+    destination: Form|None = field(default=None, repr=False, compare=False)
+
+    @property
+    def bounds(self):
+        rect = Rect(self.x, self.y, self.w, self.h)
+        if self.source is None:
+            return rect
+        return rect.intersect(Rect(self.x - self.source_x, self.y - self.source_y, self.source.w, self.source.h))
+
+    @property
+    def is_opaque(self):
+        return self.rule in OPAQUE_RULES
+
+    @property
+    def reads(self):
+        reads = [] if self.is_opaque else [self.bounds]
+        if self.source is not None and self.destination is not None and self.source.shares_bitmap(self.destination):
+            # copying within the form reads the pixels under the source
+            bounds = self.bounds
+            source_x, source_y = self.source.root_point(
+                self.source_x + bounds.x - self.x,
+                self.source_y + bounds.y - self.y,
+            )
+            origin_x, origin_y = self.destination.root_point(0, 0)
+            reads.append(Rect(source_x - origin_x, source_y - origin_y, bounds.w, bounds.h))
+        return reads
+
+    def replay(self, form, clip):
+        run(
+            form,
+            clip,
+            source=self.source,
+            fill=self.fill,
+            combination_rule=self.rule,
+            destination_x=self.x,
+            destination_y=self.y,
+            source_x=self.source_x,
+            source_y=self.source_y,
+            width=self.w,
+            height=self.h,
+        ).copy_bits()
+
+
+@dataclass(slots=True)
+class Stroke:
+    points: list[tuple[int, int]]
+    fill: Color|Form
+    rule: CombinationRule
+    w: int
+    h: int
+
+    @property
+    def bounds(self):
+        xs = [x for x, _ in self.points]
+        ys = [y for _, y in self.points]
+        return Rect(min(xs), min(ys), max(xs) - min(xs) + self.w, max(ys) - min(ys) + self.h)
+
+    @property
+    def is_opaque(self):
+        # a stroke doesn't cover its bounds, it can't hide anything
+        return False
+
+    @property
+    def reads(self):
+        return [] if self.rule in OPAQUE_RULES else [self.bounds]
+
+    def replay(self, form, clip):
+        run(
+            form,
+            clip,
+            source=None,
+            fill=self.fill,
+            combination_rule=self.rule,
+            destination_x=0,
+            destination_y=0,
+            source_x=0,
+            source_y=0,
+            width=self.w,
+            height=self.h,
+        ).draw_polyline(self.points)
+
+
+@dataclass(slots=True)
+class Scroll:
+    x: int
+    y: int
+    w: int
+    h: int
+    dx: int
+    dy: int
+
+    @property
+    def bounds(self):
+        return Rect(self.x, self.y, self.w, self.h)
+
+    @property
+    def is_opaque(self):
+        return False
+
+    @property
+    def reads(self):
+        return [self.bounds]
+
+    def replay(self, form, clip):
+        run(
+            form,
+            clip.intersect(self.bounds),
+            source=form,
+            fill=None,
+            combination_rule=CombinationRule.SOURCE_ONLY,
+            destination_x=self.x + self.dx,
+            destination_y=self.y + self.dy,
+            source_x=self.x,
+            source_y=self.y,
+            width=self.w,
+            height=self.h,
+        ).copy_bits()
+
+
+class DisplayList:
+    """A list of drawing commands, in the order they are drawn."""
+
+    def __init__(self):
+        self.commands = []
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __iter__(self):
+        return iter(self.commands)
+
+    def clear(self):
+        self.commands = []
+
+    def record(self, command):
+        if getattr(command, 'rule', None) == CombinationRule.DESTINATION_ONLY:
+            return
+        if command.bounds.is_empty:
+            return
+        self.commands.append(command)
+
+    def record_bitblt(self, bitblt):
+        """Record what bitblt.copy_bits would draw, clipping is left to the
+        replay."""
+        self.blit(
+            bitblt.source,
+            bitblt.destination_x,
+            bitblt.destination_y,
+            bitblt.source_x,
+            bitblt.source_y,
+            bitblt.width,
+            bitblt.height,
+            bitblt.combination_rule,
+            bitblt.fill,
+            bitblt.destination,
+        )
+
+    def blit(self, source, x, y, source_x=0, source_y=0, w=None, h=None, rule=CombinationRule.SOURCE_ONLY, fill=None, destination=None):
+        """Record a blit of source, destination is the form it will be
+        replayed onto when source is that form or a view of it."""
+        self.record(Blit(
+            source=source,
+            fill=fill,
+            rule=rule,
+            x=x,
+            y=y,
+            source_x=source_x,
+            source_y=source_y,
+            w=source.w if w is None else w,
+            h=source.h if h is None else h,
+            destination=destination,
+        ))
+
+    def fill(self, x, y, w, h, fill, rule=CombinationRule.SOURCE_ONLY):
+        self.record(Blit(source=None, fill=fill, rule=rule, x=x, y=y, source_x=0, source_y=0, w=w, h=h))
+
+    def stroke(self, points, fill, w=1, h=1, rule=CombinationRule.SOURCE_ONLY):
+        """Record a polyline drawn with a w x h brush, a stroke that starts
+        where the last one ended with the same brush continues it."""
+        points = list(points)
+        if not points:
+            return
+
+        last = self.commands[-1] if self.commands else None
+        continues = (
+            isinstance(last, Stroke) and
+            rule in OPAQUE_RULES and
+            (last.fill, last.rule, last.w, last.h) == (fill, rule, w, h) and
+            last.points[-1] == points[0]
+        )
+        if continues:
+            last.points.extend(points[1:])
+            return
+        self.record(Stroke(points=points, fill=fill, rule=rule, w=w, h=h))
+
+    def scroll(self, x, y, w, h, dx, dy):
+        """Record moving the pixels of a rectangle by dx, dy inside it, like
+        Form.scroll on a view."""
+        self.record(Scroll(x, y, w, h, dx, dy))
+
+    def optimize(self):
+        """Drop the commands whose pixels are all overwritten by a later
+        command before anything reads them, return how many were dropped."""
+        kept = []
+        covers = []
+        for command in reversed(self.commands):
+            bounds = command.bounds
+            if any(cover.contains(bounds) for cover in covers):
+                continue
+
+            kept.append(command)
+            reads = command.reads
+            if reads:
+                covers = [cover for cover in covers if not any(cover.intersects(read) for read in reads)]
+            if command.is_opaque:
+                covers.append(bounds)
+
+        dropped = len(self.commands) - len(kept)
+        self.commands = kept[::-1]
+        return dropped
+
+    def replay(self, form, clip=None):
+        """Draw the commands onto form, when clip is given only the
+        commands that touch it are drawn and only inside it."""
+        if clip is None:
+            clip = Rect(0, 0, form.w, form.h)
+
+        # scrolls bring pixels from outside the clip into it, commands
+        # before them need to draw where those pixels come from too
+        clips = []
+        for command in reversed(self.commands):
+            clips.append(clip)
+            if isinstance(command, Scroll) and command.bounds.intersects(clip):
+                clip = bounding_rect([clip, command.bounds])
+
+        for command, command_clip in zip(self.commands, reversed(clips)):
+            if command.bounds.intersects(command_clip):
+                command.replay(form, command_clip)
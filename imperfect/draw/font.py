@@ -0,0 +1,242 @@
+"""
+Bitmap fonts drawn with bitblt.
+
+A font is loaded from a BDF file into a single 1 bit atlas form with every
+glyph in a cell of its own. Text is drawn by copying the cells of its
+glyphs next to each other into a run form, which is remembered (the most
+recently used ones are kept) so drawing the same text again is one blit.
+Runs with a background are opaque and copied as is, runs without one are
+composited over the destination through their alpha.
+
+    font = Font.default()
+    x = font.draw(screen, 4, 4, 'hello', Palette.WHITE)
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+
+from .bitblt import BitBlt, BitBltError
+from .color import Color
+from .form import BitForm, Form
+from .rect import Rect
+from .rules import CombinationRule
+
+
+FONTS = Path(__file__).parent / 'fonts'
+
+TRANSPARENT = Color(0, 0, 0, 0)
+
+
+class FontError(Exception):
+    """Raised for a font file that can't be read."""
+
+
+@dataclass
+class Glyph:
+    x: int
+    w: int
+    advance: int
+    # how far the cell reaches left of the pen, for glyphs which hang
+    # over the previous one
+    left: int = 0
+
+
+@dataclass
+class BdfGlyph:
+    codepoint: int
+    advance: int
+    w: int
+    h: int
+    x_offset: int
+    y_offset: int
+    rows: list[int]
+
+
+def parse_bdf(text):
+    """Return the ascent, descent and glyphs of a BDF font."""
+    ascent = descent = None
+    glyphs = []
+    lines = iter(text.splitlines())
+    for line in lines:
+        keyword, _, value = line.strip().partition(' ')
+        match keyword:
+            case 'FONT_ASCENT':
+                ascent = int(value)
+            case 'FONT_DESCENT':
+                descent = int(value)
+            case 'STARTCHAR':
+                glyphs.append(parse_bdf_glyph(lines))
+
+    if ascent is None or descent is None:
+        raise FontError('font has no FONT_ASCENT or FONT_DESCENT')
+    return ascent, descent, [glyph for glyph in glyphs if glyph.codepoint >= 0]
+
+
+def parse_bdf_glyph(lines):
+    codepoint = advance = bbx = None
+    for line in lines:
+        keyword, _, value = line.strip().partition(' ')
+        match keyword:
+            case 'ENCODING':
+                codepoint = int(value.split()[0])
+            case 'DWIDTH':
+                advance = int(value.split()[0])
+            case 'BBX':
+                bbx = [int(number) for number in value.split()]
+            case 'BITMAP':
+                break
+
+    if codepoint is None or advance is None or bbx is None:
+        raise FontError('glyph without ENCODING, DWIDTH or BBX')
+
+    w, h, x_offset, y_offset = bbx
+    padding = -w % 8
+    rows = []
+    for line in lines:
+        line = line.strip()
+        if line == 'ENDCHAR':
+            break
+        rows.append(int(line, 16) >> padding)
+    return BdfGlyph(codepoint, advance, w, h, x_offset, y_offset, rows)
+
+
+@dataclass
+class Font:
+    atlas: BitForm
+    glyphs: dict[str, Glyph]
+    ascent: int
+    descent: int
+    cache_size: int = 256
+
+    def __post_init__(self):
+        self.runs = OrderedDict()
+
+    @classmethod
+    def from_bdf(cls, text, **kwargs):
+        ascent, descent, parsed = parse_bdf(text)
+
+        # glyph cells sit next to each other, as wide as the glyph or its
+        # advance plus what hangs left of the pen, and are all as high as
+        # a line
+        cells = []
+        x = 0
+        for glyph in parsed:
+            left = -min(0, glyph.x_offset)
+            w = max(glyph.advance, glyph.x_offset + glyph.w, 1) + left
+            cells.append((glyph, Glyph(x, w, glyph.advance, left)))
+            x += w
+
+        atlas = BitForm(0, 0, max(x, 1), ascent + descent)
+        for glyph, cell in cells:
+            top = ascent - (glyph.y_offset + glyph.h)
+            for row, bits in enumerate(glyph.rows):
+                y = top + row
+                if 0 <= y < atlas.h:
+                    atlas.write_row_bits(cell.x + cell.left + glyph.x_offset, y, glyph.w, bits)
+
+        glyphs = {chr(glyph.codepoint): cell for glyph, cell in cells}
+        return cls(atlas, glyphs, ascent, descent, **kwargs)
+
+    @classmethod
+    def load(cls, pathname, **kwargs):
+        return cls.from_bdf(Path(pathname).read_text(encoding='latin-1'), **kwargs)
+
+    @staticmethod
+    @cache
+    def default():
+        """The 6x8 font that ships with imperfect."""
+        return Font.load(FONTS / 'fixed6x8.bdf')
+
+    @property
+    def line_height(self):
+        return self.ascent + self.descent
+
+    def glyph(self, char):
+        return self.glyphs.get(char) or self.glyphs.get('?') or next(iter(self.glyphs.values()))
+
+    def width_of(self, text):
+        return sum(self.glyph(char).advance for char in text)
+
+    def render(self, text, color, background=None):
+        """Return a form with text drawn in color over background, or over
+        transparent pixels with color premultiplied when there is none."""
+        key = (text, tuple(color.values), None if background is None else tuple(background.values))
+        if key in self.runs:
+            self.runs.move_to_end(key)
+            return self.runs[key]
+
+        bits = self.render_bits(text)
+        bits.foreground = color if background is not None else color.premultiplied()
+        bits.background = background if background is not None else TRANSPARENT
+
+        run = Form(0, 0, bits.w, bits.h)
+        blit(run, bits, 0, 0, CombinationRule.SOURCE_ONLY)
+        run.take_damage()
+
+        self.runs[key] = run
+        if len(self.runs) > self.cache_size:
+            self.runs.popitem(last=False)
+        return run
+
+    def render_bits(self, text):
+        """Return a 1 bit form with the glyphs of text set."""
+        bits = BitForm(0, 0, max(self.width_of(text), 1), self.line_height)
+        x = 0
+        for char in text:
+            glyph = self.glyph(char)
+            BitBlt(
+                destination=bits,
+                source=self.atlas,
+                fill=None,
+                combination_rule=CombinationRule.SOURCE_OR_DESTINATION,
+                destination_x=x - glyph.left,
+                destination_y=0,
+                source_x=glyph.x,
+                source_y=0,
+                width=glyph.w,
+                height=self.line_height,
+            ).copy_bits()
+            x += glyph.advance
+        return bits
+
+    def draw(self, form, x, y, text, color, background=None, clip=None):
+        """Draw text with the top of its line at x, y and return the x the
+        text after it would start at. Without a background only the glyphs
+        are drawn, which needs a 32 bit form (or a 1 bit one, where they are
+        set in its foreground)."""
+        if not text:
+            return x
+
+        if background is None and form.bits_per_pixel == 1:
+            blit(form, self.render_bits(text), x, y, CombinationRule.SOURCE_OR_DESTINATION, clip)
+        elif background is None and form.bits_per_pixel != 32:
+            raise BitBltError(f'text without a background needs a 32 or 1 bit form, got {form.bits_per_pixel} bits')
+        elif background is None:
+            blit(form, self.render(text, color), x, y, CombinationRule.SOURCE_OVER, clip)
+        else:
+            blit(form, self.render(text, color, background), x, y, CombinationRule.SOURCE_ONLY, clip)
+        return x + self.width_of(text)
+
+
+def blit(destination, source, x, y, rule, clip=None):
+    clip = clip or Rect(0, 0, destination.w, destination.h)
+    BitBlt(
+        destination=destination,
+        source=source,
+        fill=None,
+        combination_rule=rule,
+        destination_x=x,
+        destination_y=y,
+        source_x=0,
+        source_y=0,
+        width=source.w,
+        height=source.h,
+        clip_x=clip.x,
+        clip_y=clip.y,
+        clip_w=clip.w,
+        clip_h=clip.h,
+    ).copy_bits()
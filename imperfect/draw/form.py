@@ -1,8 +1,29 @@
+from __future__ import annotations
+
 import ctypes
+import mmap
+import sys
+import weakref
+
+from dataclasses import dataclass, field, replace
+from functools import cache
+from multiprocessing import shared_memory
+from pathlib import Path
+
+from imperfect.draw import BitBlt, Color, CombinationRule
+from imperfect.draw.alpha import premultiply
+from imperfect.draw.convert import pixel_value
+from imperfect.draw.cube import ColorCube
+from imperfect.draw.palette import Palette
+from imperfect.draw.rect import Rect, bounding_rect, merge_rects
+from imperfect.draw.stretch import stretch_bits
 
-from dataclasses import dataclass
+# past this many damaged rectangles a form collapses them into one
+MAX_DAMAGE_RECTS = 64
+
+# pixel values an indexed form remembers the nearest palette index of
+MAX_REMEMBERED = 1 << 16
 
-from imperfect.draw import Color
 
 class OutOfBoundsError(Exception):
     """Raised when trying to access a location outside a form."""
@@ -16,26 +37,205 @@ class Form:
     h: int
     offset_x: int|None = None
     offset_y: int|None = None
-    bitmap: bytearray|None = None
+    bitmap: bytearray|memoryview|None = None
+    pitch: int|None = None
+    parent: Form|None = field(default=None, repr=False, compare=False)
+    backing: mmap.mmap|shared_memory.SharedMemory|None = field(default=None, repr=False, compare=False)
 
     def __post_init__(self):
+        # pitch is the amount of bytes from one row to the next, it's wider
+        # than the form for views into a larger form.
+        if self.pitch is None:
+            self.pitch = self.pitch_of(self.w)
+
         if self.bitmap is None:
-            self.bitmap = bytearray(self.w * self.h * self.depth * [0x00])
+            self.bitmap = bytearray(self.pitch * self.h)
+
+        self.damaged = []
+        # single pixels grow a box [left, top, right, bottom] instead
+        self.damaged_pixels = None
+
+        # a shared memory block is removed by the form which created it
+        self.owns_backing = False
+        self.views = []
+
+    @classmethod
+    def pitch_of(cls, w):
+        return w * 4
+
+    @classmethod
+    def from_mmap(cls, pathname, w, h, **kwargs):
+        """Return a form whose pixels live in the file at pathname, mapped
+        into memory. The file is created or resized to fit the form, pixels
+        already in it are kept."""
+        size = cls.pitch_of(w) * h
+        with Path(pathname).open('a+b') as file:
+            if Path(pathname).stat().st_size != size:
+                file.truncate(size)
+            backing = mmap.mmap(file.fileno(), size)
+        return cls(0, 0, w, h, bitmap=memoryview(backing), backing=backing, **kwargs)
+
+    @classmethod
+    def from_shared_memory(cls, w, h, name=None, **kwargs):
+        """Return a form whose pixels live in shared memory, a new block when
+        name is None or the existing block called name. Other processes can
+        draw on the block through a form of their own, see
+        SharedMemory.name."""
+        size = cls.pitch_of(w) * h
+        backing = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        if backing.size < size:
+            backing.close()
+            raise ValueError(f'shared memory {name} has {backing.size} bytes, a {w}x{h} form needs {size}')
+        form = cls(0, 0, w, h, bitmap=backing.buf[:size], backing=backing, **kwargs)
+        form.owns_backing = name is None
+        return form
+
+    @property
+    def is_shared(self):
+        """True when the pixels live in a file or shared memory, where other
+        processes may change them."""
+        return self.root.backing is not None
+
+    def close(self, unlink=True):
+        """Release the pixels, the form can't be drawn on after this. A view
+        lets go of its share of them, a form in a file or shared memory
+        closes it and removes a shared memory block it created (unless
+        unlink is False). Raises BufferError and stays open while views of
+        it or exports of its bitmap are alive."""
+        if self.parent is not None:
+            if isinstance(self.bitmap, memoryview):
+                self.bitmap.release()
+            return
+
+        if self.backing is None:
+            return
+
+        if any(view.is_open for view in self._live_views()):
+            raise BufferError('views of the form are still open, close them first')
+
+        # releasing the bitmap raises while it's exported, closing the
+        # backing while something else still shares it, which leaves it
+        # open and the bitmap is taken again
+        self.bitmap.release()
+        try:
+            self.backing.close()
+        except BufferError:
+            self._reopen()
+            raise BufferError('views or exports of the form are still alive, close or delete them first') from None
+
+        if self.owns_backing and unlink:
+            self.backing.unlink()
+        self.backing = None
+
+    @property
+    def is_open(self):
+        if not isinstance(self.bitmap, memoryview):
+            return True
+        try:
+            return self.bitmap.nbytes >= 0
+        except ValueError:
+            return False
+
+    def _live_views(self):
+        views = [ref() for ref in self.views]
+        return [view for view in views if view is not None]
+
+    def _track_view(self, view):
+        # only the views of a file or shared memory keep it from closing
+        root = self.root
+        if root.backing is not None:
+            root.views = [weakref.ref(live) for live in root._live_views()] + [weakref.ref(view)]
+        return view
+
+    def _reopen(self):
+        size = self.pitch * self.h
+        if isinstance(self.backing, mmap.mmap):
+            self.bitmap = memoryview(self.backing)
+        else:
+            # a shared memory block doesn't reopen its buffer once closing
+            # it failed, it's attached to again by name
+            self.backing = shared_memory.SharedMemory(name=self.backing.name)
+            self.bitmap = self.backing.buf[:size]
 
     @property
     def depth(self):
         return 4
 
+    @property
+    def bits_per_pixel(self):
+        return self.depth * 8
+
     @property
     def offset(self):
         if self.offset_x is None and self.offset_y is None:
             return (0, 0)
         return (self.offset_x, self.offset_y)
 
+    @property
+    def is_contiguous(self):
+        return self.pitch == self.pitch_of(self.w)
+
     @property
     def bitmap_bytes(self):
         return (ctypes.c_char * len(self.bitmap)).from_buffer(self.bitmap)
 
+    def bitmap_bytes_from(self, x, y):
+        offset = self.byte_offset(x, y)
+        return (ctypes.c_char * (len(self.bitmap) - offset)).from_buffer(self.bitmap, offset)
+
+    @property
+    def is_damaged(self):
+        return len(self.damaged) > 0 or self.damaged_pixels is not None
+
+    def damage(self, x, y, w, h):
+        """Record that the pixels in the given rectangle have changed."""
+        rect = Rect(x, y, w, h).intersect(Rect(0, 0, self.w, self.h))
+        if rect.is_empty:
+            return
+
+        self.damaged.append(rect)
+        if len(self.damaged) > MAX_DAMAGE_RECTS:
+            self.damaged = [bounding_rect(self.damaged)]
+
+        if self.parent is not None:
+            self.parent.damage(self.x + rect.x, self.y + rect.y, rect.w, rect.h)
+
+    def damage_pixel(self, x, y):
+        """Record that the pixel at x, y, which has to be in the form, has
+        changed. Cheaper than damage, the pixels grow a bounding box which
+        becomes a rectangle when the damage is taken."""
+        box = self.damaged_pixels
+        if box is None:
+            self.damaged_pixels = [x, y, x + 1, y + 1]
+        else:
+            if x < box[0]:
+                box[0] = x
+            elif x >= box[2]:
+                box[2] = x + 1
+            if y < box[1]:
+                box[1] = y
+            elif y >= box[3]:
+                box[3] = y + 1
+
+        if self.parent is not None:
+            self.parent.damage_pixel(self.x + x, self.y + y)
+
+    def damage_all(self):
+        self.damaged = []
+        self.damaged_pixels = None
+        self.damage(0, 0, self.w, self.h)
+
+    def take_damage(self):
+        """Return the merged damaged rectangles and mark the form clean."""
+        damaged = self.damaged
+        if self.damaged_pixels is not None:
+            left, top, right, bottom = self.damaged_pixels
+            damaged = [Rect(left, top, right - left, bottom - top)] + damaged
+        damaged = merge_rects(damaged)
+        self.damaged = []
+        self.damaged_pixels = None
+        return damaged
+
     def color_at(self, x, y):
         _0th, _nth = self._pixel_bytes_range_at_point(x, y)
         pixel_bytes = self.bitmap[_0th:_nth]
@@ -43,38 +243,174 @@ class Form:
 
     def put_color_at(self, x, y, color):
         _0th, _nth = self._pixel_bytes_range_at_point(x, y)
-        self.bitmap[_0th:_nth] = color.values
+        self.bitmap[_0th:_nth] = self.pixel_bytes(color)
+        self.damage_pixel(x, y)
+
+    def pixel_bytes(self, color):
+        return bytes(color.values)
 
     def row_bytes(self, x, y, pixel_count):
         if x + (pixel_count - 1) >= self.w:
             raise OutOfBoundsError(f'reading beyond bitmap width. start={x}, pixels={pixel_count}, bitmap width={self.w}')
 
-        byte_0 = (y * (self.w * self.depth)) + (x * self.depth)
-        byte_n = byte_0 + (self.depth * (pixel_count - 1))
+        byte_0 = self.byte_offset(x, y)
+        byte_n = byte_0 + (self.depth * pixel_count)
         return self.bitmap[byte_0:byte_n]
 
     def put_row_bytes(self, x, y, row_bytes):
         if x + ((len(row_bytes) - 1) / self.depth) >= self.w:
             raise OutOfBoundsError(f'writing beyond bitmap width. start={x}, pixel_count={len(row_bytes) / self.depth}')
 
-        byte_0 = (y * (self.w * self.depth)) + (x * self.depth)
+        byte_0 = self.byte_offset(x, y)
         byte_n = byte_0 + len(row_bytes)
         self.bitmap[byte_0:byte_n] = row_bytes
+        self.damage(x, y, len(row_bytes) // self.depth, 1)
 
     def fill(self, color):
-        self.bitmap = bytearray(self.w * self.h * color.values)
+        # fill in place, anything holding on to the bitmap keeps seeing it
+        if self.is_contiguous:
+            self.bitmap[:] = self.pixel_bytes(color) * (self.w * self.h)
+        else:
+            row = self.pixel_bytes(color) * self.w
+            for y in range(self.h):
+                byte_0 = self.byte_offset(0, y)
+                self.bitmap[byte_0:byte_0 + len(row)] = row
+        self.damage_all()
 
-    def draw_on(self, medium, x, y, clip_x, clip_y, clip_w, clip_h, rule, fill):
+    def flood_fill(self, x, y, color, rule=CombinationRule.SOURCE_ONLY):
+        """Fill the pixels the same as the one at x, y and connected to it up,
+        down, left or right with color (or a halftone form) under rule."""
+        self._check_point(x, y)
         BitBlt(
+            destination=self,
+            source=None,
+            fill=color,
+            combination_rule=rule,
+            destination_x=0,
+            destination_y=0,
+            source_x=0,
+            source_y=0,
+            width=0,
+            height=0,
+        ).fill_spans(region_spans(self, x, y))
+
+    def pixel_at(self, x, y):
+        _0th, _nth = self._pixel_bytes_range_at_point(x, y)
+        return bytes(self.bitmap[_0th:_nth])
+
+    def row_matches(self, y, pixel):
+        """Return a byte per pixel of row y, 1 where it's pixel and 0 where
+        it isn't."""
+        row = bytes(self.row_bytes(0, y, self.w))
+        matches = -1
+        for channel, value in enumerate(pixel):
+            matches &= int.from_bytes(row[channel::self.depth].translate(equal_table(value)))
+        return bytearray(matches.to_bytes(self.w))
+
+    def premultiply(self):
+        """Scale the colors of every pixel by their alpha in place, see
+        CombinationRule.SOURCE_OVER and the other compositing rules."""
+        for y in range(self.h):
+            byte_0 = self.byte_offset(0, y)
+            byte_n = byte_0 + (self.w * self.depth)
+            self.bitmap[byte_0:byte_n] = premultiply(self.bitmap[byte_0:byte_n])
+        self.damage_all()
+
+    def view(self, x, y, w, h):
+        """Return a form for the rectangle at x, y of this one which shares
+        its pixels, drawing on either one changes both."""
+        if x < 0 or y < 0 or w <= 0 or h <= 0 or self.w < x + w or self.h < y + h:
+            raise OutOfBoundsError(f'view ({x}, {y}, {w}, {h}) is out of bounds of a {self.w}x{self.h} form')
+
+        byte_0 = self.byte_offset(x, y)
+        byte_n = self.byte_offset(x + w, y + h - 1)
+        return self._track_view(replace(
+            self,
+            x=x,
+            y=y,
+            w=w,
+            h=h,
+            bitmap=memoryview(self.bitmap)[byte_0:byte_n],
+            pitch=self.pitch,
+            parent=self,
+            backing=None,
+        ))
+
+    def scaled(self, w, h):
+        """Return a new w x h form like this one with its pixels stretched
+        to fit, sampling the nearest pixel."""
+        form = replace(self, x=0, y=0, w=w, h=h, bitmap=None, pitch=None, parent=None, backing=None)
+        stretch_bits(form, self, 0, 0, w, h)
+        form.take_damage()
+        return form
+
+    def shares_bitmap(self, other):
+        """Return True when other is this form or a view sharing its pixels."""
+        return self.root is other.root
+
+    @property
+    def root(self):
+        return self if self.parent is None else self.parent.root
+
+    def root_point(self, x, y):
+        """Return x, y in the coordinates of the form this is a view of."""
+        if self.parent is None:
+            return (x, y)
+        return self.parent.root_point(self.x + x, self.y + y)
+
+    def scroll(self, dx, dy, fill=None):
+        """Move the pixels of the form by dx, dy in place. Pixels moved past
+        its edges are lost and the ones uncovered keep their old values, or
+        are filled with fill when it's given. Scroll a view to move just a
+        region."""
+        BitBlt(
+            destination=self,
+            source=self,
+            fill=None,
+            combination_rule=CombinationRule.SOURCE_ONLY,
+            destination_x=dx,
+            destination_y=dy,
+            source_x=0,
+            source_y=0,
+            width=self.w,
+            height=self.h,
+        ).copy_bits()
+
+        if fill is None:
+            return
+
+        uncovered = [
+            Rect(0 if dx >= 0 else self.w + dx, 0, min(abs(dx), self.w), self.h),
+            Rect(0, 0 if dy >= 0 else self.h + dy, self.w, min(abs(dy), self.h)),
+        ]
+        for rect in uncovered:
+            if rect.is_empty:
+                continue
+            BitBlt(
+                destination=self,
+                source=None,
+                fill=fill,
+                combination_rule=CombinationRule.SOURCE_ONLY,
+                destination_x=rect.x,
+                destination_y=rect.y,
+                source_x=0,
+                source_y=0,
+                width=rect.w,
+                height=rect.h,
+            ).copy_bits()
+
+    def draw_on(self, medium, x, y, clip_x, clip_y, clip_w, clip_h, rule, fill):
+        bitblt = BitBlt(
             destination=medium,
             source=self,
             fill=fill,
             combination_rule=rule,
             destination_x=x,
             destination_y=y,
-            source_x=self.x,
-            source_y=self.y,
-            extent=(self.w, self.y),
+            source_x=0,
+            source_y=0,
+            width=self.w,
+            height=self.h,
             clip_x=clip_x,
             clip_y=clip_y,
             clip_w=clip_w,
@@ -82,12 +418,291 @@ class Form:
         )
         bitblt.copy_bits()
 
-    def _pixel_bytes_range_at_point(self, x, y):
+    def byte_offset(self, x, y):
+        return (y * self.pitch) + (x * self.depth)
+
+    def _check_point(self, x, y):
         x_out_of_bounds = x < 0 or self.w <= x
         y_out_of_bounds = y < 0 or self.h <= y
         if x_out_of_bounds or y_out_of_bounds:
-            raise OutOfBoundsError(f'{point} is out of bounds of {self}')
+            raise OutOfBoundsError(f'({x}, {y}) is out of bounds of {self}')
 
-        byte_0 = (y * (self.w * self.depth)) + (x * self.depth)
+    def _pixel_bytes_range_at_point(self, x, y):
+        self._check_point(x, y)
+        byte_0 = self.byte_offset(x, y)
         byte_n = byte_0 + self.depth
         return byte_0, byte_n
+
+
+@cache
+def equal_table(value):
+    return bytes(v == value for v in range(256))
+
+
+def region_spans(form, x, y):
+    """Return the (y, x_start, x_stop) spans of the pixels the same as the
+    one at x, y and connected to it. Rows are compared a whole row at a time
+    and each span is grown to both sides with a find, pixels are marked as
+    taken in the row matches so every one is in a single span."""
+    pixel = form.pixel_at(x, y)
+    rows = {}
+
+    def matches(row):
+        if row not in rows:
+            rows[row] = form.row_matches(row, pixel)
+        return rows[row]
+
+    spans = []
+    seeds = [(x, y)]
+    while seeds:
+        x, y = seeds.pop()
+        row = matches(y)
+        if not row[x]:
+            continue
+
+        left = row.rfind(0, 0, x) + 1
+        right = row.find(0, x)
+        right = form.w if right < 0 else right
+        row[left:right] = bytes(right - left)
+        spans.append((y, left, right))
+
+        # a seed for every run of matching pixels next to the span
+        for neighbour in (y - 1, y + 1):
+            if not 0 <= neighbour < form.h:
+                continue
+            next_row = matches(neighbour)
+            start = next_row.find(1, left, right)
+            while start >= 0:
+                seeds.append((start, neighbour))
+                stop = next_row.find(0, start, right)
+                start = next_row.find(1, stop, right) if stop >= 0 else -1
+    return spans
+
+
+class NearestIndex(dict):
+    """Maps 32 bit pixel values to the index of the closest color in a
+    palette, computing and remembering each one the first time it's seen.
+    Past MAX_REMEMBERED values it forgets them all, an image with that
+    many colors rarely repeats one."""
+
+    def __init__(self, palette):
+        super().__init__()
+        self.palette = palette
+        self.cube = None
+
+    def __missing__(self, value):
+        if self.cube is None:
+            self.cube = ColorCube.of(self.palette)
+        if len(self) >= MAX_REMEMBERED:
+            self.clear()
+
+        _, b, g, r = value.to_bytes(4, sys.byteorder)
+        index = self.cube.index_of_rgb(r, g, b)
+        self[value] = index
+        return index
+
+
+@dataclass
+class IndexedForm(Form):
+    """A form with a byte per pixel, each one an index into its palette."""
+
+    palette: list[Color]|None = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.palette is None:
+            self.palette = Palette.values()
+
+        if len(self.palette) > 256:
+            raise ValueError(f'an indexed form can have at most 256 colors, got {len(self.palette)}')
+
+        self.indices = NearestIndex(self.palette)
+        self._color_table = None
+        self._ink_tables = {}
+        self._index_tables = {}
+        super().__post_init__()
+
+    @classmethod
+    def pitch_of(cls, w):
+        return w
+
+    @property
+    def depth(self):
+        return 1
+
+    def color_at(self, x, y):
+        _0th, _ = self._pixel_bytes_range_at_point(x, y)
+        return self.palette[self.bitmap[_0th]]
+
+    def pixel_bytes(self, color):
+        return bytes([self.index_of(color)])
+
+    def index_of(self, color):
+        return self.indices[pixel_value(color)]
+
+    def color_table(self):
+        # the 32 bit pixel for every index
+        if self._color_table is None:
+            table = [bytes(color.values) for color in self.palette]
+            self._color_table = table + [bytes(4)] * (256 - len(table))
+        return self._color_table
+
+    def ink_table(self, background):
+        # translation table from indices to 1 for any color but background
+        key = tuple(background.values)
+        if key not in self._ink_tables:
+            table = bytes(0 if color == background else 1 for color in self.palette)
+            self._ink_tables[key] = table + bytes([1]) * (256 - len(table))
+        return self._ink_tables[key]
+
+    def index_table(self, palette):
+        # translation table from the indices of another palette to ours, the
+        # palette is kept with it so a new one reusing its id isn't mistaken
+        # for it
+        cached_palette, table = self._index_tables.get(id(palette), (None, None))
+        if cached_palette is not palette:
+            table = bytes(self.index_of(color) for color in palette)
+            table += bytes(256 - len(table))
+            self._index_tables[id(palette)] = (palette, table)
+        return table
+
+
+@dataclass
+class BitForm(Form):
+    """A form with a bit per pixel, like smalltalk's bitmaps rows are packed
+    into 32 bit words with the leftmost pixel in the most significant bit.
+    Set bits are drawn with the foreground color, clear ones with the
+    background."""
+
+    foreground: Color = field(default_factory=lambda: Color(0, 0, 0))
+    background: Color = field(default_factory=lambda: Color(255, 255, 255))
+
+    @classmethod
+    def pitch_of(cls, w):
+        return ((w + 31) // 32) * 4
+
+    @property
+    def depth(self):
+        return None
+
+    @property
+    def bits_per_pixel(self):
+        return 1
+
+    @property
+    def is_contiguous(self):
+        # the padding bits at the end of each row are free to overwrite,
+        # unless they are pixels of the form this is a view of
+        if self.parent is not None and self.parent.w != self.w:
+            return False
+        return self.pitch == self.pitch_of(self.w)
+
+    def byte_offset(self, x, y):
+        return (y * self.pitch) + (x // 8)
+
+    def row_bytes(self, x, y, pixel_count):
+        """Return pixel_count pixels starting at x packed 8 to a byte, the
+        leftmost in the most significant bit and the last byte padded with
+        clear bits."""
+        padding = -pixel_count % 8
+        return (self.row_bits(x, y, pixel_count) << padding).to_bytes((pixel_count + padding) // 8)
+
+    def put_row_bytes(self, x, y, row_bytes):
+        """Write pixels packed the way row_bytes returns them, the padding
+        bits past the right edge of the form are dropped."""
+        width = min(len(row_bytes) * 8, self.w - x)
+        if x < 0 or len(row_bytes) * 8 - width >= 8:
+            raise OutOfBoundsError(f'writing beyond bitmap width. start={x}, pixel_count={len(row_bytes) * 8}')
+
+        bits = int.from_bytes(row_bytes) >> (len(row_bytes) * 8 - width)
+        self.put_row_bits(x, y, width, bits)
+
+    def row_bits(self, x, y, width):
+        """Return width pixels starting at x as an int, the leftmost pixel in
+        the most significant bit."""
+        if x < 0 or self.w < x + width:
+            raise OutOfBoundsError(f'reading beyond bitmap width. start={x}, pixels={width}, bitmap width={self.w}')
+
+        byte_0, byte_n = self._bytes_range_of_bits(x, y, width)
+        chunk = int.from_bytes(self.bitmap[byte_0:byte_n])
+        return (chunk >> ((byte_n - byte_0) * 8 - (x % 8) - width)) & ((1 << width) - 1)
+
+    def put_row_bits(self, x, y, width, bits):
+        if x < 0 or self.w < x + width:
+            raise OutOfBoundsError(f'writing beyond bitmap width. start={x}, pixels={width}, bitmap width={self.w}')
+
+        self.write_row_bits(x, y, width, bits)
+        self.damage(x, y, width, 1)
+
+    def write_row_bits(self, x, y, width, bits):
+        # only the bytes holding the bits are read and written back, the bits
+        # around them in those bytes are kept
+        byte_0, byte_n = self._bytes_range_of_bits(x, y, width)
+        length = byte_n - byte_0
+        shift = (length * 8) - (x % 8) - width
+        mask = ((1 << width) - 1) << shift
+        chunk = int.from_bytes(self.bitmap[byte_0:byte_n])
+        chunk = (chunk & ~mask) | ((bits << shift) & mask)
+        self.bitmap[byte_0:byte_n] = chunk.to_bytes(length)
+
+    def bit_at(self, x, y):
+        self._check_point(x, y)
+        return self.row_bits(x, y, 1)
+
+    def put_bit_at(self, x, y, bit):
+        self._check_point(x, y)
+        self.write_row_bits(x, y, 1, bit)
+        self.damage_pixel(x, y)
+
+    def pixel_at(self, x, y):
+        return self.bit_at(x, y)
+
+    def row_matches(self, y, pixel):
+        bits = format(self.row_bits(0, y, self.w), f'0{self.w}b').encode()
+        return bytearray(bits.translate(equal_table(ord('1') if pixel else ord('0'))))
+
+    def color_at(self, x, y):
+        return self.foreground if self.bit_at(x, y) else self.background
+
+    def put_color_at(self, x, y, color):
+        self.put_bit_at(x, y, self.bit_of(color))
+
+    def bit_of(self, color):
+        return 0 if color == self.background else 1
+
+    def fill(self, color):
+        bit = self.bit_of(color)
+        if self.is_contiguous:
+            self.bitmap[:] = bytes([0xff * bit]) * len(self.bitmap)
+        else:
+            bits = ((1 << self.w) - 1) * bit
+            for y in range(self.h):
+                self.write_row_bits(0, y, self.w, bits)
+        self.damage_all()
+
+    def view(self, x, y, w, h):
+        """Return a form sharing the pixels of a rectangle of this one, x has
+        to fall on a byte boundary."""
+        if x % 8 != 0:
+            raise OutOfBoundsError(f'views of 1 bit forms have to start on a multiple of 8, got x={x}')
+
+        if x < 0 or y < 0 or w <= 0 or h <= 0 or self.w < x + w or self.h < y + h:
+            raise OutOfBoundsError(f'view ({x}, {y}, {w}, {h}) is out of bounds of a {self.w}x{self.h} form')
+
+        byte_0, _ = self._bytes_range_of_bits(x, y, w)
+        _, byte_n = self._bytes_range_of_bits(x, y + h - 1, w)
+        return self._track_view(replace(
+            self,
+            x=x,
+            y=y,
+            w=w,
+            h=h,
+            bitmap=memoryview(self.bitmap)[byte_0:byte_n],
+            pitch=self.pitch,
+            parent=self,
+            backing=None,
+        ))
+
+    def _bytes_range_of_bits(self, x, y, width):
+        byte_0 = (y * self.pitch) + (x // 8)
+        byte_n = (y * self.pitch) + ((x + width + 7) // 8)
+        return byte_0, byte_n
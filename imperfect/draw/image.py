@@ -0,0 +1,366 @@
+"""
+Load and save forms as PPM, PAM and PNG images.
+
+Images are read and written a row at a time, a row of the file is turned
+into a row of the form (or back) with extended slice assignments over the
+whole row, so neither the file nor the form is ever copied whole and no
+Color is made per pixel. Only 8 bit samples are supported.
+
+    form = image.load('sprite.png')
+    image.save(form, 'screen.ppm')
+"""
+
+import struct
+import zlib
+
+from pathlib import Path
+
+from imperfect.draw import BitBlt, CombinationRule, alpha
+from imperfect.draw.convert import pixels_of
+from imperfect.draw.form import Form
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# bytes of compressed pixels collected before they are written as an IDAT
+IDAT_SIZE = 1 << 16
+
+# channels per pixel of each png color type
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# pam tuple types by the amount of channels
+PAM_TUPLTYPES = {1: 'GRAYSCALE', 2: 'GRAYSCALE_ALPHA', 3: 'RGB', 4: 'RGB_ALPHA'}
+
+
+class ImageError(Exception):
+    """Raised for an image file that can't be read."""
+
+
+# rows in the layout of Color.values (alpha, blue, green, red) from and to
+# the rows of an image with channels samples per pixel
+
+def from_channels(row, channels):
+    count = len(row) // channels
+    pixels = bytearray(count * 4)
+    if channels in (1, 2):
+        pixels[1::4] = pixels[2::4] = pixels[3::4] = row[0::channels]
+    else:
+        pixels[3::4] = row[0::channels]
+        pixels[2::4] = row[1::channels]
+        pixels[1::4] = row[2::channels]
+
+    if channels in (2, 4):
+        pixels[0::4] = row[channels - 1::channels]
+    else:
+        pixels[0::4] = b'\xff' * count
+    return pixels
+
+
+def to_channels(pixels, channels):
+    # rgb, with alpha when channels is 4
+    row = bytearray((len(pixels) // 4) * channels)
+    row[0::channels] = pixels[3::4]
+    row[1::channels] = pixels[2::4]
+    row[2::channels] = pixels[1::4]
+    if channels == 4:
+        row[3::4] = pixels[0::4]
+    return row
+
+
+class RowWriter:
+    """Writes rows of 32 bit pixels into a form of any depth."""
+
+    def __init__(self, form):
+        self.form = form
+        self.scratch = None if form.bits_per_pixel == 32 else Form(0, 0, form.w, 1)
+
+    def write(self, y, pixels):
+        if self.scratch is None:
+            byte_0 = self.form.byte_offset(0, y)
+            self.form.bitmap[byte_0:byte_0 + len(pixels)] = pixels
+            return
+
+        self.scratch.bitmap[:] = pixels
+        BitBlt(
+            destination=self.form,
+            source=self.scratch,
+            fill=None,
+            combination_rule=CombinationRule.SOURCE_ONLY,
+            destination_x=0,
+            destination_y=y,
+            source_x=0,
+            source_y=0,
+            width=self.form.w,
+            height=1,
+        ).copy_bits()
+
+
+def form_rows(form):
+    """Yield the rows of form as 32 bit pixels."""
+    if form.bits_per_pixel == 32:
+        for y in range(form.h):
+            yield form.row_bytes(0, y, form.w)
+        return
+
+    target = Form(0, 0, 1, 1)
+    for y in range(form.h):
+        yield pixels_of(form, 0, y, form.w, target)
+
+
+def form_for(w, h, form):
+    if form is None:
+        return Form(0, 0, w, h)
+    if (form.w, form.h) != (w, h):
+        raise ImageError(f'image is {w}x{h}, it does not fit a {form.w}x{form.h} form')
+    return form
+
+
+def read_exactly(file, size):
+    data = file.read(size)
+    if len(data) != size:
+        raise ImageError(f'image ends early, expected {size} bytes, got {len(data)}')
+    return data
+
+
+# netpbm
+
+def read_header_tokens(file, count):
+    """Return count whitespace separated tokens of a pnm header, skipping
+    comments, the file is left at the single whitespace that ends it."""
+    tokens = []
+    token = b''
+    while len(tokens) < count:
+        char = read_exactly(file, 1)
+        if char == b'#':
+            while char not in (b'\n', b'\r'):
+                char = read_exactly(file, 1)
+        if char.isspace():
+            if token:
+                tokens.append(token)
+                token = b''
+            continue
+        token += char
+    return tokens
+
+
+def read_pam_header(file):
+    fields = {}
+    while True:
+        line = file.readline()
+        if not line:
+            raise ImageError('pam header has no ENDHDR')
+        line = line.strip()
+        if line == b'ENDHDR':
+            return fields
+        if not line or line.startswith(b'#'):
+            continue
+        key, _, value = line.partition(b' ')
+        fields[key.decode('ascii')] = value.strip().decode('ascii')
+
+
+def read_pnm(file, form=None):
+    """Read a binary PGM (P5), PPM (P6) or PAM (P7) image from file into form,
+    a new one when it's None."""
+    magic = read_exactly(file, 2)
+    if magic == b'P7':
+        fields = read_pam_header(file)
+        w, h = int(fields['WIDTH']), int(fields['HEIGHT'])
+        channels, maxval = int(fields['DEPTH']), int(fields['MAXVAL'])
+    elif magic in (b'P5', b'P6'):
+        w, h, maxval = map(int, read_header_tokens(file, 3))
+        channels = 1 if magic == b'P5' else 3
+    else:
+        raise ImageError(f'not a binary netpbm image, magic={magic}')
+
+    if maxval != 255:
+        raise ImageError(f'only 8 bit samples are supported, maxval={maxval}')
+    if channels not in PAM_TUPLTYPES:
+        raise ImageError(f'unsupported amount of channels={channels}')
+
+    form = form_for(w, h, form)
+    writer = RowWriter(form)
+    for y in range(h):
+        writer.write(y, from_channels(read_exactly(file, w * channels), channels))
+    form.damage_all()
+    return form
+
+
+def write_ppm(form, file):
+    """Write form to file as a binary PPM (P6), alpha is dropped."""
+    file.write(f'P6\n{form.w} {form.h}\n255\n'.encode('ascii'))
+    for pixels in form_rows(form):
+        file.write(to_channels(pixels, 3))
+
+
+def write_pam(form, file):
+    """Write form to file as a PAM (P7) with alpha."""
+    file.write(
+        f'P7\nWIDTH {form.w}\nHEIGHT {form.h}\nDEPTH 4\nMAXVAL 255\nTUPLTYPE RGB_ALPHA\nENDHDR\n'.encode('ascii')
+    )
+    for pixels in form_rows(form):
+        file.write(to_channels(pixels, 4))
+
+
+# png
+
+def read_chunk(file):
+    length, kind = struct.unpack('>I4s', read_exactly(file, 8))
+    data = read_exactly(file, length)
+    crc, = struct.unpack('>I', read_exactly(file, 4))
+    if zlib.crc32(data, zlib.crc32(kind)) != crc:
+        raise ImageError(f'png chunk {kind} is corrupt')
+    return kind, data
+
+
+def write_chunk(file, kind, data):
+    file.write(struct.pack('>I4s', len(data), kind))
+    file.write(data)
+    file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+
+def unfilter(kind, row, previous, bpp):
+    """Undo the png filter of a row given the unfiltered row above it."""
+    if kind == 0:
+        return row
+    if kind == 2:
+        return alpha.add(row, previous, saturate=False)
+
+    row = bytearray(row)
+    if kind == 1:
+        for i in range(bpp, len(row)):
+            row[i] = (row[i] + row[i - bpp]) & 0xff
+    elif kind == 3:
+        for i in range(len(row)):
+            left = row[i - bpp] if i >= bpp else 0
+            row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xff
+    elif kind == 4:
+        for i in range(len(row)):
+            left = row[i - bpp] if i >= bpp else 0
+            up = previous[i]
+            up_left = previous[i - bpp] if i >= bpp else 0
+            estimate = left + up - up_left
+            distance_left = abs(estimate - left)
+            distance_up = abs(estimate - up)
+            distance_up_left = abs(estimate - up_left)
+            if distance_left <= distance_up and distance_left <= distance_up_left:
+                predictor = left
+            elif distance_up <= distance_up_left:
+                predictor = up
+            else:
+                predictor = up_left
+            row[i] = (row[i] + predictor) & 0xff
+    else:
+        raise ImageError(f'unknown png filter type={kind}')
+    return bytes(row)
+
+
+def palette_table(plte, trns):
+    # the 32 bit pixel of every palette index
+    colors = from_channels(plte, 3)
+    colors[0:len(trns) * 4:4] = trns
+    table = [bytes(colors[i:i + 4]) for i in range(0, len(colors), 4)]
+    return table + [bytes(4)] * (256 - len(table))
+
+
+def read_png(file, form=None):
+    """Read a non interlaced 8 bit PNG from file into form, a new one when
+    it's None. Compressed data is inflated as it's read and each row is
+    written to the form as soon as it's complete."""
+    if read_exactly(file, 8) != PNG_SIGNATURE:
+        raise ImageError('not a png image')
+
+    kind, data = read_chunk(file)
+    if kind != b'IHDR':
+        raise ImageError('png image does not start with IHDR')
+    w, h, bit_depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', data)
+    if bit_depth != 8:
+        raise ImageError(f'only 8 bit png images are supported, bit depth={bit_depth}')
+    if color_type not in PNG_CHANNELS:
+        raise ImageError(f'unknown png color type={color_type}')
+    if interlace != 0:
+        raise ImageError('interlaced png images are not supported')
+
+    channels = PNG_CHANNELS[color_type]
+    stride = w * channels
+    form = form_for(w, h, form)
+    writer = RowWriter(form)
+
+    plte = trns = b''
+    table = None
+    inflate = zlib.decompressobj()
+    pending = bytearray()
+    previous = bytes(stride)
+    y = 0
+
+    while True:
+        kind, data = read_chunk(file)
+        if kind == b'IEND':
+            break
+        if kind == b'PLTE':
+            plte = data
+        elif kind == b'tRNS':
+            trns = data
+        elif kind == b'IDAT':
+            pending += inflate.decompress(data)
+            while len(pending) > stride and y < h:
+                row = unfilter(pending[0], bytes(pending[1:stride + 1]), previous, channels)
+                del pending[:stride + 1]
+                if color_type == 3:
+                    table = table or palette_table(plte, trns)
+                    pixels = b''.join(map(table.__getitem__, row))
+                else:
+                    pixels = from_channels(row, channels)
+                writer.write(y, pixels)
+                previous = row
+                y += 1
+
+    if y != h:
+        raise ImageError(f'png image has {y} rows, expected {h}')
+    form.damage_all()
+    return form
+
+
+def write_png(form, file, alpha=True, level=6):
+    """Write form to file as an 8 bit RGBA (or RGB without alpha) PNG, rows
+    are compressed as they are read from the form."""
+    channels = 4 if alpha else 3
+    file.write(PNG_SIGNATURE)
+    write_chunk(file, b'IHDR', struct.pack('>IIBBBBB', form.w, form.h, 8, 6 if alpha else 2, 0, 0, 0))
+
+    deflate = zlib.compressobj(level)
+    pending = bytearray()
+    for pixels in form_rows(form):
+        # every row is stored unfiltered, filter type 0
+        pending += deflate.compress(b'\x00' + to_channels(pixels, channels))
+        if len(pending) >= IDAT_SIZE:
+            write_chunk(file, b'IDAT', bytes(pending))
+            pending.clear()
+
+    pending += deflate.flush()
+    write_chunk(file, b'IDAT', bytes(pending))
+    write_chunk(file, b'IEND', b'')
+
+
+READERS = {'.png': read_png, '.ppm': read_pnm, '.pgm': read_pnm, '.pam': read_pnm}
+WRITERS = {'.png': write_png, '.ppm': write_ppm, '.pam': write_pam}
+
+
+def load(pathname, form=None):
+    """Read the image at pathname, its format is chosen by the suffix."""
+    pathname = Path(pathname)
+    reader = READERS.get(pathname.suffix.lower())
+    if reader is None:
+        raise ImageError(f'no reader for {pathname.suffix} images')
+    with pathname.open('rb') as file:
+        return reader(file, form)
+
+
+def save(form, pathname):
+    """Write form as an image at pathname, its format is chosen by the
+    suffix."""
+    pathname = Path(pathname)
+    writer = WRITERS.get(pathname.suffix.lower())
+    if writer is None:
+        raise ImageError(f'no writer for {pathname.suffix} images')
+    with pathname.open('wb') as file:
+        writer(form, file)
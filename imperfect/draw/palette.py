@@ -1,6 +1,10 @@
 import random
 
+from functools import cache
+from types import MappingProxyType
+
 from imperfect.draw import Color
+from imperfect.draw.cube import ColorCube
 
 
 class Palette:
@@ -262,16 +266,42 @@ class Palette:
     GREY93 = Color.from_hexstr("eeeeee")
 
     @staticmethod
+    @cache
     def named_values():
-        return {
+        """The colors by name, the same dict every call."""
+        return MappingProxyType({
             name: value for
             name, value in vars(Palette).items()
             if (type(value) is Color)
-        }
+        })
 
     @staticmethod
+    @cache
     def values():
-        return list(Palette.named_values().values())
+        """The named colors, the same tuple every call so indexed forms using
+        it share a palette."""
+        return tuple(Palette.named_values().values())
+
+    @staticmethod
+    @cache
+    def xterm_values():
+        """The 256 colors of xterm in the order of their indices, the 16
+        system colors, a 6x6x6 color cube and 24 greys."""
+        system = [
+            '000000', '800000', '008000', '808000', '000080', '800080', '008080', 'c0c0c0',
+            '808080', 'ff0000', '00ff00', 'ffff00', '0000ff', 'ff00ff', '00ffff', 'ffffff',
+        ]
+        levels = [0, 95, 135, 175, 215, 255]
+        cube = [Color(r, g, b) for r in levels for g in levels for b in levels]
+        greys = [Color(8 + 10 * i, 8 + 10 * i, 8 + 10 * i) for i in range(24)]
+        return tuple(map(Color.from_hexstr, system)) + tuple(cube) + tuple(greys)
+
+    @staticmethod
+    def nearest(color, palette=None):
+        """Return the color of palette (Palette.values() by default) closest
+        to color."""
+        palette = palette or Palette.values()
+        return palette[ColorCube.of(palette).index_of(color)]
 
     @staticmethod
     def random():
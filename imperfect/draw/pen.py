@@ -1,25 +1,22 @@
 from dataclasses import dataclass
 
-from imperfect.draw import BitBlt, CombinationRule, Form
+from imperfect.draw import BitBlt, CombinationRule
 
 
 @dataclass
 class Pen(BitBlt):
     def __init__(self, destination, color, width, height):
-        brush = Form(0, 0, width, height)
-        brush.fill(color)
-
         super().__init__(
             destination=destination,
-            source=brush,
-            fill=None,
+            source=None,
+            fill=color,
             combination_rule=CombinationRule.SOURCE_ONLY,
             destination_x=0,
             destination_y=0,
             source_x=0,
             source_y=0,
-            width=brush.w,
-            height=brush.h,
+            width=width,
+            height=height,
             clip_x=0,
             clip_y=0,
             clip_w=destination.w,
@@ -28,6 +25,7 @@ class Pen(BitBlt):
 
         self.color = color
         self.is_down = False
+        self.recorder = None
 
     @property
     def is_up(self):
@@ -39,30 +37,32 @@ class Pen(BitBlt):
     def down(self):
         self.is_down = True
 
+    def record_into(self, display_list):
+        """Record strokes into display_list instead of drawing them, None
+        goes back to drawing."""
+        self.recorder = display_list
+
     def set_color(self, color):
         self.color = color
-        self.source.fill(self.color)
+        self.fill = color
 
     def scale_up(self, factor):
-        self.source.w *= factor
         self.width *= factor
-
-        self.source.h *= factor
         self.height *= factor
 
-        self.source.fill(self.color)
-
     def scale_down(self, factor):
-        self.source.w /= factor
-        self.width /= factor
-
-        self.source.h /= factor
-        self.height /= factor
-
-        self.source.fill(self.color)
+        self.width = max(1, self.width // factor)
+        self.height = max(1, self.height // factor)
 
     def line(self, from_x, from_y, to_x, to_y):
+        self.polyline([(from_x, from_y), (to_x, to_y)])
+
+    def polyline(self, points):
         if self.is_up:
             return
 
-        super().draw_line(from_x, from_y, to_x, to_y)
+        if self.recorder is not None:
+            self.recorder.stroke(points, self.fill, self.width, self.height, self.combination_rule)
+            return
+
+        super().draw_polyline(points)
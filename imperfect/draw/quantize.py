@@ -0,0 +1,127 @@
+"""
+Turn forms into indexed forms with the colors of a palette, optionally
+dithered.
+
+Every pixel value is mapped to a palette index once, through a ColorCube,
+and remembered by the indexed form so rows are quantized with a dict lookup
+per pixel. Ordered dithering adds a threshold to the channels of each pixel
+with translate tables first, Floyd-Steinberg dithering carries the error of
+every pixel to its neighbours and so works pixel by pixel.
+"""
+
+from .convert import pixels_of
+from .cube import ColorCube
+from .form import Form, IndexedForm
+from .palette import Palette
+
+
+# thresholds of a 4x4 bayer matrix
+BAYER = [
+    [0, 8, 2, 10],
+    [12, 4, 14, 6],
+    [3, 11, 1, 9],
+    [15, 7, 13, 5],
+]
+
+
+def clamp_table(offset):
+    return bytes(min(255, max(0, v + offset)) for v in range(256))
+
+
+def indices_of(indexed, pixels):
+    """Return the palette index of every 32 bit pixel of a row."""
+    return bytes(map(indexed.indices.__getitem__, memoryview(pixels).cast('I')))
+
+
+def rows_of(form):
+    """Yield the rows of form as 32 bit pixels."""
+    target = None if form.bits_per_pixel == 32 else Form(0, 0, 1, 1)
+    for y in range(form.h):
+        if target is None:
+            yield bytes(form.row_bytes(0, y, form.w))
+        else:
+            yield pixels_of(form, 0, y, form.w, target)
+
+
+def quantize(form, palette=None, dither=None, spread=32):
+    """Return an indexed form with the colors of form mapped to the nearest
+    ones of palette (Palette.values() by default). dither is None,
+    'ordered' (thresholds spread apart, about the distance between the
+    palette's colors works best) or 'floyd-steinberg'."""
+    palette = palette or Palette.values()
+    indexed = IndexedForm(0, 0, form.w, form.h, palette=palette)
+
+    match dither:
+        case None:
+            quantize_row = lambda y, pixels: indices_of(indexed, pixels)
+        case 'ordered':
+            quantize_row = OrderedDither(indexed, spread)
+        case 'floyd-steinberg':
+            quantize_row = ErrorDiffusion(ColorCube.of(palette), form.w)
+        case _:
+            raise ValueError(f'unknown dither={dither}')
+
+    for y, pixels in enumerate(rows_of(form)):
+        byte_0 = indexed.byte_offset(0, y)
+        indexed.bitmap[byte_0:byte_0 + form.w] = quantize_row(y, pixels)
+    return indexed
+
+
+class OrderedDither:
+    def __init__(self, indexed, spread):
+        self.indexed = indexed
+        self.tables = [
+            [clamp_table(round(((threshold + 0.5) / 16 - 0.5) * spread)) for threshold in row]
+            for row in BAYER
+        ]
+
+    def __call__(self, y, pixels):
+        # the same threshold is added to every 4th pixel of a row
+        pixels = bytearray(pixels)
+        for phase, table in enumerate(self.tables[y % 4]):
+            for channel in (1, 2, 3):
+                start = phase * 4 + channel
+                pixels[start::16] = pixels[start::16].translate(table)
+        return indices_of(self.indexed, pixels)
+
+
+class ErrorDiffusion:
+    def __init__(self, cube, width):
+        self.cube = cube
+        self.errors = [0] * ((width + 2) * 3)
+
+    def __call__(self, y, pixels):
+        # errors hold r, g and b of every pixel, this row's are read at
+        # x + 1, the ones spread to the next row are collected in a fresh
+        # list
+        index_of_rgb = self.cube.index_of_rgb
+        rgb = self.cube.rgb
+        errors = self.errors
+        below = [0] * len(errors)
+        indices = bytearray(len(pixels) // 4)
+
+        for x in range(len(indices)):
+            e = x * 3 + 3
+            r = min(255, max(0, pixels[x * 4 + 3] + (errors[e] >> 4)))
+            g = min(255, max(0, pixels[x * 4 + 2] + (errors[e + 1] >> 4)))
+            b = min(255, max(0, pixels[x * 4 + 1] + (errors[e + 2] >> 4)))
+            index = index_of_rgb(r, g, b)
+            indices[x] = index
+
+            pr, pg, pb = rgb[index]
+            dr, dg, db = r - pr, g - pg, b - pb
+            errors[e + 3] += dr * 7
+            errors[e + 4] += dg * 7
+            errors[e + 5] += db * 7
+            below[e - 3] += dr * 3
+            below[e - 2] += dg * 3
+            below[e - 1] += db * 3
+            below[e] += dr * 5
+            below[e + 1] += dg * 5
+            below[e + 2] += db * 5
+            below[e + 3] += dr
+            below[e + 4] += dg
+            below[e + 5] += db
+
+        self.errors = below
+        return bytes(indices)
@@ -0,0 +1,76 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class Rect:
+    x: int
+    y: int
+    w: int
+    h: int
+
+    @property
+    def right(self):
+        return self.x + self.w
+
+    @property
+    def bottom(self):
+        return self.y + self.h
+
+    @property
+    def area(self):
+        return self.w * self.h
+
+    @property
+    def is_empty(self):
+        return self.w <= 0 or self.h <= 0
+
+    def intersect(self, other):
+        x = max(self.x, other.x)
+        y = max(self.y, other.y)
+        return Rect(x, y, min(self.right, other.right) - x, min(self.bottom, other.bottom) - y)
+
+    def union(self, other):
+        x = min(self.x, other.x)
+        y = min(self.y, other.y)
+        return Rect(x, y, max(self.right, other.right) - x, max(self.bottom, other.bottom) - y)
+
+    def intersects(self, other):
+        return not self.intersect(other).is_empty
+
+    def contains(self, other):
+        return (
+            self.x <= other.x and self.y <= other.y and
+            other.right <= self.right and other.bottom <= self.bottom
+        )
+
+
+def bounding_rect(rects):
+    """Return the smallest rectangle containing all rects."""
+    bounds = None
+    for rect in rects:
+        bounds = rect if bounds is None else bounds.union(rect)
+    return bounds
+
+
+def merge_rects(rects, max_count=16):
+    """Merge rectangles whose union covers no more than the rectangles
+    themselves (they overlap or sit next to each other), when too many
+    remain they are collapsed into their bounding rectangle."""
+    merged = [rect for rect in rects if not rect.is_empty]
+
+    i = 0
+    while i < len(merged):
+        j = i + 1
+        while j < len(merged):
+            union = merged[i].union(merged[j])
+            if union.area <= merged[i].area + merged[j].area:
+                merged[i] = union
+                del merged[j]
+                j = i + 1
+                continue
+            j += 1
+        i += 1
+
+    if len(merged) > max_count:
+        return [bounding_rect(merged)]
+    return merged
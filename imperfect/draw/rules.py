@@ -0,0 +1,112 @@
+"""Combination rules for bitblt.
+
+Rows of pixels are combined as python ints, so every rule costs a handful
+of C level operations on the whole row (or block of rows) instead of a loop
+over its bytes."""
+
+from enum import IntEnum
+
+from .alpha import composite
+
+
+class CombinationRule(IntEnum):
+    ALL_ZEROS                            = 0
+    SOURCE_AND_DESTINATION               = 1
+    SOURCE_AND_DESTINATION_INVERT        = 2
+    SOURCE_ONLY                          = 3
+    SOURCE_INVERT_AND_DESTINATION        = 4
+    DESTINATION_ONLY                     = 5
+    SOURCE_XOR_DESTINATION               = 6
+    SOURCE_OR_DESTINATION                = 7
+    SOURCE_INVERT_AND_DESTINATION_INVERT = 8
+    SOURCE_INVERT_XOR_DESTINATION        = 9
+    DESTINATION_INVERT                   = 10
+    SOURCE_OR_DESTINATION_INVERT         = 11
+    SOURCE_INVERT                        = 12
+    SOURCE_INVERT_OR_DESTINATION         = 13
+    SOURCE_INVERT_OR_DESTINATION_INVERT  = 14
+    ALL_ONES                             = 15
+
+    # porter-duff compositing of premultiplied pixels, see alpha.py
+    SOURCE_OVER                          = 16
+    SOURCE_IN                            = 17
+    SOURCE_OUT                           = 18
+    SOURCE_ATOP                          = 19
+    DESTINATION_OVER                     = 20
+    DESTINATION_IN                       = 21
+    DESTINATION_OUT                      = 22
+    DESTINATION_ATOP                     = 23
+    ALPHA_XOR                            = 24
+
+
+# each rule takes the source and destination bits and a mask with all bits
+# set, python ints have no fixed width so inverting is done by xor-ing
+# against the mask rather than with ~
+RULES = {
+    CombinationRule.ALL_ZEROS:                            lambda s, d, ones: 0,
+    CombinationRule.SOURCE_AND_DESTINATION:               lambda s, d, ones: s & d,
+    CombinationRule.SOURCE_AND_DESTINATION_INVERT:        lambda s, d, ones: s & (d ^ ones),
+    CombinationRule.SOURCE_ONLY:                          lambda s, d, ones: s,
+    CombinationRule.SOURCE_INVERT_AND_DESTINATION:        lambda s, d, ones: (s ^ ones) & d,
+    CombinationRule.DESTINATION_ONLY:                     lambda s, d, ones: d,
+    CombinationRule.SOURCE_XOR_DESTINATION:               lambda s, d, ones: s ^ d,
+    CombinationRule.SOURCE_OR_DESTINATION:                lambda s, d, ones: s | d,
+    CombinationRule.SOURCE_INVERT_AND_DESTINATION_INVERT: lambda s, d, ones: (s | d) ^ ones,
+    CombinationRule.SOURCE_INVERT_XOR_DESTINATION:        lambda s, d, ones: s ^ d ^ ones,
+    CombinationRule.DESTINATION_INVERT:                   lambda s, d, ones: d ^ ones,
+    CombinationRule.SOURCE_OR_DESTINATION_INVERT:         lambda s, d, ones: s | (d ^ ones),
+    CombinationRule.SOURCE_INVERT:                        lambda s, d, ones: s ^ ones,
+    CombinationRule.SOURCE_INVERT_OR_DESTINATION:         lambda s, d, ones: (s ^ ones) | d,
+    CombinationRule.SOURCE_INVERT_OR_DESTINATION_INVERT:  lambda s, d, ones: (s & d) ^ ones,
+    CombinationRule.ALL_ONES:                             lambda s, d, ones: ones,
+}
+
+
+# rules whose result doesn't depend on the destination, drawing with them
+# overwrites whatever was there before
+OPAQUE_RULES = frozenset({
+    CombinationRule.ALL_ZEROS,
+    CombinationRule.SOURCE_ONLY,
+    CombinationRule.SOURCE_INVERT,
+    CombinationRule.ALL_ONES,
+})
+
+
+# the factors source and destination are multiplied by for each operator
+PORTER_DUFF = {
+    CombinationRule.SOURCE_OVER:      ('one',                       'inverse_source_alpha'),
+    CombinationRule.SOURCE_IN:        ('destination_alpha',         'zero'),
+    CombinationRule.SOURCE_OUT:       ('inverse_destination_alpha', 'zero'),
+    CombinationRule.SOURCE_ATOP:      ('destination_alpha',         'inverse_source_alpha'),
+    CombinationRule.DESTINATION_OVER: ('inverse_destination_alpha', 'one'),
+    CombinationRule.DESTINATION_IN:   ('zero',                      'source_alpha'),
+    CombinationRule.DESTINATION_OUT:  ('zero',                      'inverse_source_alpha'),
+    CombinationRule.DESTINATION_ATOP: ('inverse_destination_alpha', 'source_alpha'),
+    CombinationRule.ALPHA_XOR:        ('inverse_destination_alpha', 'inverse_source_alpha'),
+}
+
+
+def combine(rule, source_bytes, destination_bytes):
+    """Return the bytes resulting from combining source and destination
+    bytes under the given rule, both must have the same length."""
+    length = len(destination_bytes)
+    if len(source_bytes) != length:
+        raise ValueError(f'source and destination length do not match. source={len(source_bytes)}, destination={length}')
+
+    match rule:
+        case CombinationRule.ALL_ZEROS:
+            return bytes(length)
+        case CombinationRule.ALL_ONES:
+            return b'\xff' * length
+        case CombinationRule.SOURCE_ONLY:
+            return bytes(source_bytes)
+        case CombinationRule.DESTINATION_ONLY:
+            return bytes(destination_bytes)
+
+    if rule in PORTER_DUFF:
+        return composite(*PORTER_DUFF[rule], source_bytes, destination_bytes)
+
+    source = int.from_bytes(source_bytes)
+    destination = int.from_bytes(destination_bytes)
+    ones = (1 << (length * 8)) - 1
+    return RULES[rule](source, destination, ones).to_bytes(length)
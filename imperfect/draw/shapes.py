@@ -0,0 +1,166 @@
+"""
+Filled and outlined rectangles, ellipses, circles and polygons.
+
+Shapes are rasterized into horizontal (y, x_start, x_stop) spans which are
+filled with BitBlt.fill_spans, so every row of a shape is a single write
+whatever its size. Pixels belong to a shape when their centers do.
+
+    shapes.fill_circle(screen, 40, 40, 16, Palette.RED)
+    shapes.draw_polygon(screen, [(0, 0), (30, 5), (10, 20)], Palette.WHITE)
+"""
+
+from math import ceil, isqrt
+
+from .bitblt import BitBlt, brush_spans, line_points
+from .rules import CombinationRule
+
+
+def rect_spans(x, y, w, h):
+    return [(row, x, x + w) for row in range(y, y + h)] if w > 0 else []
+
+
+def rect_outline_spans(x, y, w, h, thickness=1):
+    if w <= 2 * thickness or h <= 2 * thickness:
+        return rect_spans(x, y, w, h)
+
+    spans = rect_spans(x, y, w, thickness)
+    for row in range(y + thickness, y + h - thickness):
+        spans.append((row, x, x + thickness))
+        spans.append((row, x + w - thickness, x + w))
+    return spans + rect_spans(x, y + h - thickness, w, thickness)
+
+
+def ellipse_half_widths(rx, ry):
+    # pixel centers dx, dy inside an ellipse with radii grown by half a
+    # pixel, in halves so it stays integer: (2dx / (2rx + 1))^2 + (2dy /
+    # (2ry + 1))^2 <= 1
+    width, height = (2 * rx + 1) ** 2, (2 * ry + 1) ** 2
+    return {dy: isqrt(width * (height - (2 * dy) ** 2) // height) // 2 for dy in range(-ry, ry + 1)}
+
+
+def ellipse_spans(cx, cy, rx, ry):
+    if rx < 0 or ry < 0:
+        return []
+    return [(cy + dy, cx - half, cx + half + 1) for dy, half in ellipse_half_widths(rx, ry).items()]
+
+
+def ellipse_outline_spans(cx, cy, rx, ry, thickness=1):
+    if rx < 0 or ry < 0:
+        return []
+
+    inner = ellipse_half_widths(rx - thickness, ry - thickness) if min(rx, ry) >= thickness else {}
+    spans = []
+    for dy, half in ellipse_half_widths(rx, ry).items():
+        if dy not in inner:
+            spans.append((cy + dy, cx - half, cx + half + 1))
+            continue
+        spans.append((cy + dy, cx - half, cx - inner[dy]))
+        spans.append((cy + dy, cx + inner[dy] + 1, cx + half + 1))
+    return spans
+
+
+def polygon_spans(points):
+    """Return the spans inside a polygon by the even-odd rule, with an active
+    edge table stepping every edge crossing a row to the next one."""
+    edges = []
+    for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1]):
+        if y0 == y1:
+            continue
+        if y0 > y1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        # the first and last rows whose centers the edge crosses
+        top = ceil(y0 - 0.5)
+        bottom = ceil(y1 - 0.5)
+        if top < bottom:
+            slope = (x1 - x0) / (y1 - y0)
+            edges.append([top, bottom, x0 + (top + 0.5 - y0) * slope, slope])
+
+    if not edges:
+        return []
+
+    edges.sort(key=lambda edge: edge[0])
+    spans = []
+    active = []
+    pending = 0
+    y = edges[0][0]
+    while pending < len(edges) or active:
+        while pending < len(edges) and edges[pending][0] == y:
+            active.append(edges[pending])
+            pending += 1
+
+        crossings = sorted(edge[2] for edge in active)
+        for x_start, x_stop in zip(crossings[0::2], crossings[1::2]):
+            start, stop = ceil(x_start - 0.5), ceil(x_stop - 0.5)
+            if start < stop:
+                spans.append((y, start, stop))
+
+        y += 1
+        active = [edge for edge in active if edge[1] > y]
+        for edge in active:
+            edge[2] += edge[3]
+        if not active and pending < len(edges):
+            y = edges[pending][0]
+    return spans
+
+
+def polygon_outline_spans(points, thickness=1):
+    if not points:
+        return []
+
+    stamps = [points[0]]
+    for point in points[1:] + points[:1]:
+        stamps.extend(line_points(*stamps[-1], *point))
+    offset = thickness // 2
+    return brush_spans([(x - offset, y - offset) for x, y in stamps], thickness, thickness)
+
+
+def fill(form, spans, color, rule=CombinationRule.SOURCE_ONLY, clip=None):
+    """Fill spans of form with color (or a halftone form) under rule."""
+    BitBlt(
+        destination=form,
+        source=None,
+        fill=color,
+        combination_rule=rule,
+        destination_x=0,
+        destination_y=0,
+        source_x=0,
+        source_y=0,
+        width=0,
+        height=0,
+        clip_x=clip.x if clip else 0,
+        clip_y=clip.y if clip else 0,
+        clip_w=clip.w if clip else None,
+        clip_h=clip.h if clip else None,
+    ).fill_spans(spans)
+
+
+def fill_rect(form, x, y, w, h, color, **kwargs):
+    fill(form, rect_spans(x, y, w, h), color, **kwargs)
+
+
+def draw_rect(form, x, y, w, h, color, thickness=1, **kwargs):
+    fill(form, rect_outline_spans(x, y, w, h, thickness), color, **kwargs)
+
+
+def fill_ellipse(form, cx, cy, rx, ry, color, **kwargs):
+    fill(form, ellipse_spans(cx, cy, rx, ry), color, **kwargs)
+
+
+def draw_ellipse(form, cx, cy, rx, ry, color, thickness=1, **kwargs):
+    fill(form, ellipse_outline_spans(cx, cy, rx, ry, thickness), color, **kwargs)
+
+
+def fill_circle(form, cx, cy, r, color, **kwargs):
+    fill(form, ellipse_spans(cx, cy, r, r), color, **kwargs)
+
+
+def draw_circle(form, cx, cy, r, color, thickness=1, **kwargs):
+    fill(form, ellipse_outline_spans(cx, cy, r, r, thickness), color, **kwargs)
+
+
+def fill_polygon(form, points, color, **kwargs):
+    fill(form, polygon_spans(list(points)), color, **kwargs)
+
+
+def draw_polygon(form, points, color, thickness=1, **kwargs):
+    fill(form, polygon_outline_spans(list(points), thickness), color, **kwargs)
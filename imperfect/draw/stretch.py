@@ -0,0 +1,125 @@
+"""
+Stretch a rectangle of one form onto a rectangle of a different size in
+another, sampling the nearest source pixel.
+
+Which source column and row every destination column and row samples is
+computed once per pair of sizes and cached. Rows are scaled whole: integer
+factors with a slice assignment per channel and repeat, any other ratio
+with a single itemgetter over the cached map. Each source row is scaled
+once no matter how many destination rows repeat it.
+"""
+
+from array import array
+from functools import lru_cache
+from operator import itemgetter
+
+from .bitblt import BitBltError
+from .convert import bits_of, needs_conversion, pixels_of
+from .rect import Rect
+from .rules import PORTER_DUFF, RULES, CombinationRule, combine
+
+
+@lru_cache(maxsize=128)
+def index_map(size, scaled_size):
+    """Return the index out of size that each of scaled_size indices
+    samples, taken at the center of every scaled pixel."""
+    return tuple(((2 * i + 1) * size) // (2 * scaled_size) for i in range(scaled_size))
+
+
+@lru_cache(maxsize=128)
+def picker(size, scaled_size):
+    indices = index_map(size, scaled_size)
+    if len(indices) == 1:
+        index, = indices
+        return lambda items: (items[index],)
+    return itemgetter(*indices)
+
+
+def scale_row(row, depth, size, scaled_size):
+    """Return a row of size pixels of depth bytes stretched or shrunk to
+    scaled_size pixels."""
+    if scaled_size % size == 0:
+        factor = scaled_size // size
+        scaled = bytearray(scaled_size * depth)
+        for repeat in range(factor):
+            for channel in range(depth):
+                scaled[repeat * depth + channel::factor * depth] = row[channel::depth]
+        return scaled
+
+    if size % scaled_size == 0:
+        factor = size // scaled_size
+        offset = (factor // 2) * depth
+        scaled = bytearray(scaled_size * depth)
+        for channel in range(depth):
+            scaled[channel::depth] = row[offset + channel::factor * depth]
+        return scaled
+
+    if depth == 4:
+        return array('I', picker(size, scaled_size)(memoryview(row).cast('I'))).tobytes()
+    return bytes(picker(size, scaled_size)(row))
+
+
+def stretch_bits(destination, source, x, y, w, h, source_rect=None, rule=CombinationRule.SOURCE_ONLY, clip=None):
+    """Draw source_rect of source (all of it by default) stretched over the
+    w x h rectangle at x, y of destination, combined under rule and
+    clipped to clip and the destination."""
+    source_rect = source_rect or Rect(0, 0, source.w, source.h)
+    if source_rect.is_empty or not Rect(0, 0, source.w, source.h).contains(source_rect):
+        raise BitBltError(f'{source_rect} is not inside the {source.w}x{source.h} source')
+    if rule in PORTER_DUFF and destination.bits_per_pixel != 32:
+        raise BitBltError(f'compositing rule={rule.name} needs a 32 bit destination')
+
+    bounds = Rect(x, y, w, h).intersect(Rect(0, 0, destination.w, destination.h))
+    if clip is not None:
+        bounds = bounds.intersect(clip)
+    if bounds.is_empty or rule == CombinationRule.DESTINATION_ONLY:
+        return
+
+    rows = index_map(source_rect.h, h)
+    left = bounds.x - x
+    right = bounds.right - x
+    previous = None
+
+    for row in range(bounds.y - y, bounds.bottom - y):
+        source_y = source_rect.y + rows[row]
+        destination_y = y + row
+        if destination.bits_per_pixel == 1:
+            if source_y != previous:
+                scaled = stretched_bits(source, source_rect, source_y, w, destination)[left:right]
+                scaled = int(scaled, 2)
+            ones = (1 << bounds.w) - 1
+            destination_bits = destination.row_bits(bounds.x, destination_y, bounds.w)
+            destination.write_row_bits(
+                bounds.x,
+                destination_y,
+                bounds.w,
+                RULES[rule](scaled, destination_bits, ones)
+            )
+        else:
+            depth = destination.depth
+            if source_y != previous:
+                scaled = stretched_pixels(source, source_rect, source_y, w, destination)[left * depth:right * depth]
+            byte_0 = destination.byte_offset(bounds.x, destination_y)
+            destination_row = memoryview(destination.bitmap)[byte_0:byte_0 + len(scaled)]
+            if rule == CombinationRule.SOURCE_ONLY:
+                destination_row[:] = scaled
+            else:
+                destination_row[:] = combine(rule, scaled, destination_row)
+        previous = source_y
+
+    destination.damage(bounds.x, bounds.y, bounds.w, bounds.h)
+
+
+def stretched_pixels(source, source_rect, source_y, w, destination):
+    # a row of the source in the format of the destination, w pixels wide
+    if needs_conversion(source, destination):
+        row = pixels_of(source, source_rect.x, source_y, source_rect.w, destination)
+    else:
+        row = source.row_bytes(source_rect.x, source_y, source_rect.w)
+    return scale_row(row, destination.depth, source_rect.w, w)
+
+
+def stretched_bits(source, source_rect, source_y, w, destination):
+    # a row of the source as ascii digits, a byte per bit, w bits wide
+    bits = bits_of(source, source_rect.x, source_y, source_rect.w, destination)
+    return scale_row(format(bits, f'0{source_rect.w}b').encode('ascii'), 1, source_rect.w, w)
@@ -0,0 +1,37 @@
+from imperfect.draw import bench
+from imperfect.util import jsonl
+
+
+def test_run_names_every_case_once():
+    results = bench.run(sizes=[(16, 8)], repeat=1)
+    names = [entry['name'] for entry in results]
+
+    assert len(names) == len(set(names))
+    assert 'copy_bits/SOURCE_ONLY/16x8' in names
+    assert 'fill/16x8' in names
+    assert all(entry['seconds'] > 0 for entry in results)
+
+
+def test_setup_runs_untimed_before_every_call():
+    calls = []
+
+    bench.timed(lambda: calls.append('fn'), 3, setup=lambda: calls.append('setup'))
+
+    assert calls == ['setup', 'fn'] * 3
+
+
+def test_compare_flags_cases_slower_than_baseline():
+    baseline = [{'name': 'a', 'seconds': 1.0}, {'name': 'b', 'seconds': 1.0}]
+    results = [{'name': 'a', 'seconds': 1.05}, {'name': 'b', 'seconds': 2.0}, {'name': 'c', 'seconds': 1.0}]
+
+    comparisons = bench.compare(results, baseline)
+
+    assert [(entry['name'], entry['regressed']) for entry in comparisons] == [('a', False), ('b', True)]
+
+
+def test_main_writes_results_and_compares_to_them(tmp_path):
+    output = tmp_path / 'bench.jsonl'
+    assert bench.main(['--size', '8x8', '--repeat', '1', '--output', str(output)]) == 0
+
+    results = jsonl.load(output)
+    assert bench.compare(results, results)[0]['ratio'] == 1.0
@@ -0,0 +1,464 @@
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from imperfect.draw import BitBlt, Color, CombinationRule, Form, Pen
+from imperfect.draw.bitblt import BitBltError, brush_spans, line_points
+from imperfect.draw.form import BitForm, IndexedForm
+from imperfect.draw.rect import Rect
+
+
+RED = Color(255, 0, 0)
+BLUE = Color(0, 0, 255)
+
+
+def blit(destination, source, rule=CombinationRule.SOURCE_ONLY, dx=0, dy=0, sx=0, sy=0, w=None, h=None, **kwargs):
+    bitblt = BitBlt(
+        destination=destination,
+        source=source,
+        fill=kwargs.pop('fill', None),
+        combination_rule=rule,
+        destination_x=dx,
+        destination_y=dy,
+        source_x=sx,
+        source_y=sy,
+        width=source.w if w is None else w,
+        height=source.h if h is None else h,
+        **kwargs
+    )
+    bitblt.copy_bits()
+    return bitblt
+
+
+@pytest.fixture
+def screen():
+    form = Form(0, 0, 16, 12)
+    form.fill(BLUE)
+    return form
+
+
+@pytest.fixture
+def brush():
+    form = Form(0, 0, 4, 3)
+    form.fill(RED)
+    return form
+
+
+def test_copy_full_width_block(screen):
+    source = Form(0, 0, 16, 4)
+    source.fill(RED)
+
+    blit(screen, source, dy=2)
+
+    assert screen.color_at(0, 1) == BLUE
+    assert all(screen.color_at(x, y) == RED for x in range(16) for y in range(2, 6))
+    assert screen.color_at(15, 6) == BLUE
+
+
+def test_copy_partial_rows(screen, brush):
+    blit(screen, brush, dx=3, dy=5)
+
+    assert screen.color_at(2, 5) == BLUE
+    assert screen.color_at(3, 5) == RED
+    assert screen.color_at(6, 7) == RED
+    assert screen.color_at(7, 7) == BLUE
+    assert screen.color_at(3, 8) == BLUE
+
+
+def test_copy_is_clipped_to_destination(screen, brush):
+    blit(screen, brush, dx=14, dy=10)
+
+    assert screen.color_at(14, 10) == RED
+    assert screen.color_at(15, 11) == RED
+    assert screen.color_at(13, 11) == BLUE
+
+
+def test_copy_is_clipped_to_clipping_rectangle(screen, brush):
+    blit(screen, brush, dx=2, dy=2, clip_x=3, clip_y=3, clip_w=2, clip_h=8)
+
+    assert screen.color_at(2, 2) == BLUE
+    assert screen.color_at(3, 2) == BLUE
+    assert screen.color_at(3, 3) == RED
+    assert screen.color_at(4, 4) == RED
+    assert screen.color_at(5, 4) == BLUE
+
+
+REFERENCE_RULES = {
+    CombinationRule.ALL_ZEROS: lambda s, d: 0x00,
+    CombinationRule.SOURCE_AND_DESTINATION: lambda s, d: s & d,
+    CombinationRule.SOURCE_AND_DESTINATION_INVERT: lambda s, d: s & ~d,
+    CombinationRule.SOURCE_ONLY: lambda s, d: s,
+    CombinationRule.SOURCE_INVERT_AND_DESTINATION: lambda s, d: ~s & d,
+    CombinationRule.DESTINATION_ONLY: lambda s, d: d,
+    CombinationRule.SOURCE_XOR_DESTINATION: lambda s, d: s ^ d,
+    CombinationRule.SOURCE_OR_DESTINATION: lambda s, d: s | d,
+    CombinationRule.SOURCE_INVERT_AND_DESTINATION_INVERT: lambda s, d: ~s & ~d,
+    CombinationRule.SOURCE_INVERT_XOR_DESTINATION: lambda s, d: ~s ^ d,
+    CombinationRule.DESTINATION_INVERT: lambda s, d: ~d,
+    CombinationRule.SOURCE_OR_DESTINATION_INVERT: lambda s, d: s | ~d,
+    CombinationRule.SOURCE_INVERT: lambda s, d: ~s,
+    CombinationRule.SOURCE_INVERT_OR_DESTINATION: lambda s, d: ~s | d,
+    CombinationRule.SOURCE_INVERT_OR_DESTINATION_INVERT: lambda s, d: ~s | ~d,
+    CombinationRule.ALL_ONES: lambda s, d: 0xff,
+}
+
+
+@pytest.mark.parametrize('rule', list(REFERENCE_RULES))
+@pytest.mark.parametrize('width', [16, 4])
+def test_combination_rules_match_bytewise_reference(screen, rule, width):
+    source = Form(0, 0, width, 3)
+    source.fill(Color(0x0f, 0x33, 0x55, 0xc3))
+    expected = [
+        REFERENCE_RULES[rule](s, d) & 0xff
+        for s, d
+        in zip(source.row_bytes(0, 0, width), screen.row_bytes(0, 4, width))
+    ]
+
+    blit(screen, source, rule=rule, dy=4)
+
+    assert list(screen.row_bytes(0, 4, width)) == expected
+    assert list(screen.row_bytes(0, 6, width)) == expected
+    assert screen.color_at(0, 7) == BLUE
+
+
+def test_fill_without_source_paints_color(screen):
+    blit(screen, None, fill=RED, dx=2, dy=3, w=5, h=2)
+
+    assert screen.color_at(1, 3) == BLUE
+    assert all(screen.color_at(x, y) == RED for x in range(2, 7) for y in range(3, 5))
+    assert screen.color_at(7, 4) == BLUE
+    assert screen.color_at(2, 5) == BLUE
+
+
+def test_halftone_pattern_is_tiled_from_destination_origin(screen):
+    pattern = Form(0, 0, 2, 2)
+    pattern.fill(BLUE)
+    pattern.put_color_at(0, 0, RED)
+    pattern.put_color_at(1, 1, RED)
+
+    blit(screen, None, fill=pattern, dx=3, dy=1, w=6, h=3)
+
+    for x in range(3, 9):
+        for y in range(1, 4):
+            expected = RED if (x + y) % 2 == 0 else BLUE
+            assert screen.color_at(x, y) == expected
+
+
+def test_halftone_masks_source(screen):
+    source = Form(0, 0, 4, 1)
+    source.fill(Color(0xff, 0xff, 0xff))
+    mask = Color(0xff, 0x00, 0x00)
+
+    blit(screen, source, rule=CombinationRule.SOURCE_OR_DESTINATION, fill=mask)
+
+    assert screen.color_at(0, 0) == Color(0xff, 0x00, 0xff)
+    assert screen.color_at(4, 0) == BLUE
+
+
+def test_line_points_end_at_destination():
+    assert line_points(0, 0, 3, 1) == [(1, 0), (2, 1), (3, 1)]
+    assert line_points(2, 5, 2, 2) == [(2, 4), (2, 3), (2, 2)]
+    assert line_points(1, 1, 1, 1) == []
+
+
+def test_brush_spans_merge_adjacent_stamps():
+    spans = brush_spans([(0, 0), (1, 0), (2, 1), (10, 1)], 2, 2)
+
+    assert spans == [(0, 0, 3), (1, 0, 4), (1, 10, 12), (2, 2, 4), (2, 10, 12)]
+
+
+def test_pen_polyline_draws_every_segment(screen):
+    pen = Pen(screen, RED, 1, 1)
+    pen.down()
+    pen.polyline([(1, 1), (5, 1), (5, 4)])
+
+    assert all(screen.color_at(x, 1) == RED for x in range(1, 6))
+    assert all(screen.color_at(5, y) == RED for y in range(1, 5))
+    assert screen.color_at(0, 1) == BLUE
+    assert screen.color_at(4, 2) == BLUE
+
+
+def test_pen_stroke_is_clipped(screen):
+    pen = Pen(screen, RED, 3, 3)
+    pen.down()
+    pen.line(-5, 10, 20, 10)
+
+    assert all(screen.color_at(x, y) == RED for x in range(16) for y in range(10, 12))
+    assert screen.color_at(0, 9) == BLUE
+
+
+def test_pen_up_does_not_draw(screen):
+    pen = Pen(screen, RED, 2, 2)
+    pen.line(0, 0, 10, 10)
+
+    assert screen.color_at(0, 0) == BLUE
+
+
+def test_blit_damages_clipped_destination_rectangle(screen, brush):
+    screen.take_damage()
+
+    blit(screen, brush, dx=14, dy=-1)
+
+    assert screen.take_damage() == [Rect(14, 0, 2, 2)]
+
+
+def test_pen_stroke_damages_its_bounds(screen):
+    screen.take_damage()
+    pen = Pen(screen, RED, 2, 2)
+    pen.down()
+    pen.line(1, 1, 6, 3)
+
+    assert screen.take_damage() == [Rect(1, 1, 7, 4)]
+
+
+def test_blit_between_views(screen):
+    sheet = Form(0, 0, 8, 8)
+    sheet.fill(BLUE)
+    sheet.view(4, 4, 2, 2).fill(RED)
+
+    blit(screen.view(8, 4, 8, 8), sheet.view(4, 4, 4, 4), dx=1, dy=1)
+
+    assert screen.color_at(9, 5) == RED
+    assert screen.color_at(10, 6) == RED
+    assert screen.color_at(11, 5) == BLUE
+    assert screen.color_at(8, 4) == BLUE
+
+
+def test_pen_draws_through_view(screen):
+    pen = Pen(screen.view(8, 0, 8, 4), RED, 1, 1)
+    pen.down()
+    pen.line(-4, 2, 20, 2)
+
+    assert screen.color_at(7, 2) == BLUE
+    assert all(screen.color_at(x, 2) == RED for x in range(8, 16))
+
+
+@pytest.mark.parametrize('rule, expected', [
+    (CombinationRule.SOURCE_OR_DESTINATION, 0b1110),
+    (CombinationRule.SOURCE_AND_DESTINATION, 0b1000),
+    (CombinationRule.SOURCE_XOR_DESTINATION, 0b0110),
+    (CombinationRule.SOURCE_INVERT_AND_DESTINATION, 0b0010),
+])
+def test_rules_on_bit_forms(rule, expected):
+    source = BitForm(0, 0, 4, 1)
+    source.put_row_bits(0, 0, 4, 0b1100)
+    destination = BitForm(0, 0, 40, 1)
+    destination.put_row_bits(30, 0, 4, 0b1010)
+
+    blit(destination, source, rule=rule, dx=30)
+
+    assert destination.row_bits(30, 0, 4) == expected
+    assert destination.row_bits(0, 0, 30) == 0
+    assert destination.row_bits(34, 0, 6) == 0
+
+
+def test_convert_bits_to_colors(screen):
+    mask = BitForm(0, 0, 3, 2, foreground=RED, background=BLUE)
+    mask.put_bit_at(1, 0, 1)
+    mask.put_bit_at(2, 1, 1)
+
+    blit(screen, mask, dx=4, dy=4)
+
+    assert screen.color_at(4, 4) == BLUE
+    assert screen.color_at(5, 4) == RED
+    assert screen.color_at(6, 5) == RED
+    assert screen.color_at(5, 5) == BLUE
+
+
+def test_convert_colors_to_bits(screen):
+    screen.put_color_at(2, 1, RED)
+    screen.put_color_at(3, 2, RED)
+    mask = BitForm(0, 0, 4, 4, background=BLUE)
+
+    blit(mask, screen, sx=1, sy=1, w=4, h=4)
+
+    assert mask.row_bits(0, 0, 4) == 0b0100
+    assert mask.row_bits(0, 1, 4) == 0b0010
+    assert mask.row_bits(0, 2, 4) == 0
+
+
+def test_convert_between_indexed_and_colors(screen):
+    palette = [BLUE, RED]
+    indexed = IndexedForm(0, 0, 4, 1, palette=palette)
+    indexed.put_color_at(2, 0, RED)
+
+    blit(screen, indexed, dx=1, dy=1)
+    assert [screen.color_at(x, 1) for x in range(1, 5)] == [BLUE, BLUE, RED, BLUE]
+
+    back = IndexedForm(0, 0, 4, 1, palette=[RED, BLUE])
+    blit(back, screen, sx=1, sy=1, w=4, h=1)
+    assert list(back.bitmap) == [1, 1, 0, 1]
+
+
+def test_pen_on_bit_form():
+    form = BitForm(0, 0, 16, 4)
+    pen = Pen(form, form.foreground, 1, 1)
+    pen.down()
+    pen.line(2, 1, 9, 1)
+
+    assert form.row_bits(0, 1, 16) == 0b0011111111000000
+
+
+def product(a, c):
+    return (a * c + 127) // 255
+
+
+def porter_duff_reference(rule, source, destination):
+    sa, da = source[0], destination[0]
+    fa, fb = {
+        CombinationRule.SOURCE_OVER: (255, 255 - sa),
+        CombinationRule.SOURCE_IN: (da, 0),
+        CombinationRule.SOURCE_OUT: (255 - da, 0),
+        CombinationRule.SOURCE_ATOP: (da, 255 - sa),
+        CombinationRule.DESTINATION_OVER: (255 - da, 255),
+        CombinationRule.DESTINATION_IN: (0, sa),
+        CombinationRule.DESTINATION_OUT: (0, 255 - sa),
+        CombinationRule.DESTINATION_ATOP: (255 - da, sa),
+        CombinationRule.ALPHA_XOR: (255 - da, 255 - sa),
+    }[rule]
+    return [min(255, product(s, fa) + product(d, fb)) for s, d in zip(source, destination)]
+
+
+@pytest.mark.parametrize('rule', [rule for rule in CombinationRule if rule >= CombinationRule.SOURCE_OVER])
+def test_compositing_rules_match_per_pixel_reference(rule):
+    colors = [Color(200, 100, 50, 255), Color(90, 10, 0, 128), Color(0, 0, 0, 0), Color(30, 60, 90, 64)]
+    source = Form(0, 0, 4, 1)
+    destination = Form(0, 0, 4, 1)
+    for x, color in enumerate(colors):
+        source.put_color_at(x, 0, color.premultiplied())
+        destination.put_color_at(3 - x, 0, color.premultiplied())
+
+    expected = []
+    for x in range(4):
+        expected += porter_duff_reference(
+            rule,
+            source.row_bytes(x, 0, 1),
+            destination.row_bytes(x, 0, 1)
+        )
+
+    blit(destination, source, rule=rule)
+
+    assert list(destination.row_bytes(0, 0, 4)) == expected
+
+
+def test_source_over_with_many_alphas_in_a_row():
+    source = Form(0, 0, 64, 1)
+    destination = Form(0, 0, 64, 1)
+    destination.fill(Color(10, 200, 30, 255))
+    for x in range(64):
+        source.put_color_at(x, 0, Color(x * 4, 255 - x, 100, x * 4).premultiplied())
+
+    expected = []
+    for x in range(64):
+        expected += porter_duff_reference(
+            CombinationRule.SOURCE_OVER,
+            source.row_bytes(x, 0, 1),
+            destination.row_bytes(x, 0, 1)
+        )
+
+    blit(destination, source, rule=CombinationRule.SOURCE_OVER)
+
+    assert list(destination.row_bytes(0, 0, 64)) == expected
+
+
+def test_translucent_fill_over_destination(screen):
+    blit(screen, None, rule=CombinationRule.SOURCE_OVER, fill=Color(255, 0, 0, 128).premultiplied(), w=2, h=1)
+
+    assert screen.color_at(0, 0) == Color(128, 0, 127, 255)
+    assert screen.color_at(2, 0) == BLUE
+
+
+def test_compositing_needs_32_bit_destination():
+    with pytest.raises(BitBltError):
+        blit(BitForm(0, 0, 8, 8), Form(0, 0, 8, 8), rule=CombinationRule.SOURCE_OVER)
+
+
+def test_premultiply_form():
+    form = Form(0, 0, 2, 1)
+    form.put_color_at(0, 0, Color(255, 128, 0, 128))
+    form.put_color_at(1, 0, Color(10, 20, 30, 255))
+
+    form.premultiply()
+
+    assert form.color_at(0, 0) == Color(128, 64, 0, 128)
+    assert form.color_at(1, 0) == Color(10, 20, 30, 255)
+
+
+def numbered_form(w, h):
+    # every pixel a different color so moved pixels can be told apart
+    form = Form(0, 0, w, h)
+    for y in range(h):
+        for x in range(w):
+            form.put_color_at(x, y, Color(x, y, 7))
+    return form
+
+
+def pixels(form):
+    return [[form.color_at(x, y) for x in range(form.w)] for y in range(form.h)]
+
+
+@pytest.mark.parametrize('dx, dy', [(0, 1), (0, -1), (2, 0), (-2, 0), (1, 1), (-1, -1), (2, -1)])
+def test_overlapping_blit_inside_one_form(dx, dy):
+    form = numbered_form(8, 6)
+    before = pixels(form)
+
+    blit(form, form, dx=2 + dx, dy=1 + dy, sx=2, sy=1, w=4, h=3)
+
+    for y in range(3):
+        for x in range(4):
+            assert form.color_at(2 + dx + x, 1 + dy + y) == before[1 + y][2 + x]
+
+
+@pytest.mark.parametrize('dy', [1, -1])
+def test_overlapping_blit_between_views_of_one_form(dy):
+    form = numbered_form(8, 6)
+    before = pixels(form)
+
+    top, bottom = form.view(1, 0, 5, 5), form.view(1, 1, 5, 5)
+    source, destination = (top, bottom) if dy > 0 else (bottom, top)
+    blit(destination, source)
+
+    for y in range(5):
+        for x in range(5):
+            assert destination.color_at(x, y) == before[source.y + y][source.x + x]
+
+
+def test_overlapping_blit_inside_a_bit_form():
+    form = BitForm(0, 0, 16, 6)
+    for y in range(6):
+        form.put_row_bits(0, y, 16, 0x1234 * (y + 1))
+    before = [form.row_bits(0, y, 16) for y in range(6)]
+
+    blit(form, form, dx=3, dy=2, sx=0, sy=0, w=13, h=4)
+
+    for y in range(4):
+        assert form.row_bits(3, 2 + y, 13) == before[y] >> 3
+
+
+@pytest.mark.parametrize('fill', [None, Color(9, 8, 7)])
+@pytest.mark.parametrize('w', [8, 5])
+def test_banded_blit_matches_serial_blit(fill, w):
+    source = None if fill else numbered_form(8, 20)
+    serial = numbered_form(8, 20)
+    banded = numbered_form(8, 20)
+
+    blit(serial, source, dx=1, dy=2, w=w, h=17, fill=fill)
+    with ThreadPoolExecutor(4) as executor:
+        blit(banded, source, dx=1, dy=2, w=w, h=17, fill=fill, executor=executor, band_height=3)
+
+    assert banded.bitmap == serial.bitmap
+    assert banded.take_damage() == serial.take_damage()
+
+
+class RefusingExecutor:
+    def submit(self, fn, *args):
+        raise AssertionError('blit should not have been split into bands')
+
+
+def test_overlapping_blit_is_not_split_into_bands():
+    form = numbered_form(8, 20)
+    before = pixels(form)
+
+    blit(form, form, dy=1, w=8, h=18, executor=RefusingExecutor(), band_height=2)
+
+    assert pixels(form)[1:19] == before[0:18]
@@ -0,0 +1,129 @@
+from imperfect.draw import Color, CombinationRule, Form, Pen
+from imperfect.draw.displaylist import DisplayList
+from imperfect.draw.rect import Rect
+
+
+RED = Color(255, 0, 0)
+BLUE = Color(0, 0, 255)
+GREEN = Color(0, 255, 0)
+
+
+def scene():
+    sprite = Form(0, 0, 3, 3)
+    sprite.fill(GREEN)
+
+    commands = DisplayList()
+    commands.fill(0, 0, 16, 12, BLUE)
+    commands.fill(2, 2, 4, 4, RED)
+    commands.stroke([(1, 1), (10, 8)], GREEN, 2, 2)
+    commands.blit(sprite, 8, 2, rule=CombinationRule.SOURCE_XOR_DESTINATION)
+    commands.scroll(0, 0, 16, 12, 1, 2)
+    commands.fill(12, 0, 4, 4, RED)
+    return commands
+
+
+def drawn(commands, clip=None):
+    form = Form(0, 0, 16, 12)
+    commands.replay(form, clip)
+    return form
+
+
+def test_optimize_drops_overdrawn_commands():
+    commands = scene()
+    commands.fill(12, 0, 4, 4, RED)
+    commands.fill(0, 8, 16, 4, GREEN)
+    commands.fill(0, 7, 16, 5, BLUE)
+    dropped = commands.optimize()
+
+    assert dropped == 2
+    assert len(commands) == 7
+
+
+def test_commands_under_an_opaque_fill_are_dropped():
+    commands = scene()
+    commands.fill(0, 0, 16, 12, RED)
+
+    assert commands.optimize() == 6
+    assert drawn(commands).color_at(5, 5) == RED
+
+
+def test_optimized_list_draws_the_same_pixels():
+    commands = scene()
+    commands.fill(0, 8, 16, 4, GREEN)
+    commands.fill(0, 8, 16, 4, BLUE)
+    expected = drawn(commands)
+
+    commands.optimize()
+
+    assert drawn(commands).bitmap == expected.bitmap
+
+
+def test_fill_read_by_a_later_command_is_kept():
+    commands = DisplayList()
+    commands.fill(0, 0, 4, 4, RED)
+    commands.fill(0, 0, 4, 4, BLUE, rule=CombinationRule.SOURCE_OR_DESTINATION)
+    commands.fill(0, 0, 4, 4, GREEN)
+
+    assert commands.optimize() == 2
+
+    commands = DisplayList()
+    commands.fill(0, 0, 4, 4, RED)
+    commands.scroll(0, 0, 8, 8, 4, 0)
+    commands.fill(0, 0, 4, 4, GREEN)
+
+    assert commands.optimize() == 0
+
+
+def test_fill_copied_by_a_later_blit_from_the_form_is_kept():
+    form = Form(0, 0, 16, 12)
+    commands = DisplayList()
+    commands.fill(0, 0, 4, 4, RED)
+    commands.blit(form.view(0, 0, 8, 8), 8, 0, w=4, h=4, destination=form)
+    commands.fill(0, 0, 4, 4, GREEN)
+
+    assert commands.optimize() == 0
+    commands.replay(form)
+    assert form.color_at(9, 1) == RED
+    assert form.color_at(1, 1) == GREEN
+
+
+def test_clipped_replay_matches_full_replay_inside_the_clip():
+    commands = scene()
+    expected = drawn(commands)
+    clip = Rect(3, 3, 5, 4)
+
+    form = drawn(commands, clip)
+
+    for y in range(clip.y, clip.bottom):
+        for x in range(clip.x, clip.right):
+            assert form.color_at(x, y) == expected.color_at(x, y)
+
+
+def test_clipped_replay_skips_commands_outside_the_clip():
+    commands = DisplayList()
+    commands.fill(0, 0, 4, 4, RED)
+    commands.fill(8, 8, 4, 4, RED)
+
+    form = drawn(commands, Rect(0, 0, 6, 6))
+
+    assert form.color_at(1, 1) == RED
+    assert form.color_at(9, 9) == Color(0, 0, 0, 0)
+    assert form.take_damage() == [Rect(0, 0, 4, 4)]
+
+
+def test_pen_records_strokes_and_joins_them():
+    form = Form(0, 0, 16, 12)
+    commands = DisplayList()
+    pen = Pen(form, RED, 2, 2)
+    pen.record_into(commands)
+    pen.down()
+
+    pen.line(0, 0, 5, 5)
+    pen.line(5, 5, 10, 2)
+
+    assert len(commands) == 1
+    assert form.color_at(0, 0) != RED
+
+    commands.replay(form)
+    assert form.color_at(0, 0) == RED
+    assert form.color_at(10, 2) == RED
@@ -0,0 +1,123 @@
+import pytest
+
+from imperfect.draw import Color, Form
+from imperfect.draw.bitblt import BitBltError
+from imperfect.draw.font import Font
+from imperfect.draw.form import BitForm, IndexedForm
+
+
+WHITE = Color(255, 255, 255)
+BLACK = Color(0, 0, 0)
+
+TINY_BDF = '''STARTFONT 2.1
+FONTBOUNDINGBOX 3 4 0 -1
+STARTPROPERTIES 2
+FONT_ASCENT 3
+FONT_DESCENT 1
+ENDPROPERTIES
+CHARS 3
+STARTCHAR bar
+ENCODING 124
+DWIDTH 2 0
+BBX 1 4 0 -1
+BITMAP
+80
+80
+80
+80
+ENDCHAR
+STARTCHAR L
+ENCODING 76
+DWIDTH 4 0
+BBX 3 3 0 0
+BITMAP
+80
+80
+E0
+ENDCHAR
+STARTCHAR j
+ENCODING 106
+DWIDTH 2 0
+BBX 2 2 -1 -1
+BITMAP
+40
+80
+ENDCHAR
+ENDFONT
+'''
+
+
+@pytest.fixture
+def font():
+    return Font.from_bdf(TINY_BDF)
+
+
+def rows_of(bits):
+    return [format(bits.row_bits(0, y, bits.w), f'0{bits.w}b') for y in range(bits.h)]
+
+
+def test_glyphs_sit_on_the_baseline(font):
+    assert font.line_height == 4
+    assert font.width_of('L|') == 6
+    assert rows_of(font.render_bits('L|')) == ['100010', '100010', '111010', '000010']
+
+
+def test_glyphs_can_hang_left_of_the_pen(font):
+    assert font.width_of('Lj') == 6
+    assert rows_of(font.render_bits('Lj')) == ['100000', '100000', '111010', '000100']
+
+
+def test_unknown_characters_fall_back_to_a_glyph(font):
+    assert font.width_of('?x') == 2 * font.glyph('|').advance
+
+
+def test_draw_opaque_text_returns_next_x(font):
+    form = Form(0, 0, 10, 6)
+    form.fill(Color(1, 2, 3))
+
+    x = font.draw(form, 1, 1, 'L', WHITE, BLACK)
+
+    assert x == 5
+    assert form.color_at(1, 1) == WHITE
+    assert form.color_at(2, 1) == BLACK
+    assert form.color_at(5, 1) == Color(1, 2, 3)
+
+
+def test_draw_transparent_text_keeps_the_background(font):
+    form = Form(0, 0, 10, 6)
+    form.fill(Color(1, 2, 3))
+
+    font.draw(form, 0, 0, 'L', WHITE)
+
+    assert form.color_at(0, 0) == WHITE
+    assert form.color_at(1, 0) == Color(1, 2, 3)
+
+
+def test_rendered_runs_are_cached_and_evicted(font):
+    font.cache_size = 2
+    first = font.render('L', WHITE)
+
+    assert font.render('L', WHITE) is first
+    font.render('|', WHITE)
+    font.render('L', WHITE, BLACK)
+    assert font.render('L', WHITE) is not first
+    assert len(font.runs) == 2
+
+
+def test_draw_on_other_depths(font):
+    bits = BitForm(0, 0, 8, 4)
+    font.draw(bits, 0, 0, '|', WHITE)
+    assert bits.row_bits(0, 3, 8) == 0x80
+
+    indexed = IndexedForm(0, 0, 8, 4, palette=[BLACK, WHITE])
+    font.draw(indexed, 0, 0, '|', WHITE, BLACK)
+    assert indexed.color_at(0, 3) == WHITE
+    with pytest.raises(BitBltError):
+        font.draw(indexed, 0, 0, '|', WHITE)
+
+
+def test_default_font_covers_ascii():
+    font = Font.default()
+
+    assert all(chr(code) in font.glyphs for code in range(0x20, 0x7f))
+    assert font.width_of('hello') == 30
@@ -0,0 +1,300 @@
+import pytest
+
+from multiprocessing import shared_memory
+
+from imperfect.draw import Color, Form
+from imperfect.draw.form import BitForm, IndexedForm, OutOfBoundsError
+from imperfect.draw.rect import Rect, merge_rects
+
+
+RED = Color(255, 0, 0)
+BLUE = Color(0, 0, 255)
+WHITE = Color(255, 255, 255)
+
+
+@pytest.fixture
+def form():
+    return Form(0, 0, 16, 12)
+
+
+def test_new_form_is_clean(form):
+    assert not form.is_damaged
+    assert form.take_damage() == []
+
+
+def test_writes_damage_form(form):
+    form.put_color_at(3, 4, RED)
+    form.put_row_bytes(0, 8, bytes(RED.values) * 5)
+
+    assert form.take_damage() == [Rect(3, 4, 1, 1), Rect(0, 8, 5, 1)]
+    assert not form.is_damaged
+
+
+def test_pixel_writes_damage_their_bounding_box(form):
+    view = form.view(4, 2, 8, 8)
+    for x, y in [(5, 5), (1, 3), (6, 1), (2, 7)]:
+        view.put_color_at(x, y, RED)
+
+    assert view.is_damaged
+    assert view.take_damage() == [Rect(1, 1, 6, 7)]
+    assert form.take_damage() == [Rect(5, 3, 6, 7)]
+
+
+def test_fill_damages_whole_form(form):
+    form.put_color_at(3, 4, RED)
+    form.fill(BLUE)
+
+    assert form.take_damage() == [Rect(0, 0, 16, 12)]
+    assert form.color_at(3, 4) == BLUE
+
+
+def test_damage_is_clipped_to_form(form):
+    form.damage(-4, 10, 8, 8)
+    form.damage(20, 0, 2, 2)
+
+    assert form.take_damage() == [Rect(0, 10, 4, 2)]
+
+
+def test_merge_rects_joins_overlapping_and_adjacent_rects():
+    rects = [Rect(0, 0, 10, 1), Rect(0, 1, 10, 1), Rect(5, 0, 2, 2), Rect(40, 40, 2, 2)]
+
+    assert merge_rects(rects) == [Rect(0, 0, 10, 2), Rect(40, 40, 2, 2)]
+
+
+def test_merge_rects_collapses_when_there_are_too_many():
+    rects = [Rect(x * 4, 0, 1, 1) for x in range(10)]
+
+    assert merge_rects(rects, max_count=4) == [Rect(0, 0, 37, 1)]
+
+
+def test_view_shares_pixels_with_parent(form):
+    form.fill(BLUE)
+    view = form.view(4, 2, 3, 5)
+
+    view.put_color_at(0, 0, RED)
+    form.put_color_at(6, 6, RED)
+
+    assert form.color_at(4, 2) == RED
+    assert view.color_at(2, 4) == RED
+    assert view.color_at(1, 1) == BLUE
+
+
+def test_view_fill_stays_inside_its_rectangle(form):
+    form.fill(BLUE)
+    form.view(4, 2, 3, 5).fill(RED)
+
+    assert form.color_at(3, 2) == BLUE
+    assert form.color_at(4, 2) == RED
+    assert form.color_at(6, 6) == RED
+    assert form.color_at(7, 6) == BLUE
+    assert form.color_at(4, 7) == BLUE
+
+
+def test_view_damages_parent(form):
+    view = form.view(4, 2, 3, 5)
+    view.put_color_at(1, 1, RED)
+
+    assert form.take_damage() == [Rect(5, 3, 1, 1)]
+
+
+def test_view_must_be_inside_form(form):
+    with pytest.raises(OutOfBoundsError):
+        form.view(10, 0, 8, 2)
+
+
+def test_view_of_view(form):
+    form.fill(BLUE)
+    inner = form.view(2, 2, 10, 8).view(1, 1, 2, 2)
+    inner.fill(RED)
+
+    assert form.color_at(3, 3) == RED
+    assert form.color_at(4, 4) == RED
+    assert form.color_at(5, 4) == BLUE
+
+
+def test_indexed_form_stores_nearest_palette_index():
+    palette = [Color(0, 0, 0), Color(255, 0, 0), Color(0, 0, 255)]
+    form = IndexedForm(0, 0, 4, 2, palette=palette)
+
+    form.put_color_at(1, 1, Color(200, 10, 10))
+    form.fill(Color(0, 0, 250))
+    form.put_color_at(2, 0, RED)
+
+    assert form.color_at(0, 0) == BLUE
+    assert form.color_at(2, 0) == RED
+    assert form.bitmap[2] == 1
+    assert len(form.bitmap) == 8
+
+
+def test_index_table_isnt_reused_for_a_palette_with_the_same_id():
+    form = IndexedForm(0, 0, 4, 2, palette=[Color(0, 0, 0), Color(255, 0, 0), Color(0, 0, 255)])
+    old = [Color(255, 0, 0), Color(0, 0, 255)]
+    new = [Color(0, 0, 255), Color(255, 0, 0)]
+    assert form.index_table(old)[:2] == bytes([1, 2])
+
+    # as if old was collected and new got its id
+    form._index_tables[id(new)] = form._index_tables.pop(id(old))
+
+    assert form.index_table(new)[:2] == bytes([2, 1])
+
+
+def test_bit_form_packs_rows_into_words():
+    form = BitForm(0, 0, 40, 2)
+
+    form.put_bit_at(0, 0, 1)
+    form.put_bit_at(39, 1, 1)
+
+    assert form.pitch == 8
+    assert form.bitmap[0] == 0x80
+    assert form.bitmap[8 + 4] == 0x01
+    assert form.row_bits(0, 0, 40) == 1 << 39
+    assert form.color_at(0, 0) == form.foreground
+    assert form.color_at(1, 0) == form.background
+
+
+def test_bit_form_row_bits_across_bytes():
+    form = BitForm(0, 0, 32, 1)
+    form.put_row_bits(5, 0, 7, 0b1011011)
+
+    assert form.row_bits(5, 0, 7) == 0b1011011
+    assert form.row_bits(0, 0, 16) == 0b0000010110110000
+    assert form.take_damage() == [Rect(5, 0, 7, 1)]
+
+
+def test_bit_form_row_bytes_are_packed_bits():
+    form = BitForm(0, 0, 12, 2)
+    form.put_row_bytes(0, 1, bytes([0b10110011, 0b01010000]))
+
+    assert form.row_bits(0, 1, 12) == 0b101100110101
+    assert form.row_bytes(2, 1, 9) == bytes([0b11001101, 0b00000000])
+    assert form.take_damage() == [Rect(0, 1, 12, 1)]
+    with pytest.raises(OutOfBoundsError):
+        form.put_row_bytes(4, 0, bytes(2))
+
+
+def test_bit_form_view_starts_on_a_byte():
+    form = BitForm(0, 0, 32, 4)
+    form.view(8, 1, 8, 2).fill(form.foreground)
+
+    assert form.row_bits(0, 1, 32) == 0x00ff0000
+    assert form.row_bits(0, 3, 32) == 0
+    with pytest.raises(OutOfBoundsError):
+        form.view(3, 0, 8, 2)
+
+
+def test_scroll_moves_pixels_and_fills_uncovered_rows(form):
+    for y in range(form.h):
+        form.view(0, y, form.w, 1).fill(Color(y, 0, 0))
+    form.take_damage()
+
+    form.scroll(0, -1, fill=BLUE)
+
+    assert [form.color_at(5, y) for y in range(form.h)] == [Color(y, 0, 0) for y in range(1, 12)] + [BLUE]
+    assert form.take_damage() == [Rect(0, 0, 16, 12)]
+
+
+def test_scrolling_a_view_moves_only_its_region(form):
+    form.fill(BLUE)
+    form.put_color_at(4, 4, RED)
+    form.put_color_at(8, 2, RED)
+
+    form.view(2, 2, 6, 6).scroll(1, 2)
+
+    assert form.color_at(5, 6) == RED
+    assert form.color_at(4, 4) == BLUE
+    assert form.color_at(8, 2) == RED
+    assert form.color_at(9, 4) == BLUE
+
+
+def test_flood_fill_stays_inside_the_region(form):
+    # a wall with a gap at the bottom, and a pocket cut off from the rest
+    form.fill(BLUE)
+    form.view(6, 0, 1, 11).fill(RED)
+    form.view(12, 0, 1, 3).fill(RED)
+    form.view(13, 2, 3, 1).fill(RED)
+    form.take_damage()
+
+    form.flood_fill(0, 0, WHITE)
+
+    assert form.color_at(5, 5) == WHITE
+    assert form.color_at(10, 0) == WHITE
+    assert form.color_at(6, 5) == RED
+    assert form.color_at(14, 0) == BLUE
+    assert form.take_damage() == [Rect(0, 0, 16, 12)]
+
+
+def test_flood_fill_of_a_view_stays_in_the_view(form):
+    form.fill(BLUE)
+
+    form.view(4, 4, 4, 4).flood_fill(1, 1, RED)
+
+    assert form.color_at(4, 4) == RED
+    assert form.color_at(7, 7) == RED
+    assert form.color_at(3, 4) == BLUE
+    assert form.color_at(8, 8) == BLUE
+
+
+@pytest.mark.parametrize('other', [BitForm(0, 0, 40, 6), IndexedForm(0, 0, 40, 6)], ids=['1 bit', 'indexed'])
+def test_flood_fill_other_depths(other):
+    other.fill(WHITE)
+    other.view(16, 0, 8, 6).fill(RED)
+
+    other.flood_fill(39, 5, RED)
+
+    assert other.color_at(30, 0) == other.color_at(20, 3)
+    assert other.color_at(0, 0) != other.color_at(20, 3)
+
+
+def test_mmap_form_keeps_pixels_in_its_file(tmp_path):
+    pathname = tmp_path / 'canvas.bin'
+    form = Form.from_mmap(pathname, 4, 3)
+    form.fill(BLUE)
+    form.put_color_at(1, 2, RED)
+    form.close()
+
+    assert pathname.stat().st_size == 4 * 3 * 4
+
+    reopened = Form.from_mmap(pathname, 4, 3)
+    assert reopened.color_at(1, 2) == RED
+    assert reopened.color_at(0, 0) == BLUE
+    assert reopened.is_shared
+    reopened.close()
+
+
+def test_shared_memory_forms_see_each_others_pixels():
+    owner = BitForm.from_shared_memory(40, 2)
+    other = BitForm.from_shared_memory(40, 2, name=owner.backing.name)
+    try:
+        owner.put_bit_at(39, 1, 1)
+        other.view(8, 0, 8, 1).fill(other.foreground)
+
+        assert other.bit_at(39, 1) == 1
+        assert owner.row_bits(0, 0, 40) == 0xff << 24
+        assert owner.view(8, 0, 8, 1).is_shared
+    finally:
+        other.close()
+        name = owner.backing.name
+        owner.close()
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def test_closing_a_form_with_open_views_keeps_it_open(tmp_path):
+    form = Form.from_mmap(tmp_path / 'canvas.bin', 4, 3)
+    view = form.view(1, 1, 2, 2)
+
+    with pytest.raises(BufferError):
+        form.close()
+    form.fill(RED)
+    assert view.color_at(0, 0) == RED
+
+    view.close()
+    exported = form.bitmap_bytes
+    with pytest.raises(BufferError):
+        form.close()
+    assert form.color_at(3, 2) == RED
+
+    del exported
+    form.close()
+    assert form.backing is None
@@ -0,0 +1,129 @@
+import io
+import struct
+import zlib
+
+import pytest
+
+from imperfect.draw import Color, Form
+from imperfect.draw import alpha, image
+from imperfect.draw.form import BitForm, IndexedForm
+
+
+def sample_form():
+    form = Form(0, 0, 5, 3)
+    for y in range(3):
+        for x in range(5):
+            form.put_color_at(x, y, Color(x * 50, y * 100, 7, 255 - x))
+    return form
+
+
+@pytest.mark.parametrize('suffix', ['.png', '.pam'])
+def test_round_trip_keeps_every_pixel(tmp_path, suffix):
+    form = sample_form()
+    image.save(form, tmp_path / f'form{suffix}')
+
+    loaded = image.load(tmp_path / f'form{suffix}')
+
+    assert loaded.bitmap == form.bitmap
+
+
+def test_ppm_drops_alpha():
+    buffer = io.BytesIO()
+    image.write_ppm(sample_form(), buffer)
+
+    assert buffer.getvalue().startswith(b'P6\n5 3\n255\n')
+    buffer.seek(0)
+    loaded = image.read_pnm(buffer)
+    assert loaded.color_at(4, 2) == Color(200, 200, 7, 255)
+
+
+def test_ppm_header_comments_are_skipped():
+    data = b'P6 # made by hand\n2 # wide\n1\n255\n' + bytes([1, 2, 3, 4, 5, 6])
+
+    loaded = image.read_pnm(io.BytesIO(data))
+
+    assert loaded.color_at(1, 0) == Color(4, 5, 6)
+
+
+def test_reads_into_forms_of_other_depths():
+    form = BitForm(0, 0, 5, 3)
+    buffer = io.BytesIO()
+    image.write_ppm(sample_form(), buffer)
+    buffer.seek(0)
+
+    image.read_pnm(buffer, form)
+
+    assert form.color_at(0, 0) == form.foreground
+    assert form.take_damage()
+
+
+def test_writes_forms_of_other_depths():
+    palette = [Color(0, 0, 0), Color(255, 0, 0)]
+    form = IndexedForm(0, 0, 3, 1, palette=palette)
+    form.put_color_at(1, 0, Color(255, 0, 0))
+    buffer = io.BytesIO()
+
+    image.write_ppm(form, buffer)
+
+    assert buffer.getvalue().endswith(bytes([0, 0, 0, 255, 0, 0, 0, 0, 0]))
+
+
+def filtered(kind, row, previous, bpp):
+    # the png filters as written in the spec
+    def paeth(a, b, c):
+        p = a + b - c
+        pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+        if pa <= pb and pa <= pc:
+            return a
+        return b if pb <= pc else c
+
+    result = bytearray()
+    for i, value in enumerate(row):
+        a = row[i - bpp] if i >= bpp else 0
+        b = previous[i]
+        c = previous[i - bpp] if i >= bpp else 0
+        predictor = [0, a, b, (a + b) // 2, paeth(a, b, c)][kind]
+        result.append((value - predictor) & 0xff)
+    return bytes([kind]) + bytes(result)
+
+
+def chunk(kind, data):
+    return struct.pack('>I4s', len(data), kind) + data + struct.pack('>I', zlib.crc32(data, zlib.crc32(kind)))
+
+
+def test_reads_every_png_filter_type():
+    rows = [bytes((x * 37 + y * 11) % 256 for x in range(12)) for y in range(5)]
+    data = b''
+    previous = bytes(12)
+    for kind, row in enumerate(rows):
+        data += filtered(kind, row, previous, 3)
+        previous = row
+
+    png = (
+        image.PNG_SIGNATURE +
+        chunk(b'IHDR', struct.pack('>IIBBBBB', 4, 5, 8, 2, 0, 0, 0)) +
+        chunk(b'IDAT', zlib.compress(data)[:10]) +
+        chunk(b'IDAT', zlib.compress(data)[10:]) +
+        chunk(b'IEND', b'')
+    )
+    loaded = image.read_png(io.BytesIO(png))
+
+    for y, row in enumerate(rows):
+        assert loaded.color_at(3, y) == Color(row[9], row[10], row[11])
+
+
+def test_up_filter_wraps_where_compositing_saturates():
+    row, previous = bytes([250, 1, 128, 200]), bytes([10, 2, 128, 100])
+
+    assert image.unfilter(2, row, previous, 4) == bytes([4, 3, 0, 44])
+    assert alpha.add(row, previous) == bytes([255, 3, 255, 255])
+
+
+def test_corrupt_png_chunk_is_rejected():
+    buffer = io.BytesIO()
+    image.write_png(sample_form(), buffer)
+    data = bytearray(buffer.getvalue())
+    data[40] ^= 0xff
+
+    with pytest.raises(image.ImageError):
+        image.read_png(io.BytesIO(bytes(data)))
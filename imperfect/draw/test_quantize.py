@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from imperfect.draw import Color, Form, Palette
+from imperfect.draw.cube import ColorCube
+from imperfect.draw.quantize import quantize
+
+
+GREYS = (Color(0, 0, 0), Color(128, 128, 128), Color(255, 255, 255))
+
+
+def nearest_index(palette, color):
+    return min(
+        range(len(palette)),
+        key=lambda i: (
+            (palette[i].r - color.r) ** 2 +
+            (palette[i].g - color.g) ** 2 +
+            (palette[i].b - color.b) ** 2
+        )
+    )
+
+
+def gradient(w, h):
+    form = Form(0, 0, w, h)
+    for x in range(w):
+        level = x * 255 // (w - 1)
+        form.view(x, 0, 1, h).fill(Color(level, level, level))
+    return form
+
+
+def test_palette_values_are_built_once():
+    assert Palette.values() is Palette.values()
+    assert Palette.named_values()['RED'] == Color(255, 0, 0)
+
+
+def test_xterm_values_follow_xterm_indices():
+    values = Palette.xterm_values()
+
+    assert len(values) == 256
+    assert values[15] == Palette.WHITE
+    assert values[16 + 36 * 5 + 6 * 1 + 2] == Color(255, 95, 135)
+    assert values[232] == Color(8, 8, 8)
+
+
+def test_cube_finds_nearest_color():
+    palette = Palette.xterm_values()
+    cube = ColorCube.of(palette)
+
+    for color in [Color(250, 3, 129), Color(90, 91, 92), Color(1, 254, 1), Color(100, 100, 100)]:
+        assert cube.index_of(color) == nearest_index(palette, color)
+    rng = random.Random(1)
+    for _ in range(2000):
+        color = Color(rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        assert cube.index_of(color) == nearest_index(palette, color)
+    assert ColorCube.of(palette) is cube
+    assert Palette.nearest(Color(254, 1, 1)) == Palette.RED
+
+
+def test_quantize_without_dither():
+    form = gradient(16, 2)
+
+    indexed = quantize(form, palette=GREYS)
+
+    assert indexed.palette is GREYS
+    assert [indexed.color_at(x, 1) for x in (0, 7, 15)] == list(GREYS)
+
+
+@pytest.mark.parametrize('dither', ['ordered', 'floyd-steinberg'])
+def test_dithering_mixes_neighbouring_colors(dither):
+    form = Form(0, 0, 16, 16)
+    form.fill(Color(64, 64, 64))
+
+    indexed = quantize(form, palette=GREYS, dither=dither, spread=128)
+
+    counts = [bytes(indexed.bitmap).count(index) for index in range(len(GREYS))]
+    assert counts[0] > 64
+    assert counts[1] > 64
+    assert counts[2] == 0
+
+
+def test_unknown_dither_is_rejected():
+    with pytest.raises(ValueError):
+        quantize(gradient(4, 1), dither='random')
@@ -0,0 +1,89 @@
+import pytest
+
+from imperfect.draw import Color, CombinationRule, Form, shapes
+from imperfect.draw.form import BitForm
+from imperfect.draw.rect import Rect
+
+
+RED = Color(255, 0, 0)
+CLEAR = Color(0, 0, 0, 0)
+
+
+def drawn(form):
+    return {(x, y) for y in range(form.h) for x in range(form.w) if form.color_at(x, y) != CLEAR}
+
+
+def covered(spans):
+    return {(x, y) for y, start, stop in spans for x in range(start, stop)}
+
+
+def test_fill_rect_is_clipped_and_damaged():
+    form = Form(0, 0, 8, 8)
+
+    shapes.fill_rect(form, 6, -1, 4, 3, RED)
+
+    assert drawn(form) == {(6, 0), (7, 0), (6, 1), (7, 1)}
+    assert form.take_damage() == [Rect(6, 0, 2, 2)]
+
+
+def test_draw_rect_leaves_the_inside():
+    form = Form(0, 0, 6, 6)
+
+    shapes.draw_rect(form, 0, 0, 5, 4, RED)
+
+    assert len(drawn(form)) == 5 * 2 + 2 * 2
+    assert (2, 2) not in drawn(form)
+    assert (4, 3) in drawn(form)
+
+
+def test_circle_is_symmetric_and_outline_matches_its_edge():
+    spans = shapes.ellipse_spans(10, 10, 4, 4)
+    outline = shapes.ellipse_outline_spans(10, 10, 4, 4)
+    inner = shapes.ellipse_spans(10, 10, 3, 3)
+
+    points = covered(spans)
+    assert {(20 - x, y) for x, y in points} == points
+    assert {(y, x) for x, y in points} == points
+    assert min(y for _, y in points) == 6 and max(y for _, y in points) == 14
+    assert covered(outline) == points - covered(inner)
+
+
+def test_zero_radius_ellipse_is_a_line():
+    assert shapes.ellipse_spans(3, 3, 2, 0) == [(3, 1, 6)]
+    assert shapes.ellipse_spans(3, 3, 0, 0) == [(3, 3, 4)]
+
+
+def test_polygon_covers_pixel_centers_inside():
+    square = [(1, 1), (5, 1), (5, 4), (1, 4)]
+    assert covered(shapes.polygon_spans(square)) == covered(shapes.rect_spans(1, 1, 4, 3))
+
+    triangle = [(0, 0), (8, 0), (0, 8)]
+    points = covered(shapes.polygon_spans(triangle))
+    assert points == {(x, y) for y in range(8) for x in range(8) if x + y < 7}
+
+
+def test_polygon_uses_even_odd_rule():
+    # a pentagram, its center is crossed twice on every row and stays empty
+    star = [(10, 0), (16, 19), (0, 7), (20, 7), (4, 19)]
+    points = covered(shapes.polygon_spans(star))
+
+    assert (10, 10) not in points
+    assert (10, 3) in points
+
+
+@pytest.mark.parametrize('form', [Form(0, 0, 12, 12), BitForm(0, 0, 12, 12)], ids=['32 bit', '1 bit'])
+def test_shapes_draw_on_any_depth(form):
+    shapes.fill_polygon(form, [(2, 2), (10, 2), (6, 10)], RED)
+    shapes.draw_circle(form, 6, 6, 5, RED, rule=CombinationRule.SOURCE_OR_DESTINATION)
+
+    assert form.color_at(6, 4) != form.color_at(0, 0)
+    assert form.color_at(1, 6) != form.color_at(0, 0)
+
+
+def test_draw_polygon_closes_the_outline():
+    form = Form(0, 0, 8, 8)
+
+    shapes.draw_polygon(form, [(1, 1), (6, 1), (6, 6)], RED)
+
+    assert {(1, 1), (6, 1), (6, 6), (3, 3)} <= drawn(form)
+    assert (5, 2) not in drawn(form)
@@ -0,0 +1,78 @@
+import pytest
+
+from imperfect.draw import Color, CombinationRule, Form
+from imperfect.draw.bitblt import BitBltError
+from imperfect.draw.form import BitForm, IndexedForm
+from imperfect.draw.rect import Rect
+from imperfect.draw.stretch import index_map, stretch_bits
+
+
+def numbered_form(w, h):
+    form = Form(0, 0, w, h)
+    for y in range(h):
+        for x in range(w):
+            form.put_color_at(x, y, Color(x, y, 7))
+    return form
+
+
+def test_index_map_samples_pixel_centers():
+    assert index_map(2, 6) == (0, 0, 0, 1, 1, 1)
+    assert index_map(6, 2) == (1, 4)
+    assert index_map(3, 4) == (0, 1, 1, 2)
+
+
+@pytest.mark.parametrize('w, h', [(12, 9), (2, 1), (5, 7), (4, 3)])
+def test_scaled_samples_nearest_pixel(w, h):
+    form = numbered_form(4, 3)
+
+    scaled = form.scaled(w, h)
+
+    for y in range(h):
+        for x in range(w):
+            assert scaled.color_at(x, y) == Color(index_map(4, w)[x], index_map(3, h)[y], 7)
+
+
+def test_stretch_is_clipped_and_damages_what_it_draws():
+    source = numbered_form(2, 2)
+    destination = Form(0, 0, 8, 8)
+
+    stretch_bits(destination, source, 4, -2, 8, 8, clip=Rect(0, 0, 6, 8))
+
+    assert destination.color_at(4, 0) == Color(0, 0, 7)
+    assert destination.color_at(5, 2) == Color(0, 1, 7)
+    assert destination.color_at(6, 2) == Color(0, 0, 0, 0)
+    assert destination.take_damage() == [Rect(4, 0, 2, 6)]
+
+
+def test_stretch_part_of_source_under_a_rule():
+    source = numbered_form(4, 4)
+    destination = Form(0, 0, 4, 4)
+    destination.fill(Color(1, 0, 0))
+
+    stretch_bits(destination, source, 0, 0, 4, 4, Rect(2, 2, 2, 2), rule=CombinationRule.SOURCE_OR_DESTINATION)
+
+    assert destination.color_at(3, 3) == Color(3, 3, 7)
+    assert destination.color_at(0, 0) == Color(3, 2, 7)
+
+
+def test_stretch_between_depths():
+    source = BitForm(0, 0, 3, 1)
+    source.put_bit_at(1, 0, 1)
+
+    indexed = IndexedForm(0, 0, 6, 2, palette=[Color(255, 255, 255), Color(0, 0, 0)])
+    stretch_bits(indexed, source, 0, 0, 6, 2)
+    bits = source.scaled(9, 2)
+
+    assert [indexed.color_at(x, 1) for x in range(6)] == [Color(255, 255, 255)] * 2 + [Color(0, 0, 0)] * 2 + [Color(255, 255, 255)] * 2
+    assert bits.row_bits(0, 1, 9) == 0b000111000
+
+
+def test_source_rect_has_to_be_inside_source():
+    with pytest.raises(BitBltError):
+        stretch_bits(Form(0, 0, 4, 4), Form(0, 0, 2, 2), 0, 0, 4, 4, Rect(1, 1, 2, 2))
+
+
+@pytest.mark.parametrize('destination', [BitForm(0, 0, 8, 8), IndexedForm(0, 0, 8, 8)])
+def test_compositing_rules_need_a_32_bit_destination(destination):
+    with pytest.raises(BitBltError):
+        stretch_bits(destination, Form(0, 0, 4, 4), 0, 0, 8, 8, rule=CombinationRule.SOURCE_OVER)
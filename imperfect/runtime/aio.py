@@ -0,0 +1,130 @@
+"""
+Runtimes whose frame loop is an asyncio coroutine.
+
+Handlers can be async def, each call of one runs as a task next to the
+frame loop so frames keep coming while it awaits. Blocking work, like
+writing to a FileStore or saving an image, goes to an executor with
+run_blocking (to await it) or in_background (to forget about it). While
+tasks run the loop waits for input by polling between short sleeps, so they
+get their turn, otherwise it blocks like the synchronous loop. It waits for
+the tasks still running before it stops.
+
+    class Viewer:
+        async def on_keybd(self, keybd):
+            proto = await self.win.run_blocking(store.read_blob, 'abc')
+            ...
+
+    AsyncDesktopAppRuntime(320, 240, 2)
+"""
+
+import asyncio
+import inspect
+import time
+
+from functools import partial
+
+from imperfect.runtime.desktop import DesktopAppRuntime
+from imperfect.runtime.headless import HeadlessAppRuntime
+
+
+# how long the loop sleeps between polls for input when nothing is due
+POLL_INTERVAL = 0.004
+
+
+class AsyncAppRuntime:
+    """Runs the frame loop of the runtime it's mixed into on asyncio."""
+
+    executor = None
+
+    def run(self):
+        asyncio.run(self._run_async())
+
+    def run_blocking(self, fn, *args):
+        """Return an awaitable of fn called with args on the executor (the
+        loop's default one unless executor is set)."""
+        return asyncio.get_running_loop().run_in_executor(self.executor, partial(fn, *args))
+
+    def in_background(self, fn, *args):
+        return self.spawn(self.run_blocking(fn, *args))
+
+    def spawn(self, awaitable):
+        """Run awaitable next to the frame loop, an exception it raises stops
+        the loop and is raised by run."""
+        task = asyncio.ensure_future(awaitable)
+        self.tasks.add(task)
+        task.add_done_callback(self._finished)
+        return task
+
+    async def _run_async(self):
+        self.tasks = set()
+        self.failures = []
+        self.wakeup = asyncio.Event()
+        try:
+            while self.running:
+                events = await self._next_events_async(self._timeout())
+                self._raise_failures()
+                if not self._step(events):
+                    break
+            while self.tasks:
+                await asyncio.wait(set(self.tasks))
+            self._raise_failures()
+        finally:
+            self.stop()
+
+    async def _next_events_async(self, timeout):
+        if not self.tasks:
+            # nothing else runs until input comes, so the wait blocks like
+            # the synchronous loop's, where the platform wants it
+            self.wakeup.clear()
+            return self._next_events(timeout)
+
+        # poll for input until some comes, something is due or a task
+        # finished (and likely changed the screen)
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            events = self._next_events(0)
+            remaining = POLL_INTERVAL if deadline is None else deadline - time.perf_counter()
+            if events or remaining <= 0 or self.wakeup.is_set() or not self.running:
+                self.wakeup.clear()
+                return events
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), min(remaining, POLL_INTERVAL))
+            except asyncio.TimeoutError:
+                pass
+
+    def _call(self, name, handler, *args):
+        result = super()._call(name, handler, *args)
+        if inspect.isawaitable(result):
+            self.spawn(self._timed(name, result))
+        return result
+
+    async def _timed(self, name, awaitable):
+        # the time an async handler awaits isn't frame work, so it's kept
+        # apart from the section of its synchronous part
+        started = time.perf_counter()
+        await awaitable
+        if self.profiler is not None:
+            self.profiler.seconds[f'{name} task'] += time.perf_counter() - started
+
+    def _finished(self, task):
+        self.tasks.discard(task)
+        self.wakeup.set()
+        if not task.cancelled() and task.exception() is not None:
+            self.failures.append(task.exception())
+
+    def _raise_failures(self):
+        if self.failures:
+            raise self.failures.pop(0)
+
+
+class AsyncDesktopAppRuntime(AsyncAppRuntime, DesktopAppRuntime):
+    pass
+
+
+class AsyncHeadlessAppRuntime(AsyncAppRuntime, HeadlessAppRuntime):
+    """Every item of the script is one pass of the loop, the tasks started
+    by handlers get a turn between passes."""
+
+    async def _next_events_async(self, timeout):
+        await asyncio.sleep(0)
+        return self._next_events(timeout)
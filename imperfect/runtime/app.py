@@ -0,0 +1,315 @@
+"""
+What every runtime has in common: the screen, the input devices, the
+handlers and the frame loop. A runtime subclass supplies the events and
+presents the frames.
+"""
+
+import time
+
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+from imperfect.draw import Form
+from imperfect.runtime.events import Expose, Key, MouseButton, MouseMove, Quit, Text, coalesce
+from imperfect.runtime.profiler import FrameProfiler, Overlay
+from imperfect.runtime.recording import Recorder, Replay
+from imperfect.runtime.scheduler import FrameScheduler
+
+
+class Mod:
+    ESC = 'ESC'
+    F1 = 'F1'
+    F2 = 'F2'
+    F3 = 'F3'
+    F4 = 'F4'
+    F5 = 'F5'
+    F6 = 'F6'
+    F7 = 'F7'
+    F8 = 'F8'
+    F9 = 'F9'
+    F10 = 'F10'
+    F11 = 'F11'
+    F12 = 'F12'
+    TAB = 'TAB'
+    CAPS = 'CAPS'
+    LSHIFT = 'LSHIFT'
+    LCTRL = 'LCTRL'
+    LALT = 'LALT'
+    LMETA= 'LMETA'
+    SPACE = 'SPACE'
+    RMETA = 'RMETA'
+    RALT = 'RALT'
+    RCTRL = 'RCTRL'
+    RSHIFT = 'RSHIFT'
+    ENTER = 'ENTER'
+    DEL = 'DEL'
+    BACKSPACE = 'BACKSPACE'
+    UP = 'UP'
+    DOWN = 'DOWN'
+    LEFT = 'LEFT'
+    RIGHT = 'RIGHT'
+
+
+@dataclass
+class MouseDevice:
+    """Represents an abstract mouse device, tracking
+    its x and y position on the screen and its state.
+    path holds every point the mouse went through from
+    px, py to x, y since the handler last saw it."""
+
+    x: int = 0
+    y: int = 0
+    px: int = 0
+    py: int = 0
+    l: bool = False
+    m: bool = False
+    r: bool = False
+    path: list = field(default_factory=list)
+
+
+@dataclass
+class KeyboardDevice:
+    """Represents an abstract keyboard device, tracking
+    the state of modifier keys as well as the text input
+    key most recently pressed."""
+
+    text: str = ''
+    modifiers: dict = field(init=False)
+
+    def __post_init__(self):
+        """Populate modifiers mapping."""
+        self.modifiers = {
+                k: 0
+                for k
+                in Mod.__dict__.keys()
+                if not k.startswith('_')
+        }
+
+    def __str__(self):
+        return f'KeyboadDevice(text={self.text}, pressed={self.pressed})'
+
+    def down(self, modifier):
+        """Set modifier key state down."""
+        self.modifiers[modifier] = 1
+
+    def up(self, modifier):
+        """Set modifier key state up."""
+        self.modifiers[modifier] = 0
+
+    @property
+    def pressed(self):
+        """Return all pressed modifiers."""
+        return {mod for mod, val in self.modifiers.items() if val == 1}
+
+    def has_pressed(self, modifiers_to_check):
+        """Return True if all modifier keys passed are pressed."""
+        return all((self.modifiers[m] == 1) for m in modifiers_to_check)
+
+
+class AppRuntime:
+    """An app's screen and input devices, subclasses get the events from and
+    present frames to a platform."""
+
+    def __init__(self, width, height, scale, screen=None, fps=60, clock=time.perf_counter):
+        self.w = width * scale
+        self.h = height * scale
+        self.scale = scale
+
+        # a screen in a file or shared memory can be drawn on by another
+        # process, it can't see that damage so all of it is presented again
+        # every frame.
+        self.screen = Form(0, 0, width, height) if screen is None else screen
+        if (self.screen.w, self.screen.h) != (width, height):
+            raise ValueError(f'screen is {self.screen.w}x{self.screen.h}, expected {width}x{height}')
+
+        self.mouse = MouseDevice()
+        self.handle_mouse_event = None
+
+        self.keybd = KeyboardDevice()
+        self.handle_keybd_event = None
+
+        self.scheduler = FrameScheduler(fps, clock)
+        self.handle_update = None
+
+        self.profiler = None
+        self.overlay = None
+
+        self.recorder = None
+        self.replaying = None
+
+        self.running = False
+        self.exiting = False
+
+    @property
+    def width_in_pixels(self):
+        return self.w / self.scale
+
+    @property
+    def height_in_pixels(self):
+        return self.h / self.scale
+
+    def register_mouse_handler(self, mouse_handler):
+        self.handle_mouse_event = mouse_handler
+
+    def register_keybd_handler(self, keybd_handler):
+        self.handle_keybd_event = keybd_handler
+
+    def register_update_handler(self, update_handler, hz=None):
+        """Call update_handler with the timestep in seconds hz times a second
+        (the frame rate by default), however fast frames are presented."""
+        self.handle_update = update_handler
+        self.scheduler.update_at(hz)
+
+    @property
+    def frame_stats(self):
+        return self.scheduler.stats()
+
+    def enable_profiler(self, trace=None, overlay=False, **kwargs):
+        """Time the sections of every frame, see FrameProfiler. Frames are
+        written to the json lines file trace when given and overlay draws
+        the percentiles over the screen."""
+        self.profiler = FrameProfiler(trace=trace, **kwargs)
+        self.overlay = Overlay(self.profiler, self.screen) if overlay else None
+        return self.profiler
+
+    def record_to(self, pathname):
+        """Write the input the app gets to the json lines file pathname, see
+        recording for the format."""
+        self.recorder = Recorder(pathname, self.scheduler.clock)
+        return self.recorder
+
+    def replay(self, events, realtime=True):
+        """Give the app the recorded (t, event) pairs instead of the input of
+        the platform, at the time they were recorded or, when not realtime,
+        a pass worth each pass with frames presented as soon as they're
+        drawn. The runtime stops after the last one."""
+        self.replaying = Replay(events, realtime)
+        return self.replaying
+
+    def in_background(self, fn, *args):
+        """Call fn with args where it won't hold up frames, runtimes without
+        a way to do that call it right away."""
+        return fn(*args)
+
+    def _section(self, name):
+        return nullcontext() if self.profiler is None else self.profiler.section(name)
+
+    def start(self):
+        self.screen.damage_all()
+        self.running = True
+        self.run()
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        # sleep until input comes or something is due, updates catch up on
+        # the time that passed and a frame is presented when the screen
+        # changed and the last one was long enough ago.
+        while self.running:
+            events = self._next_events(self._timeout())
+            if not self._step(events):
+                break
+        self.stop()
+
+    def _timeout(self):
+        now = self.scheduler.clock()
+        has_damage = self.screen.is_damaged or self.screen.is_shared
+        timeout = self.scheduler.timeout(now, has_damage)
+        if self.replaying is not None and not self.replaying.done:
+            due = self.replaying.timeout(now)
+            timeout = due if timeout is None else min(timeout, due)
+        return timeout
+
+    def _step(self, events):
+        """Handle events, run the updates due and present a frame if one is
+        due, return False when the app is done."""
+        scheduler = self.scheduler
+        started = time.perf_counter()
+        self._handle_events(events)
+        if self.exiting or not self.running:
+            return False
+
+        for _ in range(scheduler.steps(scheduler.clock())):
+            self._call('update', self.handle_update, scheduler.timestep)
+
+        # a replay as fast as it goes presents every pass, and its last one
+        replaying = self.replaying
+        unpaced = replaying is not None and (not replaying.realtime or replaying.done)
+        if (unpaced or scheduler.is_frame_due(scheduler.clock())) and self._redisplay():
+            work = time.perf_counter() - started
+            scheduler.presented(scheduler.clock(), work)
+            if self.profiler is not None:
+                self.profiler.end_frame(work)
+        return replaying is None or not replaying.done
+
+    def _next_events(self, timeout):
+        """Return the events that came since the last call, waiting up to
+        timeout seconds for the first one or until it comes when timeout is
+        None."""
+        raise NotImplementedError
+
+    def _present(self, damaged):
+        """Show the damaged rectangles of the screen."""
+        raise NotImplementedError
+
+    def _handle_events(self, events):
+        """Handle a batch of events, with runs of mouse motion merged into a
+        single call of the mouse handler."""
+        if self.replaying is not None:
+            # the recorded input stands in for the platform's
+            events = [event for event in events if isinstance(event, (Expose, Quit))]
+            events += self.replaying.due(self.scheduler.clock())
+        if self.recorder is not None:
+            self.recorder.record(events)
+
+        for event in coalesce(events):
+            self._dispatch(event)
+
+    def _dispatch(self, event):
+        match event:
+            case MouseMove(path):
+                self.mouse.px, self.mouse.py = self.mouse.x, self.mouse.y
+                self.mouse.x, self.mouse.y = path[-1]
+                self.mouse.path = path
+                self._call('mouse', self.handle_mouse_event, self.mouse)
+            case MouseButton(button, down):
+                self.mouse.px, self.mouse.py = self.mouse.x, self.mouse.y
+                self.mouse.path = [(self.mouse.x, self.mouse.y)]
+                setattr(self.mouse, button, down)
+                self._call('mouse', self.handle_mouse_event, self.mouse)
+            case Key(key, True):
+                self.keybd.down(key)
+                self._call('keybd', self.handle_keybd_event, self.keybd)
+            case Key(key, False):
+                self.keybd.text = ''
+                self.keybd.up(key)
+                self._call('keybd', self.handle_keybd_event, self.keybd)
+            case Text(text):
+                self.keybd.text = text
+                self._call('keybd', self.handle_keybd_event, self.keybd)
+            case Expose():
+                self.screen.damage_all()
+            case Quit():
+                self.exiting = True
+
+    def _call(self, name, handler, *args):
+        with self._section(name):
+            return handler(*args)
+
+    def _redisplay(self):
+        """Present the regions of the screen that changed since the last
+        frame, do nothing if none did. Return whether a frame was
+        presented."""
+        if self.screen.is_shared:
+            self.screen.damage_all()
+
+        if not self.screen.is_damaged:
+            return False
+
+        if self.overlay is not None:
+            self.overlay.draw()
+        self._present(self.screen.take_damage())
+        if self.overlay is not None:
+            self.overlay.restore()
+        return True
@@ -1,132 +1,15 @@
+import math
 import sdl2
 
-from dataclasses import dataclass, field
-from enum import Enum
+from imperfect.runtime.app import AppRuntime, KeyboardDevice, Mod, MouseDevice
+from imperfect.runtime.events import Expose, Key, MouseButton, MouseMove, Quit, Text
 
-from imperfect.draw import Form
 
-
-class Mod:
-    ESC = 'ESC'
-    F1 = 'F1'
-    F2 = 'F2'
-    F3 = 'F3'
-    F4 = 'F4'
-    F5 = 'F5'
-    F6 = 'F6'
-    F7 = 'F7'
-    F8 = 'F8'
-    F9 = 'F9'
-    F10 = 'F10'
-    F11 = 'F11'
-    F12 = 'F12'
-    TAB = 'TAB'
-    CAPS = 'CAPS'
-    LSHIFT = 'LSHIFT'
-    LCTRL = 'LCTRL'
-    LALT = 'LALT'
-    LMETA= 'LMETA'
-    SPACE = 'SPACE'
-    RMETA = 'RMETA'
-    RALT = 'RALT'
-    RCTRL = 'RCTRL'
-    RSHIFT = 'RSHIFT'
-    ENTER = 'ENTER'
-    DEL = 'DEL'
-    BACKSPACE = 'BACKSPACE'
-    UP = 'UP'
-    DOWN = 'DOWN'
-    LEFT = 'LEFT'
-    RIGHT = 'RIGHT'
-
-
-@dataclass
-class MouseDevice:
-    """Represents an abstract mouse device, tracking
-    its x and y position on the screen and its state."""
-
-    x: int = 0
-    y: int = 0
-    px: int = 0
-    py: int = 0
-    l: bool = False
-    m: bool = False
-    r: bool = False
-
-
-@dataclass
-class KeyboardDevice:
-    """Represents an abstract keyboard device, tracking
-    the state of modifier keys as well as the text input
-    key most recently pressed."""
-
-    text: str = ''
-    modifiers: dict = field(init=False)
-
-    def __post_init__(self):
-        """Populate modifiers mapping."""
-        self.modifiers = {
-                k: 0
-                for k
-                in Mod.__dict__.keys()
-                if not k.startswith('_')
-        }
-
-    def __str__(self):
-        return f'KeyboadDevice(text={self.text}, pressed={self.pressed})'
-
-    def down(self, modifier):
-        """Set modifier key state down."""
-        self.modifiers[modifier] = 1
-
-    def up(self, modifier):
-        """Set modifier key state up."""
-        self.modifiers[modifier] = 0
-
-    @property
-    def pressed(self):
-        """Return all pressed modifiers."""
-        return {mod for mod, val in self.modifiers.items() if val == 1}
-
-    def has_pressed(self, modifiers_to_check):
-        """Return True if all modifier keys passed are pressed."""
-        return all((self.modifiers[m] == 1) for m in modifiers_to_check)
-
-
-class DesktopAppRuntime:
+class DesktopAppRuntime(AppRuntime):
     """DesktopAppRuntime wraps all interaction with the platform's desktop
     facilities for drawing to the screen and handling input from the mouse and
     keyboard."""
 
-    def __init__(self, width, height, scale):
-        self.w = width * scale
-        self.h = height * scale
-        self.scale = scale
-        self.screen = Form(0, 0, width, height)
-
-        self.mouse = MouseDevice()
-        self.handle_mouse_event = None
-
-        self.keybd = KeyboardDevice()
-        self.handle_keybd_event = None
-
-        self.running = False
-        self.exiting = False
-
-    @property
-    def width_in_pixels(self):
-        return self.w / self.scale
-
-    @property
-    def height_in_pixels(self):
-        return self.h / self.scale
-
-    def register_mouse_handler(self, mouse_handler):
-        self.handle_mouse_event = mouse_handler
-
-    def register_keybd_handler(self, keybd_handler):
-        self.handle_keybd_event = keybd_handler
-
     def start(self):
         if sdl2.SDL_Init(sdl2.SDL_INIT_VIDEO) < 0:
             raise MachineError(f'Canot initialize SDL: {sdl2.SDL_Geterror()}')
@@ -159,8 +42,7 @@ class DesktopAppRuntime:
             self.screen.h,
         )
         sdl2.SDL_StartTextInput()
-        self.running = True
-        self.run()
+        super().start()
 
     def stop(self):
         if not self.running:
@@ -173,103 +55,85 @@ class DesktopAppRuntime:
         sdl2.SDL_DestroyWindow(self.window)
         sdl2.SDL_Quit()
 
-    def run(self):
-
-        while self.running:
-            start = sdl2.SDL_GetPerformanceCounter()
-
-            self._handle_events()
-            if self.exiting:
-                break
-
-            self._redisplay()
-
-            end = sdl2.SDL_GetPerformanceCounter()
-            elapsed = (
-                (end - start) /
-                (sdl2.SDL_GetPerformanceFrequency() * 1000.0)
-            )
-
-            delay = 16.666 - elapsed
-            sdl2.SDL_Delay(int(delay))
-        self.stop()
-
-    def _handle_events(self):
+    def _next_events(self, timeout):
         event = sdl2.SDL_Event()
-        while sdl2.SDL_PollEvent(event) != 0:
-            handled, dev = self._handle(event)
-            match handled, dev:
-                case True, self.mouse:
-                    self.handle_mouse_event(self.mouse)
-                case True, self.keybd:
-                    self.handle_keybd_event(self.keybd)
-
-    def _redisplay(self):
-        sdl2.SDL_UpdateTexture(
-            self.texture,
-            None,
-            self.screen.bitmap_bytes,
-            self.screen.w * self.screen.depth
-        )
-        sdl2.SDL_RenderClear(self.renderer)
-        sdl2.SDL_RenderCopy(self.renderer, self.texture, None, None)
-        sdl2.SDL_RenderPresent(self.renderer)
-
-    def _handle(self, event):
-        if event.type == sdl2.SDL_TEXTINPUT:
-            self.keybd.text = event.text.text.decode('utf-8')
-            return True, self.keybd
+        if timeout is None:
+            has_event = sdl2.SDL_WaitEvent(event)
+        elif timeout > 0:
+            has_event = sdl2.SDL_WaitEventTimeout(event, math.ceil(timeout * 1000))
+        else:
+            has_event = sdl2.SDL_PollEvent(event)
+
+        # drain the queue, every event queued since the last frame is
+        # handled as one batch
+        with self._section('poll'):
+            sdl_events = []
+            while has_event:
+                sdl_events.append(event)
+                event = sdl2.SDL_Event()
+                has_event = sdl2.SDL_PollEvent(event)
+
+            events = [translate(sdl_event) for sdl_event in sdl_events]
+            return [event for event in events if event is not None]
+
+    def _present(self, damaged):
+        """Upload the damaged regions of the screen to the texture and
+        present it."""
+        with self._section('upload'):
+            for rect in damaged:
+                sdl2.SDL_UpdateTexture(
+                    self.texture,
+                    sdl2.SDL_Rect(rect.x, rect.y, rect.w, rect.h),
+                    self.screen.bitmap_bytes_from(rect.x, rect.y),
+                    self.screen.pitch
+                )
+        if self.profiler is not None:
+            self.profiler.count('uploaded', sum(rect.w * rect.h * self.screen.depth for rect in damaged))
+
+        with self._section('present'):
+            sdl2.SDL_RenderClear(self.renderer)
+            sdl2.SDL_RenderCopy(self.renderer, self.texture, None, None)
+            sdl2.SDL_RenderPresent(self.renderer)
+
+
+BUTTONS_BY_SDL_CODE = {1: 'l', 2: 'm', 3: 'r'}
+
+EXPOSING_WINDOW_EVENTS = {
+    sdl2.SDL_WINDOWEVENT_EXPOSED,
+    sdl2.SDL_WINDOWEVENT_SIZE_CHANGED,
+    sdl2.SDL_WINDOWEVENT_RESTORED,
+}
 
-        if event.type == sdl2.SDL_KEYDOWN:
-            key = MODS_BY_SDL_CODE.get(event.key.keysym.sym, 'text_key')
-            self.keybd.down(key)
-            return True, self.keybd
 
-        if event.type == sdl2.SDL_KEYUP:
-            key = MODS_BY_SDL_CODE.get(event.key.keysym.sym, 'text_key')
-            self.keybd.text = ''
-            self.keybd.up(key)
-            return True, self.keybd
+def translate(event):
+    """Return the runtime event for an SDL event, None for the ones that
+    aren't handled."""
+    if event.type == sdl2.SDL_TEXTINPUT:
+        return Text(event.text.text.decode('utf-8'))
 
-        if event.type == sdl2.SDL_MOUSEBUTTONDOWN:
-            button_value = event.button.button
-            match button_value:
-                case 1:
-                    self.mouse.l = True
-                case 2:
-                    self.mouse.m = True
-                case 3:
-                    self.mouse.r = True
-                case _:
-                    print(f'button_value={button_value}')
-            return True, self.mouse
+    if event.type in (sdl2.SDL_KEYDOWN, sdl2.SDL_KEYUP):
+        key = MODS_BY_SDL_CODE.get(event.key.keysym.sym, 'text_key')
+        return Key(key, event.type == sdl2.SDL_KEYDOWN)
 
-        if event.type == sdl2.SDL_MOUSEBUTTONUP:
-            button_value = event.button.button
-            match button_value:
-                case 1:
-                    self.mouse.l = False
-                case 2:
-                    self.mouse.m = False
-                case 3:
-                    self.mouse.r = False
-                case _:
-                    print(f'button_value={button_value}')
-            return True, self.mouse
+    if event.type in (sdl2.SDL_MOUSEBUTTONDOWN, sdl2.SDL_MOUSEBUTTONUP):
+        button = BUTTONS_BY_SDL_CODE.get(event.button.button)
+        if button is None:
+            return None
+        return MouseButton(button, event.type == sdl2.SDL_MOUSEBUTTONDOWN)
 
-        if event.type == sdl2.SDL_MOUSEMOTION:
-            self.mouse.px = self.mouse.x
-            self.mouse.py = self.mouse.y
+    if event.type == sdl2.SDL_MOUSEMOTION:
+        return MouseMove([(event.motion.x, event.motion.y)])
 
-            self.mouse.x = event.motion.x
-            self.mouse.y = event.motion.y
-            return True, self.mouse
+    if event.type == sdl2.SDL_WINDOWEVENT:
+        # focus, enter, leave and move don't touch the window's pixels
+        if event.window.event in EXPOSING_WINDOW_EVENTS:
+            return Expose()
+        return None
 
-        if event.type == sdl2.SDL_QUIT:
-            self.exiting = True
-            return True, None
+    if event.type == sdl2.SDL_QUIT:
+        return Quit()
 
-        return False, None
+    return None
 
 
 MODS_BY_SDL_CODE = {
@@ -0,0 +1,53 @@
+"""
+Input events independent of the platform they came from.
+
+A runtime drains every event queued since the last frame into a batch,
+merges runs of mouse motion into one MouseMove holding the path the mouse
+took, and hands the batch to the handlers.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass
+class MouseMove:
+    path: list[tuple[int, int]]
+
+
+@dataclass
+class MouseButton:
+    button: str
+    down: bool
+
+
+@dataclass
+class Key:
+    key: str
+    down: bool
+
+
+@dataclass
+class Text:
+    text: str
+
+
+@dataclass
+class Expose:
+    """The window contents may have been lost."""
+
+
+@dataclass
+class Quit:
+    pass
+
+
+def coalesce(events):
+    """Merge consecutive mouse moves of events into one with their paths
+    joined, keeping everything else and the order."""
+    merged = []
+    for event in events:
+        if isinstance(event, MouseMove) and merged and isinstance(merged[-1], MouseMove):
+            merged[-1] = MouseMove(merged[-1].path + event.path)
+        else:
+            merged.append(event)
+    return merged
@@ -0,0 +1,83 @@
+"""
+A runtime without a window, for running apps in tests, benchmarks and on
+machines without a display.
+
+Input comes from a script, every item of it is what arrives in one pass of
+the frame loop: an event, a list of events or None for a pass without any.
+Time is simulated, waiting for the next frame or update moves the clock
+ahead instead of sleeping, so apps run as fast as they can draw and the
+same script always gives the same frames. The runtime stops at the end of
+the script, or of a replay when it has one.
+
+    runtime = HeadlessAppRuntime(320, 240, events=[
+        MouseButton('l', True),
+        [MouseMove([(10, 10)]), MouseMove([(40, 20)])],
+        MouseButton('l', False),
+    ], output='frames')
+    Doodle(320, 240, runtime=runtime).launch()
+"""
+
+from pathlib import Path
+
+from imperfect.draw import image
+from imperfect.runtime.app import AppRuntime
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class HeadlessAppRuntime(AppRuntime):
+    """Runs an app on a script of events and keeps the frames it presents in
+    memory (keep_frames) or writes them as images to the output directory,
+    see image.save for the formats."""
+
+    def __init__(self, width, height, scale=1, screen=None, fps=60, events=(), output=None, keep_frames=False, suffix='.ppm'):
+        self.clock = SimulatedClock()
+        super().__init__(width, height, scale, screen, fps, clock=self.clock)
+
+        self.script = iter(events)
+        self.output = None if output is None else Path(output)
+        self.keep_frames = keep_frames
+        self.suffix = suffix
+        self.frames = []
+        self.frame_count = 0
+
+    def start(self):
+        if self.output is not None:
+            self.output.mkdir(parents=True, exist_ok=True)
+        super().start()
+
+    def _next_events(self, timeout):
+        # an idle app would wait for input, which comes right away here
+        self.clock.advance(timeout or 0.0)
+
+        events = next(self.script, StopIteration)
+        if events is StopIteration:
+            if self.replaying is not None:
+                # the replay stops the runtime when it's done
+                return []
+            # what the script drew last is presented even when its frame
+            # isn't due yet
+            self._redisplay()
+            self.stop()
+            return []
+        if events is None:
+            return []
+        return list(events) if isinstance(events, (list, tuple)) else [events]
+
+    def _present(self, damaged):
+        with self._section('present'):
+            if self.keep_frames:
+                self.frames.append(self.screen.scaled(self.screen.w, self.screen.h))
+
+            if self.output is not None:
+                image.save(self.screen, self.output / f'frame{self.frame_count:05}{self.suffix}')
+        self.frame_count += 1
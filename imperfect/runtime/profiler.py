@@ -0,0 +1,166 @@
+"""
+Where the time of every frame goes.
+
+A runtime with a profiler times the sections of its frame loop (waiting
+for and translating input, each handler, updates, uploading and
+presenting) and counts the blits and uploaded bytes of every frame. The
+most recent frames are kept for percentiles, every frame can be written to
+a json lines trace and a summary can be drawn over the screen.
+
+    runtime.enable_profiler(trace='frames.jsonl', overlay=True)
+    ...
+    runtime.profiler.summary()['mouse']['p95']
+"""
+
+import time
+
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+
+from imperfect.draw import BitBlt, Color, CombinationRule, Form
+from imperfect.draw.font import Font
+from imperfect.draw.rect import Rect
+from imperfect.util import jsonl
+from imperfect.util.stats import percentile
+
+
+# frames kept for the percentiles
+WINDOW = 240
+
+FOREGROUND = Color(255, 255, 255)
+BACKGROUND = Color(0, 0, 0)
+
+
+class FrameProfiler:
+    def __init__(self, window=WINDOW, trace=None, clock=time.perf_counter):
+        self.clock = clock
+        self.trace = None if trace is None else Path(trace)
+        if self.trace is not None:
+            self.trace.write_text('')
+
+        self.frames = 0
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.history = defaultdict(lambda: deque(maxlen=window))
+        self.blits = BitBlt.blits
+
+    @contextmanager
+    def section(self, name):
+        """Time the block as part of section name of this frame."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.seconds[name] += self.clock() - start
+
+    def count(self, name, amount=1):
+        self.counts[name] += amount
+
+    def end_frame(self, work):
+        """Record the sections and counts of the frame just presented, which
+        took work seconds in all."""
+        self.count('blits', BitBlt.blits - self.blits)
+        self.blits = BitBlt.blits
+
+        ms = {name: seconds * 1000 for name, seconds in self.seconds.items()}
+        ms['frame'] = work * 1000
+        for name, value in ms.items():
+            self.history[name].append(value)
+        for name, value in self.counts.items():
+            self.history[name].append(value)
+
+        if self.trace is not None:
+            jsonl.append([{'frame': self.frames, 'ms': ms, 'counts': dict(self.counts)}], self.trace)
+
+        self.frames += 1
+        self.seconds.clear()
+        self.counts.clear()
+
+    def percentiles(self, name):
+        values = sorted(self.history[name])
+        if not values:
+            return None
+        return {
+            'p50': percentile(values, 0.50),
+            'p95': percentile(values, 0.95),
+            'p99': percentile(values, 0.99),
+            'max': values[-1],
+        }
+
+    def summary(self):
+        """Percentiles of every section (in milliseconds) and count over the
+        most recent frames."""
+        return {name: self.percentiles(name) for name in self.history}
+
+    def overlay_lines(self):
+        lines = []
+        for name, stats in self.summary().items():
+            if stats is not None:
+                lines.append(f'{name:<8}{stats["p50"]:>9.2f}{stats["p95"]:>9.2f}{stats["max"]:>9.2f}')
+        return [f'{"":<8}{"p50":>9}{"p95":>9}{"max":>9}'] + lines
+
+    def overlay_bounds(self, form, font):
+        lines = self.overlay_lines()
+        bounds = Rect(0, 0, max(font.width_of(line) for line in lines), font.line_height * len(lines))
+        return bounds.intersect(Rect(0, 0, form.w, form.h))
+
+    def draw_overlay(self, form, font=None):
+        """Draw the summary over the top left of form and return the
+        rectangle it covers."""
+        font = font or Font.default()
+        bounds = self.overlay_bounds(form, font)
+        for row, line in enumerate(self.overlay_lines()):
+            font.draw(form, 0, row * font.line_height, line, FOREGROUND, BACKGROUND, clip=bounds)
+        return bounds
+
+
+class Overlay:
+    """Draws a profiler's summary over a screen for a frame and puts back
+    the pixels it covered after the frame is presented."""
+
+    def __init__(self, profiler, screen):
+        self.profiler = profiler
+        self.screen = screen
+        self.saved = None
+        self.bounds = None
+
+    def draw(self):
+        font = Font.default()
+        self.bounds = self.profiler.overlay_bounds(self.screen, font)
+        if self.bounds.is_empty:
+            return
+
+        blits = BitBlt.blits
+        self.saved = Form(0, 0, self.bounds.w, self.bounds.h)
+        copy(self.saved, self.screen, 0, 0, self.bounds)
+        self.profiler.draw_overlay(self.screen, font)
+        self.profiler.blits += BitBlt.blits - blits
+
+    def restore(self):
+        # the damage of putting the pixels back is dropped, the texture
+        # already shows the overlay and the next frame draws it again
+        if self.saved is None:
+            return
+
+        blits = BitBlt.blits
+        damaged = list(self.screen.damaged)
+        copy(self.screen, self.saved, self.bounds.x, self.bounds.y, Rect(0, 0, self.bounds.w, self.bounds.h))
+        self.screen.damaged = damaged
+        self.saved = None
+        self.profiler.blits += BitBlt.blits - blits
+
+
+def copy(destination, source, x, y, source_rect):
+    BitBlt(
+        destination=destination,
+        source=source,
+        fill=None,
+        combination_rule=CombinationRule.SOURCE_ONLY,
+        destination_x=x,
+        destination_y=y,
+        source_x=source_rect.x,
+        source_y=source_rect.y,
+        width=source_rect.w,
+        height=source_rect.h,
+    ).copy_bits()
@@ -0,0 +1,110 @@
+"""
+Record the input of a runtime and replay it.
+
+A recording is a json lines file with an event per line, the seconds since
+recording began first:
+
+    [0.0, "move", 10, 12, 11, 12]
+    [0.0167, "button", "l", 1]
+    [0.0334, "key", "ESC", 0]
+
+Events handled in the same pass of the frame loop share their time. A
+replay hands them back at the time they were recorded, or as fast as the
+runtime takes them (a pass each and frames presented as soon as they're
+drawn), which makes a session repeatable for comparing frame times.
+
+    runtime.record_to('session.jsonl')
+    runtime.replay(recording.load('session.jsonl'), realtime=False)
+"""
+
+from collections import deque
+
+from imperfect.runtime.events import Key, MouseButton, MouseMove, Text
+from imperfect.util import jsonl
+
+
+def to_record(t, event):
+    """Return event as a record, None for the ones that aren't input."""
+    match event:
+        case MouseMove(path):
+            return [t, 'move', *[value for point in path for value in point]]
+        case MouseButton(button, down):
+            return [t, 'button', button, int(down)]
+        case Key(key, down):
+            return [t, 'key', key, int(down)]
+        case Text(text):
+            return [t, 'text', text]
+    return None
+
+
+def from_record(record):
+    t, kind, *values = record
+    match kind:
+        case 'move':
+            return t, MouseMove(list(zip(values[0::2], values[1::2])))
+        case 'button':
+            return t, MouseButton(values[0], bool(values[1]))
+        case 'key':
+            return t, Key(values[0], bool(values[1]))
+        case 'text':
+            return t, Text(values[0])
+    raise ValueError(f'unknown event {kind} in record {record}')
+
+
+def load(pathname):
+    """Return the (t, event) pairs of a recording."""
+    return [from_record(record) for record in jsonl.load(pathname)]
+
+
+class Recorder:
+    def __init__(self, pathname, clock):
+        self.pathname = pathname
+        self.clock = clock
+        self.started = clock()
+        jsonl.dump([], pathname)
+
+    def record(self, events):
+        t = round(self.clock() - self.started, 4)
+        records = [to_record(t, event) for event in events]
+        records = [record for record in records if record is not None]
+        if records:
+            jsonl.append(records, self.pathname)
+
+
+class Replay:
+    """Hands out recorded (t, event) pairs at their time after the first call
+    of due, or a pass worth each call when not realtime."""
+
+    def __init__(self, events, realtime=True):
+        self.events = deque(events)
+        self.realtime = realtime
+        self.started = None
+
+    @property
+    def done(self):
+        return not self.events
+
+    def timeout(self, now):
+        """Return the seconds until the next events are due, None when there
+        are none left."""
+        if self.done:
+            return None
+        if not self.realtime or self.started is None:
+            return 0.0
+        return max(0.0, self.started + self.events[0][0] - now)
+
+    def due(self, now):
+        if self.started is None:
+            self.started = now - (self.events[0][0] if self.events else 0.0)
+
+        batch = []
+        if not self.realtime:
+            # the events that were handled together when recorded
+            t = self.events[0][0] if self.events else None
+            while self.events and self.events[0][0] == t:
+                batch.append(self.events.popleft()[1])
+            return batch
+
+        while self.events and self.started + self.events[0][0] <= now:
+            batch.append(self.events.popleft()[1])
+        return batch
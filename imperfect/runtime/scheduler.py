@@ -0,0 +1,119 @@
+"""
+Decide when a runtime updates, presents frames and sleeps.
+
+Updates run on a fixed timestep: real time is collected and handed out in
+steps of the same length, so an app's simulation doesn't depend on how fast
+frames come. Frames are presented at most at the target rate and only when
+the screen changed. When nothing is due the runtime can sleep until the next
+input event, or until the next update when there is an update handler.
+"""
+
+import time
+
+from collections import deque
+from dataclasses import dataclass
+
+from imperfect.util.stats import percentile
+
+
+# updates run at most this many times per frame, past it the app is too slow
+# for its timestep and the time left over is dropped instead of piling up
+MAX_STEPS = 5
+
+# frames kept for the statistics
+WINDOW = 240
+
+
+@dataclass
+class FrameStats:
+    frames: int
+    late: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class FrameScheduler:
+    def __init__(self, fps=60, clock=time.perf_counter):
+        self.frame_time = 1 / fps
+        self.timestep = self.frame_time
+        self.clock = clock
+        self.has_updates = False
+
+        now = clock()
+        self.next_frame = now
+        self.last_update = now
+        self.accumulated = 0.0
+
+        self.frames = 0
+        self.late = 0
+        self.work = deque(maxlen=WINDOW)
+
+    def update_at(self, hz=None):
+        """Hand out updates hz times a second, the frame rate by default."""
+        self.timestep = 1 / hz if hz else self.frame_time
+        self.has_updates = True
+        self.accumulated = 0.0
+        self.last_update = self.clock()
+
+    def timeout(self, now, has_damage):
+        """Return the seconds to wait for input before something is due,
+        None when nothing is and the wait can last until input comes."""
+        deadlines = []
+        if has_damage:
+            deadlines.append(self.next_frame)
+        if self.has_updates:
+            deadlines.append(self.last_update + self.timestep - self.accumulated)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - now)
+
+    def steps(self, now):
+        """Return the number of updates due, each one timestep long."""
+        if not self.has_updates:
+            self.last_update = now
+            return 0
+
+        self.accumulated += now - self.last_update
+        self.last_update = now
+
+        steps = int(self.accumulated // self.timestep)
+        if steps > MAX_STEPS:
+            steps = MAX_STEPS
+            self.accumulated = 0.0
+        else:
+            self.accumulated -= steps * self.timestep
+        return steps
+
+    def is_frame_due(self, now):
+        return now >= self.next_frame
+
+    def presented(self, now, work):
+        """Record a frame presented at now which took work seconds."""
+        # the next frame is a frame time after this one was due, or after
+        # now when this one came late (or after an idle spell), so frames
+        # don't come back to back to catch up
+        due = self.next_frame + self.frame_time
+        self.next_frame = due if due > now else now + self.frame_time
+        self.frames += 1
+        self.work.append(work)
+        if work > self.frame_time:
+            self.late += 1
+
+    def stats(self):
+        """Frame work times in milliseconds over the most recent frames,
+        late counts every frame which took longer than a frame time."""
+        work = sorted(seconds * 1000 for seconds in self.work)
+        if not work:
+            return FrameStats(self.frames, self.late, 0.0, 0.0, 0.0, 0.0, 0.0)
+        return FrameStats(
+            frames=self.frames,
+            late=self.late,
+            mean_ms=sum(work) / len(work),
+            p50_ms=percentile(work, 0.50),
+            p95_ms=percentile(work, 0.95),
+            p99_ms=percentile(work, 0.99),
+            max_ms=work[-1],
+        )
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from imperfect.draw import Palette
+from imperfect.runtime.aio import AsyncAppRuntime, AsyncHeadlessAppRuntime
+from imperfect.runtime.headless import HeadlessAppRuntime
+from imperfect.runtime.app import Mod
+from imperfect.runtime.events import Key, MouseMove, Text
+from imperfect.tools.doodle import Doodle
+
+
+class App:
+    def __init__(self, runtime):
+        self.win = runtime
+        self.win.register_mouse_handler(self.on_mouse)
+        self.win.register_keybd_handler(self.on_keybd)
+        self.frames = []
+
+    def on_mouse(self, mouse):
+        self.win.screen.put_color_at(mouse.x, mouse.y, Palette.WHITE)
+
+    async def on_keybd(self, keybd):
+        if keybd.has_pressed([Mod.F2]):
+            self.frames.append(self.win.frame_count)
+            await self.win.run_blocking(time.sleep, 0.05)
+            self.frames.append(self.win.frame_count)
+        if keybd.has_pressed([Mod.F3]):
+            raise RuntimeError('failed')
+
+
+class WaitingRuntime(AsyncAppRuntime, HeadlessAppRuntime):
+    def _next_events(self, timeout):
+        self.timeouts.append(timeout)
+        return super()._next_events(timeout)
+
+
+def script(*keys):
+    return [Key(key, True) for key in keys] + [MouseMove([(i % 8, i % 5)]) for i in range(200)]
+
+
+def test_frames_are_presented_while_a_handler_awaits():
+    runtime = AsyncHeadlessAppRuntime(8, 8, events=script(Mod.F2))
+    app = App(runtime)
+
+    runtime.start()
+
+    started, done = app.frames
+    assert done > started
+    assert not runtime.tasks
+
+
+def test_loop_without_tasks_waits_instead_of_polling():
+    runtime = WaitingRuntime(8, 8, events=[None, None])
+    runtime.timeouts = []
+    runtime.register_update_handler(lambda timestep: None, hz=10)
+
+    runtime.start()
+
+    assert len(runtime.timeouts) == 3
+    assert runtime.timeouts[-1] == pytest.approx(0.1)
+
+
+def test_exceptions_of_async_handlers_are_raised():
+    runtime = AsyncHeadlessAppRuntime(8, 8, events=script(Mod.F3))
+    App(runtime)
+
+    with pytest.raises(RuntimeError):
+        runtime.start()
+
+
+def test_doodle_saves_in_the_background(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runtime = AsyncHeadlessAppRuntime(32, 32, events=[Key(Mod.F2, True), Key(Mod.F2, False)])
+
+    Doodle(32, 32, runtime=runtime).launch()
+
+    assert (tmp_path / 'doodle.png').exists()
+
+
+def test_doodle_saves_once_per_press_of_f2(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runtime = AsyncHeadlessAppRuntime(32, 32, events=[
+        Key(Mod.F2, True), Key(Mod.F2, True), Text('a'), Key(Mod.F2, False),
+        Key(Mod.F2, True), Key(Mod.F2, False),
+    ])
+    saves = []
+    runtime.in_background = lambda fn, *args: saves.append(args[-1])
+
+    Doodle(32, 32, runtime=runtime).launch()
+
+    assert saves == ['doodle.png', 'doodle.png']
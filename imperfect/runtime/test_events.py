@@ -0,0 +1,70 @@
+import sdl2
+
+from imperfect.runtime.desktop import DesktopAppRuntime, Mod, translate
+from imperfect.runtime.events import Expose, Key, MouseButton, MouseMove, Quit, coalesce
+
+
+def motion(x, y):
+    event = sdl2.SDL_Event()
+    event.type = sdl2.SDL_MOUSEMOTION
+    event.motion.x, event.motion.y = x, y
+    return event
+
+
+def test_coalesce_merges_runs_of_mouse_moves():
+    events = [
+        MouseMove([(1, 1)]),
+        MouseMove([(2, 1)]),
+        MouseButton('l', True),
+        MouseMove([(3, 2)]),
+        MouseMove([(4, 4)]),
+        Quit(),
+    ]
+
+    assert coalesce(events) == [
+        MouseMove([(1, 1), (2, 1)]),
+        MouseButton('l', True),
+        MouseMove([(3, 2), (4, 4)]),
+        Quit(),
+    ]
+
+
+def test_translate_sdl_events():
+    key = sdl2.SDL_Event()
+    key.type = sdl2.SDL_KEYUP
+    key.key.keysym.sym = sdl2.SDLK_ESCAPE
+
+    assert translate(motion(3, 4)) == MouseMove([(3, 4)])
+    assert translate(key) == Key(Mod.ESC, False)
+
+
+def test_only_window_events_which_lose_pixels_expose():
+    window = sdl2.SDL_Event()
+    window.type = sdl2.SDL_WINDOWEVENT
+
+    window.window.event = sdl2.SDL_WINDOWEVENT_EXPOSED
+    assert translate(window) == Expose()
+    for event in (sdl2.SDL_WINDOWEVENT_FOCUS_GAINED, sdl2.SDL_WINDOWEVENT_ENTER, sdl2.SDL_WINDOWEVENT_LEAVE, sdl2.SDL_WINDOWEVENT_MOVED):
+        window.window.event = event
+        assert translate(window) is None
+
+
+def test_mouse_handler_sees_a_drag_once_with_its_path():
+    runtime = DesktopAppRuntime(8, 8, 1)
+    seen = []
+    runtime.register_mouse_handler(lambda mouse: seen.append((mouse.px, mouse.py, list(mouse.path), mouse.l)))
+
+    press = sdl2.SDL_Event()
+    press.type = sdl2.SDL_MOUSEBUTTONDOWN
+    press.button.button = 1
+
+    sdl2.SDL_Init(sdl2.SDL_INIT_EVENTS)
+    try:
+        for event in [press, motion(1, 0), motion(2, 1), motion(3, 3)]:
+            sdl2.SDL_PushEvent(event)
+        runtime._handle_events(runtime._next_events(0))
+    finally:
+        sdl2.SDL_Quit()
+
+    assert seen == [(0, 0, [(0, 0)], True), (0, 0, [(1, 0), (2, 1), (3, 3)], True)]
+    assert (runtime.mouse.x, runtime.mouse.y) == (3, 3)
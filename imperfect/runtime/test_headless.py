@@ -0,0 +1,49 @@
+from imperfect.draw import Palette, image
+from imperfect.runtime.app import Mod
+from imperfect.runtime.events import Key, MouseButton, MouseMove, Text
+from imperfect.runtime.headless import HeadlessAppRuntime
+from imperfect.tools.doodle import Doodle
+from imperfect.tools.tedit import Tedit
+
+
+def test_doodle_draws_a_scripted_drag():
+    runtime = HeadlessAppRuntime(64, 48, events=[
+        MouseMove([(10, 30)]),
+        MouseButton('l', True),
+        [MouseMove([(20, 30)]), MouseMove([(30, 30)])],
+        None,
+        MouseButton('l', False),
+        MouseMove([(40, 40)]),
+    ], keep_frames=True)
+
+    Doodle(64, 48, runtime=runtime).launch()
+
+    screen = runtime.screen
+    assert screen.color_at(25, 30) == Palette.WHITE
+    assert screen.color_at(35, 40) != Palette.WHITE
+    assert runtime.frame_count == len(runtime.frames) >= 2
+    assert runtime.frames[-1].color_at(25, 30) == Palette.WHITE
+    assert runtime.frames[0].color_at(25, 30) != Palette.WHITE
+
+
+def test_frames_are_written_to_the_output_directory(tmp_path):
+    runtime = HeadlessAppRuntime(48, 16, events=[Text('hi'), Key(Mod.ENTER, True), Key(Mod.ENTER, False)], output=tmp_path)
+
+    Tedit(48, 16, runtime=runtime).launch()
+
+    frames = sorted(tmp_path.iterdir())
+    assert [path.name for path in frames][:2] == ['frame00000.ppm', 'frame00001.ppm']
+    assert len(frames) == runtime.frame_count
+    last = image.load(frames[-1])
+    assert last.bitmap == runtime.screen.bitmap
+
+
+def test_update_handler_runs_on_simulated_time():
+    runtime = HeadlessAppRuntime(8, 8, fps=30, events=[None] * 10)
+    steps = []
+    runtime.register_update_handler(steps.append, hz=60)
+
+    runtime.start()
+
+    assert steps and set(steps) == {1 / 60}
+    assert runtime.clock.now >= len(steps) / 60 - 1e-9
@@ -0,0 +1,56 @@
+import pytest
+
+from imperfect.draw import Color
+from imperfect.runtime.events import MouseButton, MouseMove
+from imperfect.runtime.headless import HeadlessAppRuntime
+from imperfect.runtime.profiler import FrameProfiler
+from imperfect.tools.doodle import Doodle
+from imperfect.util import jsonl
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def drag():
+    return [MouseButton('l', True)] + [MouseMove([(x, 30 + x % 7)]) for x in range(10, 60)] + [MouseButton('l', False)]
+
+
+def test_sections_and_counts_are_kept_per_frame():
+    clock = Clock()
+    profiler = FrameProfiler(clock=clock)
+
+    for ms in [1, 2, 3, 4]:
+        with profiler.section('mouse'):
+            clock.now += ms / 1000
+        profiler.count('uploaded', ms * 100)
+        profiler.end_frame(ms / 1000)
+
+    assert profiler.frames == 4
+    assert profiler.percentiles('mouse') == pytest.approx({'p50': 2, 'p95': 4, 'p99': 4, 'max': 4})
+    assert profiler.percentiles('uploaded')['p50'] == 200
+    assert profiler.percentiles('frame')['max'] == pytest.approx(4)
+    assert profiler.percentiles('update') is None
+
+
+def test_runtime_profiles_handlers_and_writes_a_trace(tmp_path):
+    trace = tmp_path / 'trace.jsonl'
+    runtime = HeadlessAppRuntime(80, 60, events=drag(), keep_frames=True)
+    runtime.enable_profiler(trace=trace, overlay=True)
+
+    Doodle(80, 60, runtime=runtime).launch()
+
+    frames = jsonl.load(trace)
+    assert len(frames) == runtime.profiler.frames > 1
+    assert frames[0]['frame'] == 0
+    assert {'mouse', 'present', 'frame'} <= set(frames[1]['ms'])
+    assert frames[1]['counts']['blits'] >= 1
+
+    # the overlay shows on the presented frames but is gone from the screen
+    assert runtime.frames[-1].color_at(6, 1) == Color(0, 0, 0)
+    assert runtime.screen.color_at(6, 1) == Color(0, 0, 0, 0)
+    assert not runtime.screen.is_damaged
@@ -0,0 +1,101 @@
+from imperfect.draw import Palette
+from imperfect.runtime import recording
+from imperfect.runtime.app import Mod
+from imperfect.runtime.events import Expose, Key, MouseButton, MouseMove, Text
+from imperfect.runtime.headless import HeadlessAppRuntime
+from imperfect.tools.doodle import Doodle
+
+
+SESSION = [
+    MouseMove([(10, 30)]),
+    MouseButton('l', True),
+    [MouseMove([(20, 30)]), MouseMove([(30, 32)])],
+    None,
+    None,
+    [MouseMove([(30, 40), (31, 41)]), Expose()],
+    MouseButton('l', False),
+    MouseMove([(50, 40)]),
+    MouseButton('r', True),
+    MouseButton('r', False),
+]
+
+
+def record_session(pathname):
+    runtime = HeadlessAppRuntime(64, 48, events=SESSION)
+    runtime.record_to(pathname)
+    Doodle(64, 48, runtime=runtime).launch()
+    return runtime
+
+
+def test_records_round_trip():
+    events = [MouseMove([(1, 2), (3, 4)]), MouseButton('m', True), Key(Mod.ESC, False), Text('é')]
+
+    records = [recording.to_record(0.5, event) for event in events]
+
+    assert records[0] == [0.5, 'move', 1, 2, 3, 4]
+    assert [recording.from_record(record) for record in records] == [(0.5, event) for event in events]
+    assert recording.to_record(0.5, Expose()) is None
+
+
+def test_recording_keeps_the_input_and_when_it_came(tmp_path):
+    record_session(tmp_path / 'session.jsonl')
+
+    recorded = recording.load(tmp_path / 'session.jsonl')
+
+    assert [event for _, event in recorded] == [
+        event
+        for item in SESSION if item is not None
+        for event in (item if isinstance(item, list) else [item])
+        if not isinstance(event, Expose)
+    ]
+    times = [t for t, _ in recorded]
+    assert times == sorted(times) and times[-1] > 0
+
+
+def test_replay_draws_what_was_recorded(tmp_path):
+    recorded_runtime = record_session(tmp_path / 'session.jsonl')
+    recorded = recording.load(tmp_path / 'session.jsonl')
+
+    for realtime in (True, False):
+        runtime = HeadlessAppRuntime(64, 48)
+        runtime.replay(recorded, realtime=realtime)
+        Doodle(64, 48, runtime=runtime).launch()
+
+        assert runtime.screen.bitmap == recorded_runtime.screen.bitmap
+        assert runtime.screen.color_at(25, 30) == Palette.WHITE
+        assert runtime.replaying.done and not runtime.running
+
+
+def test_realtime_replay_takes_as_long_as_the_recording():
+    recorded = [(0.0, MouseMove([(1, 1)])), (0.25, MouseMove([(2, 2)])), (1.0, MouseMove([(3, 3)]))]
+    runtime = HeadlessAppRuntime(8, 8)
+    runtime.register_mouse_handler(lambda mouse: None)
+    runtime.replay(recorded)
+
+    runtime.start()
+
+    assert runtime.clock.now == 1.0
+    assert (runtime.mouse.x, runtime.mouse.y) == (3, 3)
+
+
+def test_fast_replay_presents_a_frame_per_batch():
+    recorded = [(0.0, MouseMove([(1, 1)])), (0.5, MouseMove([(2, 2)])), (0.5, MouseButton('l', True)), (2.0, MouseMove([(3, 3)]))]
+    runtime = HeadlessAppRuntime(8, 8, keep_frames=True)
+    runtime.register_mouse_handler(lambda mouse: runtime.screen.damage_all())
+    runtime.replay(recorded, realtime=False)
+
+    runtime.start()
+
+    assert runtime.clock.now == 0.0
+    assert runtime.frame_count == 3
+    assert runtime.mouse.l
+
+
+def test_replay_ignores_other_input():
+    runtime = HeadlessAppRuntime(8, 8, events=[MouseMove([(7, 7)]), Expose()])
+    runtime.register_mouse_handler(lambda mouse: None)
+    runtime.replay([(0.0, MouseMove([(1, 1)])), (0.1, MouseMove([(2, 2)]))])
+
+    runtime.start()
+
+    assert runtime.mouse.path == [(2, 2)]
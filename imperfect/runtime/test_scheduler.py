@@ -0,0 +1,84 @@
+import pytest
+
+from imperfect.runtime.scheduler import MAX_STEPS, FrameScheduler
+from imperfect.util.stats import percentile
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_idle_scheduler_waits_for_input(clock):
+    scheduler = FrameScheduler(50, clock=clock)
+
+    assert scheduler.timeout(clock.now, has_damage=False) is None
+    assert scheduler.steps(clock.now + 1) == 0
+
+
+def test_frames_are_presented_at_most_at_the_target_rate(clock):
+    scheduler = FrameScheduler(50, clock=clock)
+
+    assert scheduler.is_frame_due(clock.now)
+    scheduler.presented(clock.now, 0.005)
+
+    assert not scheduler.is_frame_due(clock.now + 0.01)
+    assert scheduler.timeout(clock.now + 0.01, has_damage=True) == pytest.approx(0.01)
+    assert scheduler.is_frame_due(clock.now + 0.02)
+
+
+def test_late_frame_is_followed_by_a_full_frame_time(clock):
+    scheduler = FrameScheduler(50, clock=clock)
+    scheduler.presented(clock.now, 0.005)
+
+    # presented well after it was due, after an idle spell
+    late = clock.now + 1.0
+    assert scheduler.is_frame_due(late)
+    scheduler.presented(late, 0.005)
+
+    assert not scheduler.is_frame_due(late + 0.01)
+    assert scheduler.timeout(late, has_damage=True) == pytest.approx(0.02)
+
+
+def test_updates_run_on_a_fixed_timestep(clock):
+    scheduler = FrameScheduler(60, clock=clock)
+    scheduler.update_at(100)
+
+    assert scheduler.steps(clock.now + 0.025) == 2
+    assert scheduler.timeout(clock.now + 0.025, has_damage=False) == pytest.approx(0.005)
+    assert scheduler.steps(clock.now + 0.030) == 1
+    assert scheduler.steps(clock.now + 10) == MAX_STEPS
+    assert scheduler.steps(clock.now + 10.005) == 0
+
+
+def test_stats_report_frame_work(clock):
+    scheduler = FrameScheduler(50, clock=clock)
+    for work in [0.004] * 8 + [0.010, 0.030]:
+        scheduler.presented(clock.now, work)
+        clock.now += 0.02
+
+    stats = scheduler.stats()
+
+    assert stats.frames == 10
+    assert stats.late == 1
+    assert stats.p50_ms == pytest.approx(4)
+    assert stats.p95_ms == pytest.approx(30)
+    assert stats.max_ms == pytest.approx(30)
+    assert stats.mean_ms == pytest.approx(7.2)
+
+
+def test_percentile_by_nearest_rank():
+    values = list(range(1, 101))
+
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0) == 1
+    assert percentile(values, 1) == 100
@@ -1,32 +1,46 @@
-from imperfect import DesktopAppRuntime, Mod
-from imperfect.draw import Palette
+import argparse
+
+from imperfect import HeadlessAppRuntime, Mod
+from imperfect.draw import Palette, image, shapes
 from imperfect.draw import Pen
+from imperfect.runtime import recording
+from imperfect.runtime.aio import AsyncDesktopAppRuntime
 
 
 class Doodle:
-    def __init__(self, width, height, scale=1):
+    def __init__(self, width, height, scale=1, runtime=None):
         self.w = width
         self.h = height
-        self.win = DesktopAppRuntime(width, height, scale)
+        self.win = runtime or AsyncDesktopAppRuntime(width, height, scale)
         self.win.register_keybd_handler(self.on_keybd)
         self.win.register_mouse_handler(self.on_mouse)
         self.pen = Pen(self.win.screen, Palette.WHITE, 2, 2)
+        self.filling = False
+        self.held = set()
         self.drawui()
 
     def drawui(self):
-        self.pen.down()
-        self.pen.line(0, 20, self.w - 2, 20)
-        self.pen.up()
+        shapes.fill_rect(self.win.screen, 0, 20, self.w, 2, Palette.WHITE)
 
     def on_mouse(self, mouse):
+        # the right button is a paint bucket, filling once per click
+        if mouse.r and not self.filling:
+            self.win.screen.flood_fill(mouse.x, mouse.y, self.pen.color)
+        self.filling = mouse.r
+
         if mouse.l:
             self.pen.down()
         else:
             self.pen.up()
 
-        self.pen.line(mouse.px, mouse.py, mouse.x, mouse.y)
+        # every point the mouse went through since the last call, so a fast
+        # drag is a single stroke
+        self.pen.polyline([(mouse.px, mouse.py)] + mouse.path)
 
     def on_keybd(self, keybd):
+        pressed = keybd.pressed - self.held
+        self.held = keybd.pressed
+
         if keybd.has_pressed([Mod.LSHIFT, Mod.UP]):
             self.pen.scale_up(2)
 
@@ -36,6 +50,12 @@ class Doodle:
         if keybd.has_pressed([Mod.LSHIFT, Mod.RIGHT]):
             self.pen.set_color(Palette.random())
 
+        if Mod.F2 in pressed:
+            # saved once per press, from a copy so drawing can go on while
+            # it's written on the async runtime (the synchronous ones save
+            # it right away)
+            self.win.in_background(image.save, self.win.screen.scaled(self.w, self.h), 'doodle.png')
+
         if keybd.has_pressed([Mod.ESC]):
             self.win.stop()
 
@@ -43,5 +63,24 @@ class Doodle:
         self.win.start()
 
 
-def main():
-    Doodle(640, 280, 2).launch()
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='doodle')
+    parser.add_argument('--record', help='write the input to this json lines file')
+    parser.add_argument('--replay', help='draw the input recorded in this json lines file and print the frame times')
+    parser.add_argument('--fast', action='store_true', help='replay as fast as frames are drawn instead of at the recorded times')
+    parser.add_argument('--headless', action='store_true', help='replay without a window')
+    parser.add_argument('--trace', help='write the sections of every frame as json lines to this file')
+    args = parser.parse_args(argv)
+
+    width, height = 640, 280
+    runtime = HeadlessAppRuntime(width, height) if args.headless else AsyncDesktopAppRuntime(width, height, 2)
+    if args.record:
+        runtime.record_to(args.record)
+    if args.replay:
+        runtime.replay(recording.load(args.replay), realtime=not args.fast)
+    if args.trace:
+        runtime.enable_profiler(trace=args.trace)
+
+    Doodle(width, height, runtime=runtime).launch()
+    if args.replay:
+        print(runtime.frame_stats)
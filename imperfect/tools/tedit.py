@@ -1,21 +1,138 @@
-from imperfect import DesktopAppRuntime
-from imperfect.draw import Palette
+from imperfect import DesktopAppRuntime, Mod
+from imperfect.draw import BitBlt, CombinationRule, Palette
+from imperfect.draw.font import Font
+
+
+FOREGROUND = Palette.WHITE
+BACKGROUND = Palette.BLACK
 
 
 class Tedit:
-    def __init__(self, width, height, scale=1):
+    def __init__(self, width, height, scale=1, runtime=None):
         self.w = width
         self.h = height
-        self.win = DesktopAppRuntime(width, height, scale)
+        self.win = runtime or DesktopAppRuntime(width, height, scale)
         self.win.register_keybd_handler(self.on_keybd)
         self.win.register_mouse_handler(self.on_mouse)
 
+        self.font = Font.default()
+        self.lines = ['']
+        self.row = 0
+        self.col = 0
+        self.top = 0
+        self.held = set()
+        self.win.screen.fill(BACKGROUND)
+        self.draw_line(0)
+
+    @property
+    def visible_rows(self):
+        return self.h // self.font.line_height
+
     def on_mouse(self, mouse):
-        print(mouse)
+        pass
 
     def on_keybd(self, keybd):
-        self.win.screen.bitmap = bytearray(self.w * self.h * Palette.random().values)
-        print(keybd)
+        # the handler runs for every key event, only act on keys that went
+        # down since the last one and on text once
+        pressed = keybd.pressed - self.held
+        self.held = keybd.pressed
+
+        if keybd.text:
+            self.insert(keybd.text)
+            keybd.text = ''
+
+        if Mod.ENTER in pressed:
+            self.newline()
+        if Mod.BACKSPACE in pressed:
+            self.backspace()
+        if Mod.LEFT in pressed:
+            self.move(self.row, self.col - 1)
+        if Mod.RIGHT in pressed:
+            self.move(self.row, self.col + 1)
+        if Mod.UP in pressed:
+            self.move(self.row - 1, self.col)
+        if Mod.DOWN in pressed:
+            self.move(self.row + 1, self.col)
+        if Mod.ESC in pressed:
+            self.win.stop()
+
+    def insert(self, text):
+        line = self.lines[self.row]
+        self.lines[self.row] = line[:self.col] + text + line[self.col:]
+        self.col += len(text)
+        self.draw_line(self.row)
+
+    def newline(self):
+        line = self.lines[self.row]
+        self.lines[self.row] = line[:self.col]
+        self.lines.insert(self.row + 1, line[self.col:])
+        self.draw_lines(self.row)
+        self.move(self.row + 1, 0)
+
+    def backspace(self):
+        if self.col > 0:
+            line = self.lines[self.row]
+            self.lines[self.row] = line[:self.col - 1] + line[self.col:]
+            self.col -= 1
+            self.draw_line(self.row)
+        elif self.row > 0:
+            col = len(self.lines[self.row - 1])
+            self.lines[self.row - 1] += self.lines.pop(self.row)
+            self.draw_lines(self.row - 1)
+            self.move(self.row - 1, col)
+
+    def move(self, row, col):
+        row = max(0, min(row, len(self.lines) - 1))
+        col = max(0, min(col, len(self.lines[row])))
+        previous, self.row, self.col = self.row, row, col
+        self.draw_line(previous)
+
+        # keep the cursor on screen, moving the text by a line is a scroll
+        # of the screen and a single line drawn
+        line_height = self.font.line_height
+        while self.row < self.top:
+            self.top -= 1
+            self.win.screen.scroll(0, line_height, fill=BACKGROUND)
+            self.draw_line(self.top)
+        while self.row >= self.top + self.visible_rows:
+            self.top += 1
+            self.win.screen.scroll(0, -line_height, fill=BACKGROUND)
+            self.draw_line(self.top + self.visible_rows - 1)
+        self.draw_line(self.row)
+
+    def draw_lines(self, first):
+        for row in range(first, self.top + self.visible_rows):
+            self.draw_line(row)
+
+    def draw_line(self, row):
+        if not self.top <= row < self.top + self.visible_rows:
+            return
+
+        y = (row - self.top) * self.font.line_height
+        text = self.lines[row] if row < len(self.lines) else ''
+        x = self.font.draw(self.win.screen, 0, y, text, FOREGROUND, BACKGROUND)
+        self.fill(x, y, self.w - x, self.font.line_height, BACKGROUND)
+
+        if row == self.row:
+            cursor_x = self.font.width_of(text[:self.col])
+            cursor = text[self.col:self.col + 1] or ' '
+            self.font.draw(self.win.screen, cursor_x, y, cursor, BACKGROUND, FOREGROUND)
+
+    def fill(self, x, y, w, h, color):
+        if w <= 0:
+            return
+        BitBlt(
+            destination=self.win.screen,
+            source=None,
+            fill=color,
+            combination_rule=CombinationRule.SOURCE_ONLY,
+            destination_x=x,
+            destination_y=y,
+            source_x=0,
+            source_y=0,
+            width=w,
+            height=h,
+        ).copy_bits()
 
     def launch(self):
         self.win.start()
@@ -23,3 +23,11 @@ def dump(contents, pathname, encoding = 'utf-8'):
     """Serialize and write contents to filepath."""
     content = '\n'.join([json.dumps(entry) for entry in contents])
     Path(pathname).write_text(content, encoding=encoding)
+
+
+def append(entries, pathname, encoding = 'utf-8'):
+    """Serialize and add entries to the end of filepath."""
+    pathname = Path(pathname)
+    separator = '\n' if pathname.exists() and pathname.stat().st_size > 0 else ''
+    with pathname.open('a', encoding=encoding) as file:
+        file.write(separator + '\n'.join([json.dumps(entry) for entry in entries]))
@@ -0,0 +1,10 @@
+from math import ceil
+
+
+def percentile(values, fraction):
+    """Return the value at fraction (0 to 1) of sorted values, by the
+    nearest rank."""
+    if not values:
+        raise ValueError('percentile of no values')
+    rank = ceil(round(fraction * len(values), 9))
+    return values[max(rank, 1) - 1]